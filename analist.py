@@ -3,6 +3,7 @@
 Gebruik:
     py analist.py --data "On Time Data YTD 25022026.xlsx"
     py analist.py --data data.xlsx --likp likp.xlsx
+    py analist.py --data data.xlsx --likp likp.xlsx --profile profiel.json
 
 Commando's in chat:
     config     — toon huidig rekenmodel
@@ -19,6 +20,7 @@ import logging
 import os
 import sys
 import warnings
+from typing import Iterator
 
 import pandas as pd
 
@@ -32,30 +34,38 @@ warnings.filterwarnings("ignore", message=".*Could not infer format.*")
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from src.config import toon_config_tekst
-from src.data.processor import bereken_performances, bereken_otd, bereken_kpi_scores, root_cause_samenvatting, dedup_datagrid
-from src.data.validator import valideer_datagrid, valideer_likp, kruisvalidatie
+from src.data.processor import bereken_performances, bereken_otd, bereken_kpi_scores, dedup_datagrid
+from src.data.validator import valideer_datagrid, valideer_likp, validatie_rapport, kruisvalidatie_tabel
 from src.data.processor import join_likp
+from src.data.loader import lees_bestand
 from src.feedback_manager import bewaar_feedback, feedback_als_tekst
 from src.utils.constants import PERFORMANCE_NAMEN, BESCHIKBARE_IDS
+from src.utils.entiteiten import bouw_entiteit_index, detecteer_met_posities
+from src.utils.llm_context import context_aggregaten
+from src.utils.llm_service import LLM_DEFAULTS, context_tekst, foutmelding, stream_antwoord
+from src.utils.prompt_budget import bouw_berichten
+from src.utils.vraag_analyse import bouw_analyse_index, gefilterde_analyse
+from src.utils.vraag_intentie import lokaal_antwoord
+from src.utils.profiler import meet, nieuw_profiel, profiel_actief, profiel_als_json, profiel_als_tekst
 
 
 # --- LLM client (standalone, geen Streamlit) ---
 
-def _get_llm_client():
-    """Maak OpenAI client aan met OPENROUTER_API_KEY."""
+def _llm_config() -> dict | None:
+    """LLM-instellingen uit OPENROUTER_API_KEY / OPENROUTER_MODEL / OPENROUTER_BASE_URL.
+
+    Gebruikt dezelfde async streaming client als de Assistent (gepoolde verbindingen,
+    time-outs en retries uit LLM_DEFAULTS).
+    """
     api_key = os.environ.get("OPENROUTER_API_KEY")
     if not api_key:
         return None
-
-    from openai import OpenAI
-    return OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1",
-    )
-
-
-def _get_model() -> str:
-    return os.environ.get("OPENROUTER_MODEL", "anthropic/claude-sonnet-4")
+    return {
+        **LLM_DEFAULTS,
+        "api_key": api_key,
+        "model": os.environ.get("OPENROUTER_MODEL", LLM_DEFAULTS["model"]),
+        "base_url": os.environ.get("OPENROUTER_BASE_URL", LLM_DEFAULTS["base_url"]),
+    }
 
 
 SYSTEM_PROMPT = """Je bent een OTD-analist voor Elho B.V., een toonaangevend bedrijf in tuinproducten.
@@ -95,291 +105,157 @@ Antwoord in het Nederlands."""
 
 
 def _bereid_context_voor(df: pd.DataFrame) -> str:
-    """Bereid compacte data-samenvatting voor als basiscontext."""
-    totaal = len(df)
-    otd = bereken_otd(df)
-    scores = bereken_kpi_scores(df)
-    rc = root_cause_samenvatting(df)
+    """Compacte data-samenvatting als basiscontext: de Assistent-context plus de beschikbare dimensies."""
+    agg = context_aggregaten(df)
+    regels = [context_tekst(agg)]
+    if agg["landen"]:
+        regels.append(f"\nBeschikbare landen: {', '.join(agg['landen'])}")
+    if agg["salesareas"]:
+        regels.append(f"Beschikbare SalesAreas: {', '.join(agg['salesareas'])}")
+    return "\n".join(regels)
 
-    regels = [
-        f"Totaal orders: {totaal}",
-        f"Overall OTD: {otd:.1f}%",
-        "",
-        "Performance-scores per stap:",
-    ]
-    for kpi_id in BESCHIKBARE_IDS:
-        score = scores.get(kpi_id)
-        naam = PERFORMANCE_NAMEN.get(kpi_id, kpi_id)
-        if score is not None:
-            regels.append(f"  - {naam}: {score:.1f}%")
-        else:
-            regels.append(f"  - {naam}: geen data")
 
-    if not rc.empty:
-        regels.append("")
-        regels.append("Top root causes (te late orders):")
-        for _, rij in rc.head(5).iterrows():
-            regels.append(f"  - {rij['root_cause_naam']}: {rij['aantal']}x ({rij['percentage']:.1f}%)")
+# --- Dynamisch filteren op basis van vraag ---
 
-    if "ChainName" in df.columns:
-        regels.append("")
-        regels.append(f"Aantal unieke klanten: {df['ChainName'].nunique()}")
+def _detecteer_filters(vraag: str, df: pd.DataFrame, index: dict | None = None) -> tuple[dict, list]:
+    """Detecteer landen, maanden, jaren, klanten, carriers en SalesAreas uit de vraagtekst.
 
-    if "RequestedDeliveryDateFinal" in df.columns:
-        datum_col = pd.to_datetime(df["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
-        if datum_col.notna().any():
-            regels.append(f"Periode: {datum_col.min().strftime('%d-%m-%Y')} t/m {datum_col.max().strftime('%d-%m-%Y')}")
+    index: entiteit-index van df (bouw_entiteit_index); zonder index wordt hij nu gebouwd.
+    Retourneert (filters, posities): per dimensie een lijst waarden, bijv. {"Country": ["DE", "NL"],
+    "maand": [3]}, {"jaar": [2025]} of, maand met jaartal, {"periode": ["2024-12", "2025-01"]},
+    plus de (start, eind) van elke vermelding in de vraag.
+    """
+    return detecteer_met_posities(vraag, index if index is not None else bouw_entiteit_index(df))
 
-    # Beschikbare dimensies vermelden
-    if "Country" in df.columns:
-        landen = sorted(df["Country"].dropna().unique().tolist())
-        regels.append(f"\nBeschikbare landen: {', '.join(str(l) for l in landen)}")
-    if "SalesArea" in df.columns:
-        areas = sorted(df["SalesArea"].dropna().unique().tolist())
-        regels.append(f"Beschikbare SalesAreas: {', '.join(str(a) for a in areas)}")
 
-    return "\n".join(regels)
+def _filter_tekst(filters: dict) -> str:
+    """Leesbare filteromschrijving, bijv. 'Country=DE/NL, maand=3'."""
+    return ", ".join(f"{k}={'/'.join(str(w) for w in v)}" for k, v in filters.items())
 
 
-# --- Dynamisch filteren op basis van vraag ---
+def _bereken_gefilterde_context(df: pd.DataFrame, filters: dict, index: dict | None = None) -> str:
+    """KPI-analyse op de gefilterde selectie als contexttekst.
 
-# Land-naam mapping (Nederlands/Engels/Italiaans -> waarde in data)
-_LAND_ALIASSEN = {
-    "nederland": ["NL", "Netherlands", "Nederland"],
-    "belgie": ["BE", "Belgium", "Belgie"],
-    "duitsland": ["DE", "Germany", "Duitsland", "Deutschland"],
-    "frankrijk": ["FR", "France", "Frankrijk"],
-    "italie": ["IT", "Italy", "Italie", "Italia"],
-    "spanje": ["ES", "Spain", "Spanje", "Espana"],
-    "portugal": ["PT", "Portugal"],
-    "oostenrijk": ["AT", "Austria", "Oostenrijk"],
-    "zwitserland": ["CH", "Switzerland", "Zwitserland"],
-    "polen": ["PL", "Poland", "Polen"],
-    "tsjechie": ["CZ", "Czech", "Tsjechie"],
-    "denemarken": ["DK", "Denmark", "Denemarken"],
-    "zweden": ["SE", "Sweden", "Zweden"],
-    "noorwegen": ["NO", "Norway", "Noorwegen"],
-    "finland": ["FI", "Finland"],
-    "engeland": ["GB", "UK", "England", "Engeland", "United Kingdom", "Groot-Brittannie"],
-    "ierland": ["IE", "Ireland", "Ierland"],
-    "griekenland": ["GR", "Greece", "Griekenland"],
-    "hongarije": ["HU", "Hungary", "Hongarije"],
-    "roemenie": ["RO", "Romania", "Roemenie"],
-    "kroatie": ["HR", "Croatia", "Kroatie"],
-    "slovenie": ["SI", "Slovenia", "Slovenie"],
-    "slowakije": ["SK", "Slovakia", "Slowakije"],
-    "bulgarije": ["BG", "Bulgaria", "Bulgarije"],
-    "litouwen": ["LT", "Lithuania", "Litouwen"],
-    "letland": ["LV", "Latvia", "Letland"],
-    "estland": ["EE", "Estonia", "Estland"],
-    "luxemburg": ["LU", "Luxembourg", "Luxemburg"],
-}
-
-_MAAND_NAMEN = {
-    "januari": 1, "februari": 2, "maart": 3, "april": 4,
-    "mei": 5, "juni": 6, "juli": 7, "augustus": 8,
-    "september": 9, "oktober": 10, "november": 11, "december": 12,
-    "january": 1, "february": 2, "march": 3, "may": 5,
-    "june": 6, "july": 7, "august": 8, "october": 10,
-    "jan": 1, "feb": 2, "mrt": 3, "apr": 4,
-    "jun": 6, "jul": 7, "aug": 8, "sep": 9, "okt": 10, "nov": 11, "dec": 12,
-}
-
-
-def _detecteer_filters(vraag: str, df: pd.DataFrame) -> dict:
-    """Detecteer land, maand, klant, carrier, salesarea uit de vraagtekst."""
-    vraag_lower = vraag.lower()
-    filters = {}
-
-    # Land detectie
-    if "Country" in df.columns:
-        landen_in_data = set(str(l).upper() for l in df["Country"].dropna().unique())
-
-        # Bouw reverse-mapping: alias -> ISO-code
-        alias_naar_code = {}
-        for _, aliassen in _LAND_ALIASSEN.items():
-            # Eerste waarde in lijst is de ISO-code
-            iso_code = aliassen[0].upper()
-            for alias in aliassen:
-                alias_naar_code[alias.lower()] = iso_code
-
-        # Zoek langste match eerst (voorkom dat "IT" in "Italie" matcht op "IT" als land)
-        alle_aliassen = sorted(alias_naar_code.keys(), key=len, reverse=True)
-        for alias in alle_aliassen:
-            if alias in vraag_lower:
-                code = alias_naar_code[alias]
-                if code in landen_in_data:
-                    filters["Country"] = code
-                    break
-
-    # Maand detectie
-    maand_nr = None
-    for naam, nr in _MAAND_NAMEN.items():
-        if naam in vraag_lower:
-            maand_nr = nr
-            break
+    index: analyse-index van df (bouw_analyse_index); herhaalde filters komen uit zijn cache.
+    """
+    analyse = gefilterde_analyse(index if index is not None else bouw_analyse_index(df), filters)
+    filter_tekst = _filter_tekst(filters)
 
-    # Jaar detectie
-    import re
-    jaar_match = re.search(r"20\d{2}", vraag)
-    jaar = int(jaar_match.group()) if jaar_match else None
-
-    if maand_nr:
-        filters["maand"] = maand_nr
-        filters["jaar"] = jaar  # kan None zijn
-
-    # Klant detectie
-    if "ChainName" in df.columns:
-        klanten = df["ChainName"].dropna().unique().tolist()
-        for klant in klanten:
-            if str(klant).lower() in vraag_lower:
-                filters["ChainName"] = klant
-                break
-
-    # Carrier detectie
-    if "Carrier" in df.columns:
-        carriers = df["Carrier"].dropna().unique().tolist()
-        for carrier in carriers:
-            if str(carrier).lower() in vraag_lower:
-                filters["Carrier"] = carrier
-                break
-
-    # SalesArea detectie
-    if "SalesArea" in df.columns:
-        areas = df["SalesArea"].dropna().unique().tolist()
-        for area in areas:
-            if str(area).lower() in vraag_lower:
-                filters["SalesArea"] = area
-                break
-
-    return filters
-
-
-def _filter_df(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
-    """Pas gedetecteerde filters toe op het dataframe."""
-    df_f = df.copy()
-
-    for kolom in ["Country", "ChainName", "Carrier", "SalesArea"]:
-        if kolom in filters and kolom in df_f.columns:
-            df_f = df_f[df_f[kolom] == filters[kolom]]
-
-    if "maand" in filters and "RequestedDeliveryDateFinal" in df_f.columns:
-        datum = pd.to_datetime(df_f["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
-        mask = datum.dt.month == filters["maand"]
-        if filters.get("jaar"):
-            mask = mask & (datum.dt.year == filters["jaar"])
-        df_f = df_f[mask]
-
-    return df_f
-
-
-def _bereken_gefilterde_context(df: pd.DataFrame, filters: dict) -> str:
-    """Bereken volledige KPI-analyse op gefilterd dataframe."""
-    df_f = _filter_df(df, filters)
-
-    if len(df_f) == 0:
-        filter_tekst = ", ".join(f"{k}={v}" for k, v in filters.items())
+    if analyse["aantal"] == 0:
         return f"GEFILTERDE ANALYSE ({filter_tekst}):\nGeen orders gevonden voor deze filters."
 
-    filter_tekst = ", ".join(f"{k}={v}" for k, v in filters.items())
-    otd = bereken_otd(df_f)
-    scores = bereken_kpi_scores(df_f)
-    rc = root_cause_samenvatting(df_f)
-
     regels = [
         f"GEFILTERDE ANALYSE ({filter_tekst}):",
-        f"Aantal orders: {len(df_f)}",
-        f"OTD: {otd:.1f}%",
+        f"Aantal orders: {analyse['aantal']}",
+        f"OTD: {analyse['otd']:.1f}%",
         "",
         "Performances:",
     ]
     for kpi_id in BESCHIKBARE_IDS:
-        score = scores.get(kpi_id)
+        score = analyse["scores"].get(kpi_id)
         naam = PERFORMANCE_NAMEN.get(kpi_id, kpi_id)
         if score is not None:
             regels.append(f"  - {naam}: {score:.1f}%")
 
+    rc = analyse["root_causes"]
     if not rc.empty:
         regels.append("")
         regels.append("Root causes (te late orders):")
-        for _, rij in rc.head(5).iterrows():
+        for _, rij in rc.iterrows():
             regels.append(f"  - {rij['root_cause_naam']}: {rij['aantal']}x ({rij['percentage']:.1f}%)")
 
     # Top 5 slechtste klanten in deze selectie
-    if "ChainName" in df_f.columns and df_f["ChainName"].nunique() > 1:
+    if analyse["klanten"] is not None:
         regels.append("")
         regels.append("Slechtste 5 klanten (OTD):")
-        klant_otd = []
-        for klant, groep in df_f.groupby("ChainName"):
-            klant_otd.append({"klant": klant, "otd": bereken_otd(groep), "n": len(groep)})
-        klant_otd.sort(key=lambda x: x["otd"])
-        for k in klant_otd[:5]:
-            regels.append(f"  - {k['klant']}: {k['otd']:.1f}% ({k['n']} orders)")
-
-    # Top carriers in deze selectie
-    if "Carrier" in df_f.columns and df_f["Carrier"].nunique() > 1:
+        for _, k in analyse["klanten"].iterrows():
+            regels.append(f"  - {k['ChainName']}: {k['otd']:.1f}% ({k['n']} orders)")
+
+    # Carriers in deze selectie
+    if analyse["carriers"] is not None:
         regels.append("")
         regels.append("OTD per carrier:")
-        for carrier, groep in df_f.groupby("Carrier"):
-            regels.append(f"  - {carrier}: {bereken_otd(groep):.1f}% ({len(groep)} orders)")
+        for _, c in analyse["carriers"].iterrows():
+            regels.append(f"  - {c['Carrier']}: {c['otd']:.1f}% ({c['n']} orders)")
 
     return "\n".join(regels)
 
 
-def _stel_vraag(vraag: str, context: str, geschiedenis: list[dict],
-                df: pd.DataFrame | None = None) -> str:
-    """Stel een vraag aan de LLM, met dynamisch gefilterde data-context."""
-    client = _get_llm_client()
-    if client is None:
-        return "LLM niet beschikbaar. Stel OPENROUTER_API_KEY in als environment variabele."
+def _stel_vraag_stream(vraag: str, context: str, geschiedenis: list[dict],
+                       df: pd.DataFrame | None = None, index: dict | None = None,
+                       analyse_index: dict | None = None) -> Iterator[str]:
+    """Beantwoord een vraag token voor token: cijfervragen lokaal, de rest via de LLM
+    met dynamisch gefilterde data-context.
 
-    rekenmodel = toon_config_tekst()
-    feedback = feedback_als_tekst()
+    Lokaal alleen zonder geschiedenis: een vervolgvraag kan filters uit eerdere vragen
+    bedoelen, die de LLM wel ziet.
 
+    index en analyse_index: entiteit- en analyse-index van df, één keer per sessie gebouwd.
+    """
     # Dynamisch filteren: detecteer land/maand/klant in de vraag
     gefilterd = ""
     if df is not None:
-        filters = _detecteer_filters(vraag, df)
+        filters, posities = _detecteer_filters(vraag, df, index)
+        if analyse_index is None:
+            analyse_index = bouw_analyse_index(df)
+        # Cijfervragen (OTD, ranglijsten, root causes) direct uit de analyse-engine
+        antwoord = lokaal_antwoord(vraag, filters, analyse_index, posities) if not geschiedenis else None
+        if antwoord is not None:
+            yield antwoord
+            return
         if filters:
-            gefilterd = _bereken_gefilterde_context(df, filters)
-
-    berichten = [
-        {"role": "system", "content": SYSTEM_PROMPT.format(
-            context=context,
-            rekenmodel=rekenmodel,
-            feedback=feedback,
-            gefilterd=gefilterd,
-        )},
-    ]
-    for bericht in geschiedenis[-10:]:
-        berichten.append(bericht)
-    berichten.append({"role": "user", "content": vraag})
+            gefilterd = _bereken_gefilterde_context(df, filters, analyse_index)
+
+    cfg = _llm_config()
+    if cfg is None:
+        yield "LLM niet beschikbaar. Stel OPENROUTER_API_KEY in als environment variabele."
+        return
+
+    rekenmodel = toon_config_tekst()
+    feedback = feedback_als_tekst()
+
+    # Secties op prioriteit binnen het tokenbudget; oudere geschiedenis samengevat
+    berichten = bouw_berichten(
+        SYSTEM_PROMPT,
+        {"context": context, "rekenmodel": rekenmodel, "feedback": feedback, "gefilterd": gefilterd},
+        geschiedenis,
+        vraag,
+    )
 
     try:
-        response = client.chat.completions.create(
-            model=_get_model(),
-            messages=berichten,
-            max_tokens=1024,
-            temperature=0.3,
-        )
-        return response.choices[0].message.content
+        yield from stream_antwoord(cfg, berichten)
     except Exception as e:
-        return f"Fout bij LLM-aanroep: {e}"
+        yield f"Fout bij LLM-aanroep: {foutmelding(e)}"
+
+
+def _print_stream(stukken: Iterator[str]) -> str:
+    """Print tokens zodra ze binnenkomen en geef het volledige antwoord terug."""
+    antwoord = []
+    for stuk in stukken:
+        antwoord.append(stuk)
+        # Veilig printen voor Windows terminal (cp1252)
+        try:
+            print(stuk, end="", flush=True)
+        except UnicodeEncodeError:
+            print(stuk.encode("ascii", errors="replace").decode("ascii"), end="", flush=True)
+    print()
+    return "".join(antwoord)
 
 
 # --- Data laden ---
 
-def _lees_bestand(pad: str) -> pd.DataFrame:
-    """Lees een CSV of Excel bestand."""
-    if pad.endswith(".csv"):
-        return pd.read_csv(pad)
-    else:
-        return pd.read_excel(pad)
+def _lees_bestand(pad: str, bron: str) -> pd.DataFrame:
+    """Lees een CSV of Excel bestand, met dtypes uit het typeschema van de bron."""
+    with meet(f"lees_bestand ({os.path.basename(pad)})") as meting:
+        with open(pad, "rb") as bestand:
+            df = lees_bestand(bestand, bron)
+        meting["rijen_uit"] = len(df)
+    return df
 
 
 def _laad_data(data_pad: str, likp_pad: str | None = None) -> pd.DataFrame:
     """Laad en verwerk data. Met LIKP join als opgegeven."""
-    df_raw = _lees_bestand(data_pad)
+    df_raw = _lees_bestand(data_pad, "datagrid")
     df = valideer_datagrid(df_raw)
     if df is None:
         print("FOUT: Datagrid validatie mislukt.")
@@ -393,7 +269,7 @@ def _laad_data(data_pad: str, likp_pad: str | None = None) -> pd.DataFrame:
         print(f"Dedup: {n_voor} -> {n_na} unieke leveringen ({n_voor - n_na} duplicaten verwijderd)")
 
     if likp_pad:
-        df_likp_raw = _lees_bestand(likp_pad)
+        df_likp_raw = _lees_bestand(likp_pad, "likp")
         df_likp = valideer_likp(df_likp_raw)
         if df_likp is None:
             print("FOUT: LIKP validatie mislukt.")
@@ -445,10 +321,14 @@ def _cmd_correctie(geschiedenis: list[dict]):
 
 
 def _cmd_valideer(df: pd.DataFrame):
-    """Voer kruisvalidatie uit en print resultaat."""
+    """Voer kruisvalidatie + data quality uit (één doorloop) en print het rapport."""
+    rapport = validatie_rapport(df)
+    for melding in rapport["meldingen"]:
+        print(melding.replace("⚠️", "WARN"))
+
     print("\nKruisvalidatie Python vs PowerBI:")
     print("-" * 70)
-    kv = kruisvalidatie(df)
+    kv = kruisvalidatie_tabel(rapport)
     if kv.empty:
         print("Geen kruisvalidatie mogelijk — controleer rekenmodel.yaml configuratie.")
     else:
@@ -456,9 +336,32 @@ def _cmd_valideer(df: pd.DataFrame):
             py_pct = f"{rij['Python %']:.2f}%" if pd.notna(rij['Python %']) else "-"
             pb_pct = f"{rij['PowerBI kolom %']:.2f}%" if pd.notna(rij['PowerBI kolom %']) else "-"
             verschil = f"{rij['Verschil']:.2f}%" if pd.notna(rij['Verschil']) else "-"
+            eens = f"{rij['Eens %']:.2f}%" if pd.notna(rij['Eens %']) else "-"
             # Vervang emoji's door ASCII voor Windows terminal compatibiliteit
             status = rij['Status'].replace("✅", "OK").replace("⚠️", "WARN").replace("❌", "FAIL")
-            print(f"  {rij['KPI']:25s}  Python: {py_pct:>8s}  PowerBI: {pb_pct:>8s}  Verschil: {verschil:>7s}  {status}")
+            print(f"  {rij['KPI']:25s}  Python: {py_pct:>8s}  PowerBI: {pb_pct:>8s}  Verschil: {verschil:>7s}  Eens: {eens:>8s}  {status}")
+
+    # Afwijkingen per order (alleen KPI's met oneens > 0)
+    for kpi in rapport["kpis"]:
+        afwijkingen = kpi["afwijkingen"]
+        if afwijkingen is not None and len(afwijkingen) > 0:
+            print(f"\n  {kpi['naam']}: {len(afwijkingen)} afwijkende orders (rij = Python, kolom = PowerBI)")
+            for regel in kpi["confusie"].to_string().splitlines():
+                print(f"    {regel}")
+            for reden, aantal in afwijkingen["Reden"].value_counts().items():
+                if aantal > 0:
+                    print(f"    Reden: {reden} ({aantal})")
+
+    print("\nData quality:")
+    print("-" * 70)
+    print(f"  Totaal orders: {rapport['totaal_orders']}")
+    print(f"  NO POD:        {rapport['no_pod']['count']} ({rapport['no_pod']['pct']:.1f}%)")
+    print(f"  Duplicaten:    {rapport['duplicaten']['duplicaten']} ({rapport['duplicaten']['uniek']} uniek)")
+    for kolom, info in rapport["missing"].items():
+        if info["count"] > 0:
+            print(f"  Missend {kolom}: {info['count']} ({info['pct']:.1f}%)")
+    for info in rapport["nan_performances"].values():
+        print(f"  NaN {info['naam']}: {info['count']} ({info['pct']:.1f}%)")
     print()
 
 
@@ -480,8 +383,7 @@ Alles anders wordt als vraag aan de LLM gestuurd.
 def _cmd_quiz(context: str, geschiedenis: list[dict]):
     """Genereer een quizvraag."""
     print("\nQuizvraag wordt gegenereerd...\n")
-    antwoord = _stel_vraag(QUIZ_PROMPT, context, geschiedenis)
-    print(antwoord)
+    _print_stream(_stel_vraag_stream(QUIZ_PROMPT, context, geschiedenis))
     print()
 
 
@@ -491,10 +393,31 @@ def main():
     parser = argparse.ArgumentParser(description="OTD Analist — interactieve CLI")
     parser.add_argument("--data", required=True, help="Pad naar Datagrid Excel/CSV")
     parser.add_argument("--likp", default=None, help="Optioneel: pad naar LIKP Excel/CSV")
+    parser.add_argument(
+        "--profile", nargs="?", const="", default=None, metavar="JSON",
+        help="Meet tijd, CPU, rijen en piekgeheugen per stap; optioneel exporteren naar JSON-pad",
+    )
     args = parser.parse_args()
 
+    profiel = nieuw_profiel("analist", geheugen=True) if args.profile is not None else None
+    with profiel_actief(profiel):
+        _sessie(args)
+
+    if profiel is not None:
+        print("\nProfiel:")
+        print(profiel_als_tekst(profiel))
+        if args.profile:
+            with open(args.profile, "w", encoding="utf-8") as f:
+                f.write(profiel_als_json(profiel))
+            print(f"Profiel opgeslagen: {args.profile}")
+
+
+def _sessie(args: argparse.Namespace):
+    """Laad data en draai de interactieve chat-loop."""
     print("Data laden...")
-    df = _laad_data(args.data, args.likp)
+    with meet("Data laden") as meting:
+        df = _laad_data(args.data, args.likp)
+        meting["rijen_uit"] = len(df)
     print(f"{len(df)} orders geladen.\n")
 
     # Toon samenvatting
@@ -508,13 +431,16 @@ def main():
             print(f"  {naam}: {score:.1f}%")
     print()
 
-    context = _bereid_context_voor(df)
+    with meet("Context voorbereiden", rijen_in=len(df)):
+        context = _bereid_context_voor(df)
+        entiteiten = bouw_entiteit_index(df)
+        analyses = bouw_analyse_index(df)
     geschiedenis: list[dict] = []
 
     # Check LLM beschikbaarheid
-    if _get_llm_client() is None:
+    if _llm_config() is None:
         print("Let op: OPENROUTER_API_KEY niet ingesteld. LLM-vragen werken niet.")
-        print("Commando's (config, correctie, help, quiz) werken wel.\n")
+        print("Cijfervragen (OTD, ranglijsten, root causes) en commando's (config, correctie, help) werken wel.\n")
 
     print("Type 'help' voor beschikbare commando's, of stel een vraag.")
     print("---")
@@ -546,14 +472,12 @@ def main():
             _cmd_valideer(df)
         else:
             # Vraag aan LLM
-            geschiedenis.append({"role": "user", "content": invoer})
             print()
-            antwoord = _stel_vraag(invoer, context, geschiedenis, df=df)
-            # Veilig printen voor Windows terminal (cp1252)
-            try:
-                print(antwoord)
-            except UnicodeEncodeError:
-                print(antwoord.encode("ascii", errors="replace").decode("ascii"))
+            with meet("Vraag beantwoorden"):
+                antwoord = _print_stream(_stel_vraag_stream(
+                    invoer, context, geschiedenis, df=df, index=entiteiten, analyse_index=analyses,
+                ))
+            geschiedenis.append({"role": "user", "content": invoer})
             geschiedenis.append({"role": "assistant", "content": antwoord})
 
 
@@ -1,13 +1,14 @@
 """OTD Dashboard — On-Time Delivery Rapportage voor Elho B.V."""
 
-from io import BytesIO
-
+import pandas as pd
 import streamlit as st
 
-from src.data.loader import upload_datagrid, upload_likp, laad_action_portal
-from src.data.validator import valideer_datagrid, valideer_likp
-from src.data.processor import join_likp, bereken_performances, dedup_datagrid
-from src.components.filters import render_filters
+from src.data import inname, koppeling, pipeline, register
+from src.data.loader import upload_datagrid, upload_likp, bestand_hash
+from src.data.export import FORMATEN, gecachete_export
+from src.data.geheugen import formatteer_bytes, voeg_koude_kolommen_toe
+from src.config import config_hash, get_geheugen_config, get_inname_config
+from src.components.filters import filter_sleutel, render_filters
 from src.pages.overview import render_overview
 from src.pages.customer_care import render_customer_care
 from src.pages.logistics import render_logistics
@@ -17,7 +18,14 @@ from src.pages.regio import render_regio
 from src.pages.assistent import render_assistent
 from src.pages.validatie import render_validatie
 from src.pages.action_portal import render_action_portal
-from src.utils.date_utils import voeg_periode_kolommen_toe
+from src.pages.slots import render_slots
+from src.components.performance import render_performance_paneel
+from src.utils.profiler import meet, nieuw_profiel, profiel_actief
+
+# Copy-on-write: pagina's en filters kunnen de gedeelde frames uit de registry nooit
+# muteren. Altijd aan vanaf pandas 3.0 (de optie is daar deprecated); pandas 2.x expliciet.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(
     page_title="OTD Dashboard — Elho",
@@ -37,60 +45,190 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Data initialisatie
-if "df" not in st.session_state:
-    st.session_state.df = None
-if "df_mismatches" not in st.session_state:
-    st.session_state.df_mismatches = None
+# Data initialisatie — het verwerkte dataset staat procesbreed in de registry;
+# de sessie bewaart alleen de sleutel.
+if "dataset_sleutel" not in st.session_state:
+    st.session_state.dataset_sleutel = None
+
+# Watch-folder inname: nieuwe exports worden in de achtergrond naar snapshots verwerkt
+inname.start()
+if "inname_versie" not in st.session_state:
+    st.session_state.inname_versie = inname.versie()
+st.session_state.inname_bezig = inname.bezig()
+
+# Action Portal data: nieuwste snapshot (gedeeld tussen sessies)
+action_entry = inname.haal_dataset("action_portal")
+if action_entry is not None:
+    register.koppel(action_entry["sleutel"], rol="action_portal")
+df_action = action_entry["df"] if action_entry is not None else None
+
+
+def _toon_meldingen(meldingen: list[tuple[str, str]]):
+    """Toon meldingen die een achtergrondjob verzamelde."""
+    for niveau, tekst in meldingen:
+        getattr(st, niveau, st.info)(tekst)
+
+
+def _render_stap_tijden(stappen: list[dict]):
+    """Tabel met duur per pipeline-stap."""
+    if stappen:
+        st.dataframe(
+            [{"Stap": s["stap"], "Duur (s)": round(s["sec"], 2)} for s in stappen],
+            hide_index=True,
+        )
+
+
+def _render_schema(schema: dict):
+    """Herkende/hernoemde en onbekende kolommen per bron, plus typeproblemen."""
+    for bron, rapport in schema.items():
+        rijen = [
+            {"Bron": bron, "Kolom in bestand": kolom, "Standaardnaam": standaard, "Methode": rapport["methode"][standaard]}
+            for standaard, kolom in rapport["gevonden"].items()
+            if rapport["methode"][standaard] != "exact"
+        ]
+        if rijen:
+            st.dataframe(rijen, hide_index=True)
+        if rapport["onbekend"]:
+            st.caption(f"{bron}: niet gebruikte kolommen: {', '.join(map(str, rapport['onbekend']))}")
+        problemen = [
+            {"Bron": bron, "Kolom": kolom, "Type": info["type"], "Ongeldig": info["ongeldig"],
+             "Hersteld": info["hersteld"], "Melding": info["melding"],
+             "Voorbeelden": ", ".join(str(v["waarde"]) for v in info["voorbeelden"])}
+            for kolom, info in rapport.get("typen", {}).get("kolommen", {}).items()
+            if info["melding"]
+        ]
+        if problemen:
+            st.dataframe(problemen, hide_index=True)
+
+
+@st.fragment(run_every=1.0)
+def _render_job_voortgang(sleutel: str):
+    """Voortgang van de achtergrondverwerking; ververst zichzelf tot de job klaar is."""
+    job = pipeline.haal_job(sleutel)
+    if job is None:
+        return
+    if job["status"] in ("wachten", "bezig"):
+        st.progress(job["voortgang"], text=f"⏳ {job['stap'] or 'In wachtrij'}…")
+        _render_stap_tijden(job["stappen"])
+    else:
+        # Klaar of fout: volledige rerun pakt het gepubliceerde dataset op
+        st.rerun()
+
+
+@st.fragment(run_every=float(get_inname_config()["interval_sec"]))
+def _volg_inname():
+    """Wissel naar nieuwe snapshots zodra de inname iets nieuws verwerkt heeft (of klaar is met de eerste scan)."""
+    if inname.versie() != st.session_state.inname_versie or (st.session_state.inname_bezig and not inname.bezig()):
+        st.session_state.inname_versie = inname.versie()
+        st.rerun()
 
-# Action Portal data auto-laden
-if "df_action" not in st.session_state:
-    st.session_state.df_action = laad_action_portal()
 
 # Sidebar: twee uploads
 with st.sidebar:
     st.header("📁 Data Upload")
     st.caption("Upload beide bestanden om het dashboard te laden.")
 
-    df_datagrid_raw = upload_datagrid()
-    df_likp_raw = upload_likp()
-
-    if df_datagrid_raw is not None and df_likp_raw is not None:
-        # Cache key: voorkom herverwerking bij elke rerun
-        cache_key = f"{len(df_datagrid_raw)}_{len(df_likp_raw)}"
-        if st.session_state.get("_cache_key") != cache_key:
-            df_dg = valideer_datagrid(df_datagrid_raw)
-            df_lk = valideer_likp(df_likp_raw)
-
-            if df_dg is not None and df_lk is not None:
-                df_dg = dedup_datagrid(df_dg)
-                df_joined, df_mismatches = join_likp(df_dg, df_lk)
-                df_processed = bereken_performances(df_joined)
-                st.session_state.df = voeg_periode_kolommen_toe(df_processed)
-                st.session_state.df_mismatches = df_mismatches
-                st.session_state._cache_key = cache_key
-
-                n_match = len(df_processed) - len(df_mismatches)
-                st.success(f"📊 {len(df_processed)} orders verwerkt — {n_match} LIKP-matches")
+    dg_bestand = upload_datagrid()
+    lk_bestand = upload_likp()
+
+    if dg_bestand is not None and lk_bestand is not None:
+        # Sleutel op inhoud + rekenmodel: dezelfde upload wordt maar één keer verwerkt
+        sleutel = register.inhoud_hash(bestand_hash(dg_bestand), bestand_hash(lk_bestand), config_hash())
+        entry = register.haal(sleutel)
+        job = pipeline.haal_job(sleutel)
+
+        if entry is not None:
+            st.session_state.dataset_sleutel = sleutel
+            if job is not None:
+                _toon_meldingen(job["meldingen"])
+            n_orders = len(entry["df"])
+            n_match = n_orders - len(entry["extra"].get("mismatches", []))
+            st.success(f"📊 {n_orders} orders verwerkt — {n_match} LIKP-matches")
+            if entry["extra"].get("stappen"):
+                with st.expander("⏱️ Verwerkingstijden"):
+                    _render_stap_tijden(entry["extra"]["stappen"])
+            schema = entry["extra"].get("schema", {})
+            if any(r["hernoemd"] or r["onbekend"] or r.get("typen", {}).get("ongeldig") for r in schema.values()):
+                with st.expander("🧾 Kolomherkenning"):
+                    _render_schema(schema)
         else:
-            # Data al verwerkt, toon status
-            if st.session_state.df is not None:
-                st.success(f"📊 {len(st.session_state.df)} orders geladen (gecached)")
+            # Verwerken in de achtergrond; het vorige dataset blijft intussen bruikbaar
+            def _start_verwerking() -> dict:
+                return pipeline.start_job(
+                    sleutel,
+                    dg_bestand.getvalue(), dg_bestand.name,
+                    lk_bestand.getvalue(), lk_bestand.name,
+                    geheugen=st.session_state.get("profiler_geheugen", False),
+                )
 
-    elif df_datagrid_raw is not None:
+            if job is None or job["status"] == "klaar":
+                job = _start_verwerking()
+            if job["status"] == "fout":
+                _toon_meldingen(job["meldingen"])
+                st.error(f"❌ Verwerking mislukt: {job['fout']}")
+                # Een mislukte job blijft staan tot iemand hem opnieuw start (bijv. na een tijdelijke fout)
+                if st.button("🔄 Opnieuw verwerken", key="verwerking_opnieuw"):
+                    _start_verwerking()
+                    st.rerun()
+            else:
+                _render_job_voortgang(sleutel)
+                if st.session_state.dataset_sleutel is not None:
+                    st.caption("Het vorige dataset blijft beschikbaar tot de verwerking klaar is.")
+
+    elif dg_bestand is not None:
         st.info("⏳ Upload ook het LIKP bestand om te beginnen.")
-    elif df_likp_raw is not None:
+    elif lk_bestand is not None:
         st.info("⏳ Upload ook het Datagrid bestand om te beginnen.")
+    else:
+        # Geen upload: nieuwste verwerkte dataset uit de drop-map
+        map_entry = inname.haal_dataset("otd")
+        if map_entry is not None:
+            st.session_state.dataset_sleutel = map_entry["sleutel"]
+            meta = inname.actueel("otd")
+            st.success(f"📂 {len(map_entry['df'])} orders uit de drop-map ({meta['datum'][:16].replace('T', ' ')})")
+
+    if st.session_state.inname_bezig:
+        st.info("⏳ Inname bezig: de bewaakte mappen worden voor het eerst gescand. Nieuwe data verschijnt vanzelf.")
+    if get_inname_config()["aan"]:
+        _volg_inname()
+
+    dataset = register.haal(st.session_state.dataset_sleutel)
+    if dataset is not None:
+        register.koppel(dataset["sleutel"])
+    df_data = dataset["df"] if dataset is not None else None
+    # Sleutel van de data zoals de pagina's hem zien (dataset, eventueel met Action Portal koppeling)
+    data_sleutel = (dataset["sleutel"], None) if dataset is not None else None
+    # Koppeling met de Action Portal: slot-kolommen + slot_ok in de first-failure keten
+    if dataset is not None and action_entry is not None:
+        df_gekoppeld = koppeling.gekoppeld(dataset["sleutel"], action_entry["sleutel"])
+        if df_gekoppeld is not None:
+            df_data = df_gekoppeld
+            data_sleutel = (dataset["sleutel"], action_entry["sleutel"])
+    df_mismatches = dataset["extra"].get("mismatches") if dataset is not None else None
 
     # LIKP Mismatch rapport
-    if st.session_state.df_mismatches is not None and len(st.session_state.df_mismatches) > 0:
-        n_mis = len(st.session_state.df_mismatches)
+    if df_mismatches is not None and len(df_mismatches) > 0:
+        n_mis = len(df_mismatches)
         with st.expander(f"⚠️ {n_mis} leveringen zonder LIKP-match"):
             st.caption("Deze DeliveryNumbers uit de Datagrid hebben geen match in LIKP.")
-            st.dataframe(st.session_state.df_mismatches, hide_index=True)
+            st.dataframe(df_mismatches, hide_index=True)
+
+    # Geheugengebruik: gedeelde datasets tellen één keer, ongeacht het aantal sessies
+    sessie_bytes = sum(e["bytes"] for e in [dataset, action_entry] if e is not None)
+    if sessie_bytes:
+        budget_mb = get_geheugen_config().get("budget_mb", 0)
+        reg = register.statistiek()
+        tekst = (
+            f"💾 Geheugen sessie: {formatteer_bytes(sessie_bytes)} "
+            f"— proces: {formatteer_bytes(reg['bytes'])} in {reg['datasets']} dataset(s)"
+        )
+        if budget_mb and sessie_bytes > budget_mb * 1024 * 1024:
+            st.warning(f"{tekst} — boven budget van {budget_mb} MB")
+        else:
+            st.caption(tekst + (f" (budget {budget_mb} MB)" if budget_mb else ""))
 
 # Pagina navigatie — Action Portal altijd beschikbaar
-pagina_opties = ["Overzicht", "Customer Care", "Logistiek", "Regio", "Root-Cause", "Trends", "Validatie", "Assistent", "Action Portal"]
+pagina_opties = ["Overzicht", "Customer Care", "Logistiek", "Regio", "Root-Cause", "Trends", "Validatie", "Assistent", "Action Portal", "OTD × Slots"]
 pagina = st.radio(
     "Navigatie",
     pagina_opties,
@@ -100,80 +238,118 @@ pagina = st.radio(
 
 st.markdown("---")
 
-# Action Portal heeft eigen data en filters — geen upload nodig
-if pagina == "Action Portal":
-    if st.session_state.df_action is not None:
-        render_action_portal(st.session_state.df_action)
-    else:
-        st.warning("Geen Action Portal data gevonden. Controleer of er AppointmentReport bestanden staan in de action-portal-scraper downloads map.")
-    st.stop()
-
-# Overige pagina's: Datagrid + LIKP data vereist
-if st.session_state.df is None:
-    st.info("Upload de Datagrid (PowerBI) en LIKP (SAP) bestanden via de sidebar om te beginnen.")
-    st.markdown("---")
-    st.markdown("""
-    ### Verwacht formaat
-
-    **Datagrid** (PowerBI export):
-    | Kolom | Beschrijving |
-    |---|---|
-    | `DeliveryNumber` | Leveringsnummer (join key met LIKP) |
-    | `SAP Delivery Date` | Geplande leverdatum in SAP |
-    | `RequestedDeliveryDateFinal` | Door klant gewenste leverdatum |
-    | `PODDeliveryDateShipment` | Proof of Delivery datum |
-    | `PERFORMANCE_CAPACITY` | "moved" / "not moved" |
-    | `PERFORMANCE_LOGISTIC` | "On schedule" / etc. |
-
-    **Optioneel:** ChainName, Country, SalesArea, Carrier, ReasonCodeLatesCorrected, CommentLateOrders
-
-    ---
-
-    **LIKP** (SAP SE16n):
-    | Kolom | Beschrijving |
-    |---|---|
-    | `Levering` | Leveringsnummer (join key) |
-    | `Leveringstermijn` | Geplande leverdatum TMS |
-    | `Pickdatum` | Geplande pickdatum |
-
-    **Optioneel:** Gecreëerd op
-    """)
-    st.stop()
-
-# Filters toepassen
-df_filtered = render_filters(st.session_state.df)
-
-if len(df_filtered) == 0:
-    st.warning("Geen orders gevonden voor de geselecteerde filters.")
-    st.stop()
-
-# Excel export knop
-def _maak_excel(df):
-    output = BytesIO()
-    with __import__("pandas").ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="OTD Data")
-    return output.getvalue()
-
-st.download_button(
-    "📥 Download gefilterde data (Excel)",
-    data=_maak_excel(df_filtered),
-    file_name="otd_export.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+
+def _render_pagina(pagina: str):
+    """Render de gekozen pagina (Action Portal of een OTD-pagina)."""
+    # Action Portal heeft eigen data en filters — geen upload nodig
+    if pagina == "Action Portal":
+        if df_action is not None:
+            meta = inname.historie("action_portal")
+            if meta is not None:
+                st.caption(
+                    f"Historie uit {len(meta['rapporten'])} AppointmentReport(s), "
+                    f"{meta['van']} t/m {meta['datum']} — {meta['rijen']:,} unieke shipments"
+                )
+            render_action_portal(df_action, action_entry["sleutel"])
+        elif st.session_state.inname_bezig:
+            st.info("⏳ Inname bezig: de AppointmentReports worden ingelezen. De pagina ververst zodra ze klaar zijn.")
+        else:
+            st.warning(
+                "Geen Action Portal data gevonden. Controleer de bron onder action_portal in rekenmodel.yaml "
+                "(map, archief, parquet of database) en of daar AppointmentReports staan."
+            )
+            for fout in inname.status()["fouten"][-3:]:
+                st.caption(f"Inname: {fout}")
+        return
+
+    # Overige pagina's: Datagrid + LIKP data vereist
+    if df_data is None:
+        st.info("Upload de Datagrid (PowerBI) en LIKP (SAP) bestanden via de sidebar om te beginnen.")
+        st.markdown("---")
+        st.markdown("""
+        ### Verwacht formaat
+
+        **Datagrid** (PowerBI export):
+        | Kolom | Beschrijving |
+        |---|---|
+        | `DeliveryNumber` | Leveringsnummer (join key met LIKP) |
+        | `SAP Delivery Date` | Geplande leverdatum in SAP |
+        | `RequestedDeliveryDateFinal` | Door klant gewenste leverdatum |
+        | `PODDeliveryDateShipment` | Proof of Delivery datum |
+        | `PERFORMANCE_CAPACITY` | "moved" / "not moved" |
+        | `PERFORMANCE_LOGISTIC` | "On schedule" / etc. |
+
+        **Optioneel:** ChainName, Country, SalesArea, Carrier, ReasonCodeLatesCorrected, CommentLateOrders
+
+        ---
+
+        **LIKP** (SAP SE16n):
+        | Kolom | Beschrijving |
+        |---|---|
+        | `Levering` | Leveringsnummer (join key) |
+        | `Leveringstermijn` | Geplande leverdatum TMS |
+        | `Pickdatum` | Geplande pickdatum |
+
+        **Optioneel:** Gecreëerd op
+        """)
+        return
+
+    # Filters toepassen
+    with meet("Filters", rijen_in=len(df_data)) as meting:
+        df_filtered = render_filters(df_data)
+        meting["rijen_uit"] = len(df_filtered)
+
+    if len(df_filtered) == 0:
+        st.warning("Geen orders gevonden voor de geselecteerde filters.")
+        return
+
+    # Export: pas bij klikken gemaakt en gecachet per dataset + filterstatus
+    formaat = st.sidebar.selectbox(
+        "Exportformaat", list(FORMATEN), format_func=lambda f: FORMATEN[f]["label"], key="export_formaat",
+    )
+    # data_sleutel, niet alleen de dataset: met Action Portal koppeling heeft het frame slot-kolommen
+    export_sleutel = (data_sleutel, filter_sleutel())
+    st.download_button(
+        f"📥 Download gefilterde data ({FORMATEN[formaat]['label']})",
+        data=lambda: gecachete_export(
+            export_sleutel,
+            lambda: voeg_koude_kolommen_toe(df_filtered, bron=df_data),
+            formaat,
+        ),
+        file_name=f"otd_export.{FORMATEN[formaat]['extensie']}",
+        mime=FORMATEN[formaat]["mime"],
+        on_click="ignore",
+    )
+
+    if pagina == "Overzicht":
+        render_overview(df_filtered)
+    elif pagina == "Customer Care":
+        render_customer_care(df_filtered)
+    elif pagina == "Logistiek":
+        render_logistics(df_filtered)
+    elif pagina == "Regio":
+        render_regio(df_filtered)
+    elif pagina == "Root-Cause":
+        render_root_cause(df_filtered)
+    elif pagina == "Trends":
+        render_trends(df_filtered)
+    elif pagina == "Validatie":
+        render_validatie(df_filtered)
+    elif pagina == "Assistent":
+        render_assistent(df_filtered, (data_sleutel, filter_sleutel()))
+    elif pagina == "OTD × Slots":
+        render_slots(df_filtered)
+
+
+# Render de pagina — met profiler als die aanstaat in het Performance-paneel
+profiel = (
+    nieuw_profiel(f"Pagina {pagina}", geheugen=st.session_state.get("profiler_geheugen", False))
+    if st.session_state.get("profiler_aan") else None
 )
+with profiel_actief(profiel), meet(f"Render {pagina}"):
+    _render_pagina(pagina)
 
-if pagina == "Overzicht":
-    render_overview(df_filtered)
-elif pagina == "Customer Care":
-    render_customer_care(df_filtered)
-elif pagina == "Logistiek":
-    render_logistics(df_filtered)
-elif pagina == "Regio":
-    render_regio(df_filtered)
-elif pagina == "Root-Cause":
-    render_root_cause(df_filtered)
-elif pagina == "Trends":
-    render_trends(df_filtered)
-elif pagina == "Validatie":
-    render_validatie(df_filtered)
-elif pagina == "Assistent":
-    render_assistent(df_filtered)
+render_performance_paneel([
+    profiel,
+    dataset["extra"].get("profiel") if dataset is not None else None,
+])
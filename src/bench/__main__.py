@@ -0,0 +1,155 @@
+"""Benchmark van de verwerkingspipeline op synthetische data.
+
+Meet inlezen, validatie, dedup, LIKP-join, performances, root causes, scorecards
+en exports met de profiler, en vergelijkt de tijden met drempels.yaml
+(seconden per 100k Datagrid-rijen). Exitcode 1 bij een regressie.
+
+Vóór de meting draait de pipeline één keer op OPWARM_RIJEN rijen (buiten het
+profiel): lazy imports, regex-compilatie en eerste aanroepen zijn vaste kosten
+die anders lineair naar 100k opgeschaald worden en kleine runs laten afgaan.
+
+Gebruik:
+    python -m src.bench                        # 100k rijen, csv
+    python -m src.bench --rijen 1000000 --zonder-excel
+    python -m src.bench --opslaan bench.json   # profiel als JSON bewaren
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from src.bench.synthetisch import genereer, schrijf
+from src.data.export import exporteer
+from src.data.loader import lees_bestand
+from src.data.processor import (
+    bereken_performances,
+    bereken_root_causes,
+    bouw_trend_matrix,
+    dedup_datagrid,
+    groepeer_per_periode,
+    join_likp,
+)
+from src.data.validator import valideer_datagrid, valideer_likp, verzamel_meldingen
+from src.utils.date_utils import voeg_periode_kolommen_toe
+from src.utils.profiler import meet, nieuw_profiel, profiel_actief, profiel_als_json, profiel_als_tekst
+
+DREMPELS_PAD = Path(__file__).with_name("drempels.yaml")
+
+# Rijen voor de opwarmrun (niet gemeten)
+OPWARM_RIJEN = 2_000
+
+
+def laad_drempels(pad: str | Path = DREMPELS_PAD) -> dict[str, float]:
+    """Drempels per stap in seconden per 100k rijen."""
+    with open(pad, encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get("sec_per_100k", {})
+
+
+def draai(dg_pad: Path, lk_pad: Path, excel: bool = True) -> None:
+    """Voer alle stappen één keer uit; tijden komen in het actieve profiel."""
+    with open(dg_pad, "rb") as dg_bestand, open(lk_pad, "rb") as lk_bestand:
+        with meet("Inlezen") as m:
+            df_dg = lees_bestand(dg_bestand, "datagrid")
+            df_lk = lees_bestand(lk_bestand, "likp")
+            m["rijen_uit"] = len(df_dg)
+
+    with verzamel_meldingen(), meet("Validatie", len(df_dg)):
+        df_dg = valideer_datagrid(df_dg)
+        df_lk = valideer_likp(df_lk)
+    if df_dg is None or df_lk is None:
+        raise RuntimeError("Validatie van synthetische data mislukt")
+
+    with meet("Dedup", len(df_dg)):
+        df_dg = dedup_datagrid(df_dg)
+
+    with meet("LIKP-join", len(df_dg)):
+        df, _ = join_likp(df_dg, df_lk)
+
+    with meet("Performances", len(df)):
+        df = bereken_performances(df)
+        df = voeg_periode_kolommen_toe(df)
+
+    with meet("Root causes", len(df)) as m:
+        m["rijen_uit"] = len(bereken_root_causes(df))
+
+    with meet("Scorecards", len(df)):
+        groepeer_per_periode(df, "week")
+        groepeer_per_periode(df, "maand")
+        for dimensie in ["SalesArea", "ChainName", "Carrier"]:
+            bouw_trend_matrix(df, "week", dimensie)
+
+    for formaat in ["csv.gz", "parquet"] + (["xlsx"] if excel else []):
+        with meet(f"Export {formaat}", len(df)):
+            exporteer(df, formaat)
+
+
+def opwarmen(uit: Path, formaat: str, excel: bool, seed: int) -> None:
+    """Draai de pipeline één keer op een kleine dataset, buiten het profiel."""
+    datagrid, likp = genereer(OPWARM_RIJEN, seed=seed)
+    dg_pad, lk_pad = schrijf(datagrid, likp, uit / "opwarmen", formaat)
+    draai(dg_pad, lk_pad, excel=excel)
+
+
+def tijden_per_stap(profiel: dict) -> dict[str, float]:
+    """Wandtijd per hoofdstap (niveau 0) uit een profiel."""
+    return {m["stap"]: m["wand_sec"] for m in profiel["metingen"] if m["niveau"] == 0}
+
+
+def vergelijk(tijden: dict[str, float], rijen: int, drempels: dict[str, float]) -> list[str]:
+    """Regressies: stappen waarvan sec/100k rijen boven de drempel ligt."""
+    schaal = max(rijen, 1) / 100_000
+    return [
+        f"{naam}: {sec / schaal:.2f} s/100k > drempel {drempels[naam]:.2f}"
+        for naam, sec in tijden.items()
+        if naam in drempels and sec / schaal > drempels[naam]
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark OTD-pipeline op synthetische data")
+    parser.add_argument("--rijen", type=int, default=100_000)
+    parser.add_argument("--formaat", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data", help="Map voor gegenereerde bestanden (standaard tijdelijk)")
+    parser.add_argument("--zonder-excel", action="store_true", help="Sla de Excel-export over")
+    parser.add_argument("--geheugen", action="store_true", help="Meet ook piekgeheugen (trager)")
+    parser.add_argument("--drempels", default=str(DREMPELS_PAD))
+    parser.add_argument("--opslaan", metavar="JSON", help="Schrijf het profiel naar JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uit = Path(args.data or tmp)
+        print(f"Genereren: {args.rijen} rijen ({args.formaat})...")
+        datagrid, likp = genereer(args.rijen, seed=args.seed)
+        dg_pad, lk_pad = schrijf(datagrid, likp, uit, args.formaat)
+        del datagrid, likp
+
+        print(f"Opwarmen: {OPWARM_RIJEN} rijen...")
+        opwarmen(uit, args.formaat, excel=not args.zonder_excel, seed=args.seed)
+
+        profiel = nieuw_profiel(f"Benchmark {args.rijen} rijen", geheugen=args.geheugen)
+        with profiel_actief(profiel):
+            draai(dg_pad, lk_pad, excel=not args.zonder_excel)
+
+    print(profiel_als_tekst(profiel))
+    if args.opslaan:
+        Path(args.opslaan).write_text(profiel_als_json(profiel), encoding="utf-8")
+        print(f"Profiel opgeslagen: {args.opslaan}")
+
+    regressies = vergelijk(tijden_per_stap(profiel), args.rijen, laad_drempels(args.drempels))
+    if regressies:
+        print("\nREGRESSIE:")
+        for regel in regressies:
+            print(f"  {regel}")
+        return 1
+    print("\nAlle stappen binnen de drempels.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
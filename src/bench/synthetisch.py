@@ -0,0 +1,257 @@
+"""Synthetische Datagrid (PowerBI) en LIKP (SAP) bestanden voor tests en benchmarks.
+
+Genereert realistische exports zonder productiedata: alle DATAGRID_KOLOMMEN,
+LIKP-kolomnamen inclusief SAP-aliassen, verdelingen van status- en NO POD-waarden
+die passen bij rekenmodel.yaml, en scheve datumverdelingen (werkdagen, uitloop
+POD t.o.v. leveringstermijn, handvol dubbele leveringen en LIKP-mismatches).
+
+Gebruik:
+    python -m src.bench.synthetisch --rijen 100000 --formaat csv --uit bench_data
+    python -m src.bench.synthetisch --rijen 500000 --formaat xlsx --likp-aliassen
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.constants import DATAGRID_KOLOMMEN
+
+# Excel-limiet (1.048.576 rijen incl. header)
+MAX_XLSX_RIJEN = 1_048_575
+
+# Rijen per chunk bij wegschrijven van CSV — begrenst geheugen bij 10M rijen
+CHUNK_RIJEN = 500_000
+
+_LANDEN = {
+    # land: (gewicht, SalesArea)
+    "NL": (0.22, "Benelux"), "BE": (0.08, "Benelux"), "LU": (0.01, "Benelux"),
+    "DE": (0.24, "DACH"), "AT": (0.04, "DACH"), "CH": (0.03, "DACH"),
+    "FR": (0.12, "South"), "IT": (0.06, "South"), "ES": (0.04, "South"),
+    "GB": (0.07, "UK & Ireland"), "IE": (0.01, "UK & Ireland"),
+    "DK": (0.02, "Nordics"), "SE": (0.03, "Nordics"), "NO": (0.01, "Nordics"),
+    "PL": (0.02, "Eastern Europe"),
+}
+
+_CARRIERS = ["DHL Freight", "DSV", "Raben", "Kuehne+Nagel", "DB Schenker", "Van den Heuvel", "Geodis"]
+_CARRIER_GEWICHTEN = [0.24, 0.2, 0.14, 0.13, 0.12, 0.1, 0.07]
+
+_KLANT_STAMMEN = [
+    "Obi", "Hornbach", "Bauhaus", "Intratuin", "Leroy Merlin", "Castorama", "Praxis",
+    "Gamma", "Tuinland", "Hagebau", "Toom", "Dehner", "Jardiland", "Truffaut", "Bricomarché",
+    "B&Q", "Dobbies", "Blomsterlandet", "Plantagen", "Garden Center Group",
+]
+
+_REASON_CODES = ["Carrier", "Warehouse", "Capacity", "Customer", "Planning", "Stock"]
+_COMMENTS = [
+    "Truck niet op tijd", "Slot verschoven door klant", "Voorraad te laat", "Capaciteit magazijn",
+    "Douane vertraging", "Verkeerde leverdatum in order", "Carrier capaciteitstekort",
+]
+
+# LIKP-kolomnamen: standaard en SAP-varianten (zie _LIKP_KOLOM_ALIASSEN)
+_LIKP_STANDAARD = {"levering": "Levering", "termijn": "Leveringstermijn", "pick": "Pickdatum", "gecr": "Gecreëerd op"}
+_LIKP_ALIASSEN = {"levering": "Levering", "termijn": "Lev.termijn", "pick": "KODAT", "gecr": "ERDAT"}
+
+
+def _klanten(rng: np.random.Generator, n_klanten: int) -> np.ndarray:
+    """Klantnamen: stam + vestiging, zodat er veel unieke ChainNames zijn."""
+    stammen = rng.choice(_KLANT_STAMMEN, n_klanten)
+    return np.array([f"{s} {i:04d}" if i >= len(_KLANT_STAMMEN) else s for i, s in enumerate(stammen)])
+
+
+def _werkdagen(rng: np.random.Generator, start: pd.Timestamp, n_dagen: int, n: int) -> pd.DatetimeIndex:
+    """Willekeurige datums met ~5% weekendlevering (scheef naar werkdagen)."""
+    dagen = rng.integers(0, n_dagen, n)
+    datums = start + pd.to_timedelta(dagen, unit="D")
+    weekend = datums.dayofweek >= 5
+    schuif = np.where(weekend & (rng.random(n) > 0.05), 7 - datums.dayofweek, 0)
+    return datums + pd.to_timedelta(schuif, unit="D")
+
+
+def genereer(
+    rijen: int,
+    seed: int = 42,
+    start: str = "2025-01-01",
+    dagen: int = 365,
+    duplicaat_pct: float = 1.0,
+    mismatch_pct: float = 0.5,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Genereer (datagrid, likp) als DataFrames met datums als Timestamps.
+
+    duplicaat_pct: % dubbele DeliveryNumbers in de Datagrid (PowerBI exporteert regels).
+    mismatch_pct: % leveringen zonder LIKP-regel.
+    """
+    rng = np.random.default_rng(seed)
+    n = rijen
+
+    # Identiteit & dimensies — klantverdeling volgens Zipf (paar grote ketens, lange staart)
+    n_klanten = max(20, n // 200)
+    klanten = _klanten(rng, n_klanten)
+    klant_gewicht = 1.0 / np.arange(1, n_klanten + 1) ** 1.1
+    klant_idx = rng.choice(n_klanten, n, p=klant_gewicht / klant_gewicht.sum())
+
+    landen = list(_LANDEN)
+    land_gewicht = np.array([_LANDEN[l][0] for l in landen])
+    klant_land = rng.choice(landen, n_klanten, p=land_gewicht / land_gewicht.sum())
+    land = klant_land[klant_idx]
+    sales_area = pd.Series(land).map({l: v[1] for l, v in _LANDEN.items()}).to_numpy()
+
+    n_uniek = max(1, int(n * (1 - duplicaat_pct / 100)))
+    levering_nrs = 80_000_000 + rng.permutation(n_uniek * 3)[:n_uniek]
+    delivery = np.concatenate([levering_nrs, rng.choice(levering_nrs, n - n_uniek)])
+    rng.shuffle(delivery)
+
+    # Datums: creatie → gevraagd → SAP → leveringstermijn (TMS) → POD
+    gevraagd = _werkdagen(rng, pd.Timestamp(start), dagen, n)
+    creatie = gevraagd - pd.to_timedelta(rng.integers(3, 22, n), unit="D")
+    sap_verschuiving = rng.choice([0, 0, 0, 0, 0, 0, 0, 1, 2, 5], n)
+    sap = gevraagd + pd.to_timedelta(sap_verschuiving, unit="D")
+    termijn = sap - pd.to_timedelta(rng.choice([0, 0, 0, 0, 1], n), unit="D")
+    pick = termijn - pd.to_timedelta(rng.integers(1, 4, n), unit="D")
+    planned_gi = pick
+    actual_gi = planned_gi + pd.to_timedelta(rng.choice([0, 0, 0, 0, 0, 0, 0, 0, 1, 2], n), unit="D")
+    # Transit: meestal op of vóór termijn, staart naar laat
+    transit = rng.choice([-2, -1, 0, 0, 0, 0, 0, 1, 1, 2, 3], n)
+    pod = termijn + pd.to_timedelta(transit, unit="D")
+    heeft_pod = rng.random(n) > 0.05
+    pod = pod.where(heeft_pod)
+
+    # Performance-kolommen consistent met de datums
+    transport = np.where(~heeft_pod, "NO POD", np.where(pod <= termijn, "OnTime", "Late"))
+    book_in = np.where(~heeft_pod, "NO POD", np.where(pod <= gevraagd, "OnTime", "Late"))
+    # Book-in correcties: klein deel Late → OnTime
+    book_in = np.where((book_in == "Late") & (rng.random(n) < 0.1), "OnTime", book_in)
+    customer_final = np.where(book_in == "NO POD", "OnTime", book_in)
+    capaciteit = np.where(sap_verschuiving > 0, "moved", "not moved")
+    logistiek = np.where(actual_gi <= planned_gi, "On schedule", "Late")
+    days_to_late = np.where(heeft_pod, (pod - gevraagd).days, np.nan)
+
+    te_laat = book_in == "Late"
+    reason = np.where(te_laat & (rng.random(n) < 0.7), rng.choice(_REASON_CODES, n), None)
+    comment = np.where(te_laat & (rng.random(n) < 0.4), rng.choice(_COMMENTS, n), None)
+
+    def week(d: pd.DatetimeIndex) -> np.ndarray:
+        iso = d.isocalendar()
+        return (iso["year"].astype(str) + iso["week"].astype(str).str.zfill(2)).to_numpy()
+
+    datagrid = pd.DataFrame({
+        "ChainCode": ("C" + pd.Series(klant_idx).astype(str).str.zfill(5)).to_numpy(),
+        "CustomerNumber": 100_000 + klant_idx,
+        "ChainName": klanten[klant_idx],
+        "Country": land,
+        "SalesArea": sales_area,
+        "SalesOrderNumber": 10_000_000 + rng.integers(0, n * 2, n),
+        "DeliveryNumber": delivery,
+        "Creation Date order": creatie,
+        "RequestedDeliveryDateIdoc": gevraagd,
+        "SAP Delivery Date": sap,
+        "DeliveryDateInitial": sap,
+        "PODDeliveryDateShipment": pod,
+        "Planned GI Date": planned_gi,
+        "Delivery_PlannedGIDate": planned_gi,
+        "Actual GI Date": actual_gi,
+        "GoodsIssueTime": pd.Series(rng.integers(6, 22, n)).astype(str).str.zfill(2).to_numpy() + ":00",
+        "GoodsIssueDateCarrier": actual_gi,
+        "ShipmentNumber": 40_000_000 + rng.integers(0, max(1, n // 3), n),
+        "Carrier": rng.choice(_CARRIERS, n, p=_CARRIER_GEWICHTEN),
+        "RequestedDeliveryDateFinal": gevraagd,
+        "Creation WeekNumber": week(creatie),
+        "Requested WeekNumber": week(gevraagd),
+        "Planned GI WeekNumber": week(planned_gi),
+        "DAYS_TO_LATE": days_to_late,
+        "DAYS_DELAY_GI": (actual_gi - planned_gi).days,
+        "PERFORMANCE_CAPACITY": capaciteit,
+        "PERFORMANCE_TRANSPORT": transport,
+        "PERFORMANCE_LOGISTIC": logistiek,
+        "PERFORMANCE_CUSTOMER": customer_final,
+        "NewBookingSlot": np.where(rng.random(n) < 0.03, "Yes", None),
+        "ReasonCodeLatesCorrected": reason,
+        "CommentLateOrders": comment,
+        "PERFORMANCE_CUSTOMER_FINAL": customer_final,
+        "BookIn": gevraagd - pd.to_timedelta(rng.integers(1, 5, n), unit="D"),
+        "BookinBy": rng.choice(["Elho", "Klant", "Carrier"], n),
+        "BookInVia": rng.choice(["Portal", "Mail", "Telefoon"], n, p=[0.7, 0.2, 0.1]),
+        "Fixed": np.where(rng.random(n) < 0.2, "X", None),
+        "PERFORMANCE_CUSTOMER_BOOK_IN": book_in,
+    }, columns=DATAGRID_KOLOMMEN)
+
+    # LIKP: één regel per unieke levering, minus mismatches
+    likp_basis = datagrid.drop_duplicates("DeliveryNumber")
+    behoud = rng.random(len(likp_basis)) >= mismatch_pct / 100
+    likp_basis = likp_basis[behoud]
+    likp = pd.DataFrame({
+        "Levering": likp_basis["DeliveryNumber"].to_numpy(),
+        "Leveringstermijn": termijn[likp_basis.index],
+        "Pickdatum": pick[likp_basis.index],
+        "Gecreëerd op": creatie[likp_basis.index],
+    })
+    return datagrid, likp
+
+
+def _als_tekst_datums(df: pd.DataFrame) -> pd.DataFrame:
+    """Zet datumkolommen om naar dd-mm-jjjj zoals een PowerBI CSV-export."""
+    df = df.copy()
+    for kolom in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[kolom]):
+            df[kolom] = df[kolom].dt.strftime("%d-%m-%Y")
+    return df
+
+
+def schrijf(
+    datagrid: pd.DataFrame,
+    likp: pd.DataFrame,
+    uit: str | os.PathLike,
+    formaat: str = "csv",
+    likp_aliassen: bool = False,
+) -> tuple[Path, Path]:
+    """Schrijf Datagrid en LIKP naar uit/ als csv of xlsx. Retourneert beide paden."""
+    uit = Path(uit)
+    uit.mkdir(parents=True, exist_ok=True)
+
+    namen = _LIKP_ALIASSEN if likp_aliassen else _LIKP_STANDAARD
+    likp = likp.rename(columns={
+        "Levering": namen["levering"], "Leveringstermijn": namen["termijn"],
+        "Pickdatum": namen["pick"], "Gecreëerd op": namen["gecr"],
+    })
+
+    dg_pad = uit / f"datagrid_{len(datagrid)}.{formaat}"
+    lk_pad = uit / f"likp_{len(likp)}.{formaat}"
+
+    if formaat == "csv":
+        # In chunks, zodat ook 10M rijen in begrensd geheugen worden weggeschreven
+        for pad, df in [(dg_pad, datagrid), (lk_pad, likp)]:
+            for i, start in enumerate(range(0, max(len(df), 1), CHUNK_RIJEN)):
+                chunk = _als_tekst_datums(df.iloc[start:start + CHUNK_RIJEN])
+                chunk.to_csv(pad, index=False, sep=";", mode="w" if i == 0 else "a", header=(i == 0))
+    elif formaat == "xlsx":
+        if len(datagrid) > MAX_XLSX_RIJEN:
+            raise ValueError(f"xlsx ondersteunt maximaal {MAX_XLSX_RIJEN} rijen; gebruik csv")
+        datagrid.to_excel(dg_pad, index=False)
+        likp.to_excel(lk_pad, index=False)
+    else:
+        raise ValueError(f"Onbekend formaat: {formaat}")
+
+    return dg_pad, lk_pad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genereer synthetische Datagrid + LIKP bestanden")
+    parser.add_argument("--rijen", type=int, default=100_000, help="Aantal Datagrid-rijen (10k–10M)")
+    parser.add_argument("--formaat", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--uit", default="bench_data", help="Uitvoermap")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--likp-aliassen", action="store_true", help="Gebruik SAP-kolomnamen (Lev.termijn, KODAT, ERDAT)")
+    args = parser.parse_args()
+
+    datagrid, likp = genereer(args.rijen, seed=args.seed)
+    dg_pad, lk_pad = schrijf(datagrid, likp, args.uit, args.formaat, args.likp_aliassen)
+    print(f"Datagrid: {dg_pad} ({len(datagrid)} rijen)")
+    print(f"LIKP:     {lk_pad} ({len(likp)} rijen)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 """Sidebar filters voor het dashboard."""
 
+import hashlib
+
 import streamlit as st
 import pandas as pd
 from datetime import datetime
@@ -85,4 +87,19 @@ def render_filters(df: pd.DataFrame) -> pd.DataFrame:
             key=f"target_{kpi_id}",
         )
 
+    # Filterstatus bewaren — sleutel voor gecachete exports
+    st.session_state.filter_staat = {
+        "periode": (str(start), str(eind)),
+        "klanten": geselecteerde_klanten if "ChainName" in df.columns else [],
+        "landen": geselecteerde_landen if "Country" in df.columns else [],
+        "areas": geselecteerde_areas if "SalesArea" in df.columns else [],
+        "carriers": geselecteerde_carriers if "Carrier" in df.columns else [],
+    }
+
     return df[mask]
+
+
+def filter_sleutel() -> str:
+    """Korte hash van de huidige filterstatus (na render_filters)."""
+    staat = st.session_state.get("filter_staat", {})
+    return hashlib.sha256(repr(sorted(staat.items())).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,50 @@
+"""Performance-paneel — profiler-resultaten per pagina-render en verwerking."""
+
+from __future__ import annotations
+
+import streamlit as st
+
+from src.utils.profiler import profiel_als_df, profiel_als_json
+
+
+def render_performance_paneel(profielen: list[dict | None]):
+    """Inklapbaar sidebar-paneel met profiler-schakelaar, metingen en JSON-export."""
+    profielen = [p for p in profielen if p]
+
+    with st.sidebar.expander("⚡ Performance"):
+        st.checkbox(
+            "Profiler aan",
+            key="profiler_aan",
+            help="Meet wandtijd, CPU-tijd en rijen per stap en per pagina-render.",
+        )
+        st.checkbox(
+            "Piekgeheugen meten (trager)",
+            key="profiler_geheugen",
+            help="Meet piekgeheugen per stap met tracemalloc. Geldt voor renders en nieuwe uploads.",
+        )
+
+        if not profielen:
+            st.caption("Nog geen metingen. Zet de profiler aan en ververs de pagina.")
+            return
+
+        for profiel in profielen:
+            st.markdown(f"**{profiel['naam']}** — {profiel['gestart']}")
+            tabel = profiel_als_df(profiel).rename(columns={
+                "stap": "Stap", "wand_sec": "Wand (s)", "cpu_sec": "CPU (s)",
+                "rijen_in": "Rijen in", "rijen_uit": "Rijen uit", "piek_mb": "Piek (MB)",
+            })
+            st.dataframe(
+                tabel.style.format(
+                    {"Wand (s)": "{:.3f}", "CPU (s)": "{:.3f}", "Rijen in": "{:.0f}",
+                     "Rijen uit": "{:.0f}", "Piek (MB)": "{:.1f}"},
+                    na_rep="—",
+                ),
+                hide_index=True,
+            )
+
+        st.download_button(
+            "📥 Export profiel (JSON)",
+            data=profiel_als_json(*profielen),
+            file_name="otd_profiel.json",
+            mime="application/json",
+        )
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 from pathlib import Path
 
 import yaml
@@ -14,6 +16,46 @@ _REKENMODEL_PAD = _PROJECT_DIR / "rekenmodel.yaml"
 # Defaults als bestand ontbreekt (recalculate = originele logica)
 _DEFAULTS = {
     "no_pod": {"exclude_from_denominator": True},
+    "geheugen": {
+        "koude_kolommen": ["CommentLateOrders", "ReasonCodeLatesCorrected"],
+        "extra_kolommen": [],
+        "side_store": ".cache/koude_kolommen",
+        "max_side_store": 10,
+        "budget_mb": 512,
+    },
+    "action_portal": {
+        "bron": "map",
+        "pad": None,
+        "tabel": "action_portal_shipments",
+        "versie_kolom": "updated_at",
+        "koppeling": [
+            {"otd": "DeliveryNumber", "action": "Ship ID"},
+            {"otd": "ShipmentNumber", "action": "Ship ID"},
+        ],
+    },
+    "inname": {
+        "aan": True,
+        "interval_sec": 30,
+        "datagrid_map": None,
+        "datagrid_patroon": "Datagrid*",
+        "likp_patroon": "LIKP*",
+        "snapshot_store": ".cache/snapshots",
+        "max_otd_snapshots": 5,
+    },
+    "antwoord_cache": {
+        "aan": True,
+        "pad": ".cache/antwoorden.json",
+        "ttl_uur": 24,
+        "max_items": 500,
+        "gelijkenis": 0.8,
+    },
+    "prompt": {
+        "budget_tokens": 6000,
+        "max_berichten": 10,
+        "max_lijst": 15,
+        "min_context": 500,
+        "prioriteit": ["gefilterd", "context", "geschiedenis", "rekenmodel", "feedback", "samenvatting"],
+    },
     "otd": {
         "method": "recalculate",
     },
@@ -86,6 +128,30 @@ def herlaad_config() -> dict:
     return laad_config()
 
 
+# Secties die de berekening bepalen (en dus elk verwerkt dataset); uit geheugen alleen
+# de kolomlijsten van snoei_kolommen — pad en budget veranderen de data niet
+REKEN_SECTIES = ("otd", "performances", "no_pod", "dedup")
+GEHEUGEN_KOLOMLIJSTEN = ("koude_kolommen", "extra_kolommen")
+
+
+def config_hash(*secties: str) -> str:
+    """Korte hash van het actieve rekenmodel — onderdeel van dataset- en cache-sleutels.
+
+    Zonder secties alleen wat de berekening bepaalt: een ander promptbudget of een
+    andere cache-TTL geeft geen nieuwe datasetsleutels (en dus geen herverwerking).
+    Met secties (bijv. config_hash("prompt")) een hash van alleen die secties, voor
+    sleutels die daar wel van afhangen.
+    """
+    cfg = laad_config()
+    if secties:
+        deel = {sectie: cfg.get(sectie) for sectie in secties}
+    else:
+        deel = {sectie: cfg.get(sectie) for sectie in REKEN_SECTIES}
+        deel["geheugen"] = {k: (cfg.get("geheugen") or {}).get(k) for k in GEHEUGEN_KOLOMLIJSTEN}
+    tekst = json.dumps(deel, sort_keys=True, default=str)
+    return hashlib.sha256(tekst.encode("utf-8")).hexdigest()[:12]
+
+
 def get_dedup_config() -> dict:
     """Haal dedup-configuratie op."""
     cfg = laad_config()
@@ -104,6 +170,36 @@ def get_no_pod_config() -> dict:
     return cfg.get("no_pod", _DEFAULTS["no_pod"])
 
 
+def get_geheugen_config() -> dict:
+    """Haal kolombeleid en geheugenbudget op (aangevuld met defaults)."""
+    cfg = laad_config()
+    return {**_DEFAULTS["geheugen"], **(cfg.get("geheugen") or {})}
+
+
+def get_action_portal_config() -> dict:
+    """Haal de Action Portal bron op (aangevuld met defaults)."""
+    cfg = laad_config()
+    return {**_DEFAULTS["action_portal"], **(cfg.get("action_portal") or {})}
+
+
+def get_inname_config() -> dict:
+    """Haal watch-folder inname op (aangevuld met defaults)."""
+    cfg = laad_config()
+    return {**_DEFAULTS["inname"], **(cfg.get("inname") or {})}
+
+
+def get_antwoord_cache_config() -> dict:
+    """Haal de antwoord-cache van de Assistent op (aangevuld met defaults)."""
+    cfg = laad_config()
+    return {**_DEFAULTS["antwoord_cache"], **(cfg.get("antwoord_cache") or {})}
+
+
+def get_prompt_config() -> dict:
+    """Haal het tokenbudget van LLM-prompts op (aangevuld met defaults)."""
+    cfg = laad_config()
+    return {**_DEFAULTS["prompt"], **(cfg.get("prompt") or {})}
+
+
 def get_performance_config(kpi_id: str) -> dict:
     """Haal configuratie op voor één performance-stap."""
     cfg = laad_config()
@@ -0,0 +1,157 @@
+"""Configureerbare bron voor Action Portal data — map, archief, Parquet of database.
+
+Welke bron gebruikt wordt staat in rekenmodel.yaml (action_portal.bron). Elke
+bron levert een lijst rapporten met een goedkope signatuur; de watch-folder inname
+(zie inname.py) parseert alleen rapporten waarvan de signatuur nog geen snapshot
+heeft en bouwt daaruit de geconsolideerde historie.
+
+Een rapport is een dict met:
+- datum: YYYY-MM-DD (volgorde bij ontdubbelen; laatste versie wint)
+- naam: weergavenaam
+- pad: bestand om te hashen (signatuur op inhoud), of
+- sleutel: vooraf bepaalde snapshot-sleutel (archiefleden, database)
+- item: wat lees_rapport() nodig heeft om het rapport te parsen (picklebaar)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from src.config import get_action_portal_config
+from src.data.loader import action_portal_bestanden, lees_action_portal, normaliseer_action_portal
+from src.utils.constants import ACTION_PORTAL_PAD
+
+_DATUM_RE = re.compile(r"AppointmentReport_(\d{4}-\d{2}-\d{2})\.xlsx$")
+
+
+def bron_pad(cfg: dict | None = None) -> str:
+    """Pad van de bron: action_portal.pad, anders $ACTION_PORTAL_PAD, anders de standaardmap."""
+    cfg = cfg or get_action_portal_config()
+    return cfg.get("pad") or os.environ.get("ACTION_PORTAL_PAD") or ACTION_PORTAL_PAD
+
+
+def _bestand_datum(pad: str) -> str:
+    return datetime.fromtimestamp(os.stat(pad).st_mtime).strftime("%Y-%m-%d")
+
+
+# --- Bronnen: rapporten opsommen ---
+
+def _map_rapporten(cfg: dict) -> list[dict]:
+    """Gedateerde AppointmentReport_*.xlsx in een map."""
+    return [
+        {"datum": datum, "naam": os.path.basename(pad), "pad": pad, "item": ("xlsx", pad)}
+        for datum, pad in action_portal_bestanden(bron_pad(cfg))
+    ]
+
+
+def _archief_rapporten(cfg: dict) -> list[dict]:
+    """Gedateerde AppointmentReports in een zip; de signatuur is CRC + grootte per lid."""
+    pad = bron_pad(cfg)
+    if not os.path.isfile(pad):
+        return []
+    rapporten = []
+    with zipfile.ZipFile(pad) as zf:
+        for info in zf.infolist():
+            m = _DATUM_RE.search(os.path.basename(info.filename))
+            if m:
+                rapporten.append({
+                    "datum": m.group(1),
+                    "naam": info.filename,
+                    "sleutel": f"action-zip-{info.CRC:08x}-{info.file_size:x}",
+                    "item": ("zip", pad, info.filename),
+                })
+    return sorted(rapporten, key=lambda r: r["datum"])
+
+
+def _parquet_rapporten(cfg: dict) -> list[dict]:
+    """Eén voorbewerkte Parquet-snapshot (bijv. gemaakt op een andere server)."""
+    pad = bron_pad(cfg)
+    if not os.path.isfile(pad):
+        return []
+    return [{"datum": _bestand_datum(pad), "naam": os.path.basename(pad), "pad": pad, "item": ("parquet", pad)}]
+
+
+def _database_rapporten(cfg: dict) -> list[dict]:
+    """Database-tabel als één rapport; de signatuur is (aantal rijen, hoogste versie_kolom)."""
+    from src.data.database import heeft_database_config, tabel_versie
+
+    if not heeft_database_config():
+        return []
+    tabel = cfg["tabel"]
+    aantal, hoogste = tabel_versie(tabel, cfg["versie_kolom"])
+    if not aantal:
+        return []
+    signatuur = hashlib.sha256(f"{tabel}:{aantal}:{hoogste}".encode("utf-8")).hexdigest()[:24]
+    return [{
+        "datum": hoogste[:10] or datetime.now().strftime("%Y-%m-%d"),
+        "naam": tabel,
+        "sleutel": f"action-db-{signatuur}",
+        "item": ("database", tabel),
+    }]
+
+
+_BRONNEN = {
+    "map": _map_rapporten,
+    "archief": _archief_rapporten,
+    "parquet": _parquet_rapporten,
+    "database": _database_rapporten,
+}
+
+
+def rapporten(cfg: dict | None = None) -> list[dict]:
+    """Rapporten van de geconfigureerde bron, oudste eerst."""
+    cfg = cfg or get_action_portal_config()
+    if cfg["bron"] not in _BRONNEN:
+        raise ValueError(f"Onbekende Action Portal bron: {cfg['bron']} (kies uit {', '.join(_BRONNEN)})")
+    return _BRONNEN[cfg["bron"]](cfg)
+
+
+# --- Rapporten parsen ---
+
+def lees_rapport(item: tuple) -> pd.DataFrame:
+    """Parse één rapport-item naar een genormaliseerd Action Portal frame."""
+    soort = item[0]
+    if soort == "xlsx":
+        return lees_action_portal(item[1])
+    if soort == "zip":
+        with zipfile.ZipFile(item[1]) as zf:
+            return lees_action_portal(BytesIO(zf.read(item[2])))
+    if soort == "parquet":
+        return normaliseer_action_portal(pd.read_parquet(item[1]))
+    if soort == "database":
+        from src.data.database import laad_tabel
+
+        return normaliseer_action_portal(laad_tabel(item[1]))
+    raise ValueError(f"Onbekend rapport-item: {soort}")
+
+
+def lees_rapporten(items: list[tuple], max_workers: int = 4) -> list[pd.DataFrame]:
+    """Parse rapport-items (in volgorde). Excel-rapporten gaan parallel.
+
+    Excel parsen is CPU-gebonden Python (openpyxl), dus processen in plaats van threads;
+    Parquet en database worden direct gelezen. De processen starten met "spawn": de
+    inname draait in een thread van de (multithreaded) Streamlit-server, en fork
+    vanuit zo'n proces kan vastlopen op locks die een andere thread vasthield.
+    """
+    excel = [i for i, item in enumerate(items) if item[0] in ("xlsx", "zip")]
+    resultaat: list[pd.DataFrame | None] = [None] * len(items)
+    if len(excel) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = min(max_workers, len(excel), os.cpu_count() or 1)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for i, df in zip(excel, pool.map(lees_rapport, [items[i] for i in excel])):
+                resultaat[i] = df
+    for i, item in enumerate(items):
+        if resultaat[i] is None:
+            resultaat[i] = lees_rapport(item)
+    return resultaat
@@ -0,0 +1,136 @@
+"""Action Portal KPI's — tellingen en minutenstatistiek per DC × dag in één pass.
+
+action_aggregaat() groepeert de shipments één keer op (DC, dag) en telt per cel
+de inbound states, time labels en minuten (som/aantal/max). Alle tellingen zijn
+optelbaar, dus filters (DC, datum) en roll-ups naar DC of week werken op deze
+kleine tabel in plaats van op de shipments. De pagina cachet het aggregaat per
+dataset.
+
+Slot performance (slot_pct):
+- standaard: Finished / (Finished + Cancelled + NoShow)
+- tel late mee: Finished met time label Early/On time / (Finished + Cancelled + NoShow)
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+from src.utils.constants import (
+    ACTION_MINUTEN_KOLOMMEN,
+    ACTION_ONZE_STATES,
+    ACTION_STATES,
+    ACTION_TIME_LABEL_GOED,
+    ACTION_TIME_LABEL_SLECHT,
+)
+from src.utils.profiler import profileer
+
+# Telkolommen in het aggregaat (alle optelbaar)
+TELLINGEN = (
+    ["totaal"]
+    + [state.lower() for state in ACTION_STATES]
+    + ["overig", "onze", "met_label", "op_tijd", "te_laat", "goed_label"]
+)
+
+
+def _minuten_kolommen(kolom: str) -> tuple[str, str, str]:
+    """Namen van som-, aantal- en max-kolom voor een minutenkolom."""
+    basis = kolom.replace(" (min)", "").lower().replace(" ", "_")
+    return f"{basis}_som", f"{basis}_n", f"{basis}_max"
+
+
+@profileer()
+def action_aggregaat(df: pd.DataFrame) -> pd.DataFrame:
+    """Tellingen en minutenstatistiek per DC × dag (Appointment), in één gegroepeerde pass.
+
+    Kolommen: DC, dag, de TELLINGEN en per minutenkolom <naam>_som/_n/_max
+    (bijv. too_late_som). Rijen zonder DC of Appointment krijgen NaN als sleutel en
+    blijven meetellen.
+    """
+    state = df["Inbound state"] if "Inbound state" in df.columns else pd.Series(pd.NA, index=df.index)
+    label = df["Time label"] if "Time label" in df.columns else pd.Series(pd.NA, index=df.index)
+    finished = state == "Finished"
+    onze = state.isin(ACTION_ONZE_STATES)
+
+    vlaggen = {"totaal": pd.Series(1, index=df.index)}
+    for naam in ACTION_STATES:
+        vlaggen[naam.lower()] = state == naam
+    vlaggen["overig"] = state.notna() & ~state.isin(ACTION_STATES)
+    vlaggen["onze"] = onze
+    vlaggen["met_label"] = finished & label.notna()
+    vlaggen["op_tijd"] = finished & label.isin(ACTION_TIME_LABEL_GOED)
+    vlaggen["te_laat"] = finished & label.isin(ACTION_TIME_LABEL_SLECHT)
+    vlaggen["goed_label"] = onze & label.isin(ACTION_TIME_LABEL_GOED)
+    tabel = pd.DataFrame({k: v.fillna(False).astype("int64") for k, v in vlaggen.items()})
+
+    agg = {k: "sum" for k in TELLINGEN}
+    for kolom in ACTION_MINUTEN_KOLOMMEN:
+        som, n, maximum = _minuten_kolommen(kolom)
+        minuten = pd.to_numeric(df[kolom], errors="coerce") if kolom in df.columns else pd.Series(float("nan"), index=df.index)
+        tabel[som] = minuten.fillna(0.0)
+        tabel[n] = minuten.notna().astype("int64")
+        tabel[maximum] = minuten
+        agg.update({som: "sum", n: "sum", maximum: "max"})
+
+    tabel["DC"] = df["DC"] if "DC" in df.columns else pd.NA
+    tabel["dag"] = (
+        pd.to_datetime(df["Appointment"], errors="coerce").dt.normalize()
+        if "Appointment" in df.columns else pd.NaT
+    )
+    return tabel.groupby(["DC", "dag"], dropna=False, sort=True).agg(agg).reset_index()
+
+
+def filter_aggregaat(
+    agg: pd.DataFrame, dcs: list | None = None, van: date | None = None, tot: date | None = None,
+) -> pd.DataFrame:
+    """Pas DC- en datumfilter toe op het aggregaat (zoals op de shipments zelf).
+
+    Met een datumfilter vallen cellen zonder dag weg, net als shipments zonder Appointment.
+    """
+    mask = pd.Series(True, index=agg.index)
+    if dcs:
+        mask &= agg["DC"].isin(dcs)
+    if van is not None:
+        mask &= agg["dag"] >= pd.Timestamp(van)
+    if tot is not None:
+        mask &= agg["dag"] < pd.Timestamp(tot) + pd.Timedelta(days=1)
+    return agg[mask]
+
+
+def slot_pct(tabel: pd.DataFrame | pd.Series, tel_late_mee: bool = False):
+    """Slot performance % uit (opgetelde) tellingen; NaN (of 0 voor één rij) zonder onze shipments."""
+    goed = tabel["goed_label"] if tel_late_mee else tabel["finished"]
+    if isinstance(tabel, pd.Series):
+        return goed / tabel["onze"] * 100 if tabel["onze"] > 0 else 0.0
+    return (goed / tabel["onze"].where(tabel["onze"] > 0) * 100).round(1)
+
+
+def per_dc(agg: pd.DataFrame) -> pd.DataFrame:
+    """Tellingen opgeteld per DC (zonder DC valt weg, zoals bij groupby)."""
+    return agg.groupby("DC", sort=True).agg(_rollup(agg)).reset_index()
+
+
+def per_week(agg: pd.DataFrame) -> pd.DataFrame:
+    """Tellingen opgeteld per ISO-week, chronologisch, met label 'W05-2026'."""
+    geldig = agg[agg["dag"].notna()]
+    iso = geldig["dag"].dt.isocalendar()
+    week = geldig.groupby([iso["year"], iso["week"]], sort=True).agg(_rollup(agg))
+    week.index.names = ["jaar", "weeknr"]
+    week = week.reset_index()
+    week.insert(0, "week", "W" + week["weeknr"].astype(str).str.zfill(2) + "-" + week["jaar"].astype(str))
+    return week
+
+
+def totalen(agg: pd.DataFrame) -> pd.Series:
+    """Alle tellingen opgeteld (één rij als Series)."""
+    return agg.agg(_rollup(agg))
+
+
+def _rollup(agg: pd.DataFrame) -> dict[str, str]:
+    """Aggregatie per kolom bij optellen: tellingen en minutensommen/-aantallen som, _max max."""
+    return {
+        k: "max" if k.endswith("_max") else "sum"
+        for k in agg.columns
+        if k in TELLINGEN or k.endswith(("_som", "_n", "_max"))
+    }
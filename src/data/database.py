@@ -39,6 +39,23 @@ def laad_orders() -> pd.DataFrame | None:
         return None
 
 
+def laad_tabel(tabel: str) -> pd.DataFrame:
+    """Alle rijen van een Supabase tabel, zonder id/created_at (fouten gaan naar de aanroeper)."""
+    response = _get_client().table(tabel).select("*").execute()
+    df = pd.DataFrame(response.data or [])
+    return df.drop(columns=[k for k in ["id", "created_at"] if k in df.columns])
+
+
+def tabel_versie(tabel: str, versie_kolom: str) -> tuple[int, str]:
+    """(aantal rijen, hoogste waarde van versie_kolom) van een Supabase tabel."""
+    response = (
+        _get_client().table(tabel).select(versie_kolom, count="exact")
+        .order(versie_kolom, desc=True).limit(1).execute()
+    )
+    hoogste = str(response.data[0][versie_kolom]) if response.data else ""
+    return response.count or 0, hoogste
+
+
 def upload_orders(df: pd.DataFrame) -> bool:
     """Upload DataFrame naar Supabase otd_orders tabel (vervangt bestaande data)."""
     try:
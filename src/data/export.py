@@ -0,0 +1,212 @@
+"""Exports van gefilterde data en rapporten — lui gegenereerd en gecachet.
+
+Het bestand wordt pas gemaakt als de gebruiker op download klikt. Resultaten
+worden procesbreed bewaard op bijv. (dataset, filterstatus, formaat), zodat dezelfde
+export niet opnieuw geserialiseerd wordt. Excel wordt met xlsxwriter in
+constant_memory-modus geschreven (datums vooraf als Excel-serienummers), of met
+openpyxl in write-only modus als xlsxwriter niet geïnstalleerd is (ca. 3x trager).
+"""
+
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+FORMATEN = {
+    "xlsx": {
+        "label": "Excel (.xlsx)",
+        "extensie": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    "csv.gz": {
+        "label": "CSV (gzip)",
+        "extensie": "csv.gz",
+        "mime": "application/gzip",
+    },
+    "parquet": {
+        "label": "Parquet",
+        "extensie": "parquet",
+        "mime": "application/vnd.apache.parquet",
+    },
+}
+
+# Bovengrens van de export-cache (bytes over alle entries)
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Rijen per blok bij het streamen naar xlsx
+_XLSX_BLOK = 10_000
+
+# Dag 0 van Excel-serienummers (1900-systeem, inclusief de schrikkeldag-bug)
+_EXCEL_NUL = pd.Timestamp("1899-12-30")
+
+_lock = threading.Lock()
+_cache: OrderedDict[tuple, bytes] = OrderedDict()
+
+
+def _xlsx_waarden(kolom: pd.Series) -> np.ndarray:
+    """Kolom als object-array met Excel-vriendelijke waarden (NaN/NaT → None)."""
+    if pd.api.types.is_datetime64_any_dtype(kolom):
+        kolom = kolom.dt.tz_localize(None) if kolom.dt.tz is not None else kolom
+        waarden = kolom.astype(object).to_numpy(copy=True)
+    else:
+        waarden = kolom.to_numpy(dtype=object, copy=True)
+    waarden[pd.isna(kolom).to_numpy()] = None
+    return waarden
+
+
+def _xlsx_serienummers(kolom: pd.Series) -> tuple[np.ndarray, str | None]:
+    """Kolom als object-array voor xlsxwriter (NaN/NaT → None), met getalformaat voor datums.
+
+    Datums worden gevectoriseerd omgerekend naar Excel-serienummers; per cel een
+    datetime laten omzetten kost xlsxwriter het meeste tijd.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(kolom):
+        return _xlsx_waarden(kolom), None
+    kolom = kolom.dt.tz_localize(None) if kolom.dt.tz is not None else kolom
+    heeft_tijd = bool((kolom.dropna() != kolom.dropna().dt.normalize()).any())
+    waarden = ((kolom - _EXCEL_NUL) / pd.Timedelta(days=1)).to_numpy(dtype=object)
+    waarden[kolom.isna().to_numpy()] = None
+    return waarden, "dd-mm-yyyy hh:mm" if heeft_tijd else "dd-mm-yyyy"
+
+
+def _schrijf_xlsxwriter(xlsxwriter, bladen: dict[str, pd.DataFrame | Iterable[pd.DataFrame]]) -> bytes:
+    """xlsx via xlsxwriter in constant_memory-modus (rij voor rij naar een tijdelijk bestand)."""
+    output = BytesIO()
+    wb = xlsxwriter.Workbook(output, {
+        "constant_memory": True,
+        # Tekst blijft tekst: geen formules, links of getallen uit celwaarden
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "strings_to_numbers": False,
+        "nan_inf_to_errors": True,
+    })
+    formaten: dict[str, object] = {}
+    for naam, inhoud in bladen.items():
+        ws = wb.add_worksheet(naam)
+        blokken = [inhoud] if isinstance(inhoud, pd.DataFrame) else inhoud
+        rij_nr = 0
+        for df in blokken:
+            if rij_nr == 0:
+                ws.write_row(0, 0, [str(k) for k in df.columns])
+                rij_nr = 1
+            for start in range(0, len(df), _XLSX_BLOK):
+                blok = df.iloc[start:start + _XLSX_BLOK]
+                kolommen, celformaten = [], []
+                for k in blok.columns:
+                    waarden, getalformaat = _xlsx_serienummers(blok[k])
+                    if getalformaat and getalformaat not in formaten:
+                        formaten[getalformaat] = wb.add_format({"num_format": getalformaat})
+                    kolommen.append(waarden)
+                    celformaten.append(formaten.get(getalformaat))
+                schrijf = ws.write
+                for rij in zip(*kolommen):
+                    for k, (waarde, formaat) in enumerate(zip(rij, celformaten)):
+                        if waarde is not None:
+                            schrijf(rij_nr, k, waarde, formaat)
+                    rij_nr += 1
+    wb.close()
+    return output.getvalue()
+
+
+def schrijf_xlsx_bladen(bladen: dict[str, pd.DataFrame | Iterable[pd.DataFrame]]) -> bytes:
+    """Schrijf één of meer sheets naar xlsx met een streamend werkboek.
+
+    Een sheet is een DataFrame of een iterable van DataFrame-blokken met dezelfde
+    kolommen; blokken worden één voor één geschreven, zodat een groot blad nooit
+    als geheel in geheugen hoeft te staan.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        return _schrijf_xlsxwriter(xlsxwriter, bladen)
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for naam, inhoud in bladen.items():
+        ws = wb.create_sheet(naam)
+        blokken = [inhoud] if isinstance(inhoud, pd.DataFrame) else inhoud
+        header = False
+        for df in blokken:
+            if not header:
+                ws.append([str(k) for k in df.columns])
+                header = True
+            for start in range(0, len(df), _XLSX_BLOK):
+                blok = df.iloc[start:start + _XLSX_BLOK]
+                kolommen = [_xlsx_waarden(blok[k]) for k in blok.columns]
+                for rij in zip(*kolommen):
+                    ws.append(rij)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def schrijf_xlsx(df: pd.DataFrame, sheet_naam: str = "OTD Data") -> bytes:
+    """Schrijf df naar xlsx met een streamend werkboek (zie schrijf_xlsx_bladen)."""
+    return schrijf_xlsx_bladen({sheet_naam: df})
+
+
+def schrijf_csv_gz(df: pd.DataFrame) -> bytes:
+    """Schrijf df als gzip-gecomprimeerde CSV (puntkomma, zoals de PowerBI export)."""
+    output = BytesIO()
+    with gzip.GzipFile(fileobj=output, mode="wb", compresslevel=6) as gz:
+        df.to_csv(gz, index=False, sep=";", encoding="utf-8")
+    return output.getvalue()
+
+
+def schrijf_parquet(df: pd.DataFrame) -> bytes:
+    """Schrijf df als Parquet (vereist pyarrow)."""
+    output = BytesIO()
+    df.to_parquet(output, index=False)
+    return output.getvalue()
+
+
+_SCHRIJVERS: dict[str, Callable[[pd.DataFrame], bytes]] = {
+    "xlsx": schrijf_xlsx,
+    "csv.gz": schrijf_csv_gz,
+    "parquet": schrijf_parquet,
+}
+
+
+def exporteer(df: pd.DataFrame, formaat: str = "xlsx") -> bytes:
+    """Serialiseer df in het gevraagde formaat (zie FORMATEN)."""
+    if formaat not in _SCHRIJVERS:
+        raise ValueError(f"Onbekend exportformaat: {formaat}")
+    return _SCHRIJVERS[formaat](df)
+
+
+def gecachet(sleutel: tuple, maak: Callable[[], bytes]) -> bytes:
+    """Bytes uit de export-cache, of maak ze één keer (maak wordt alleen dan aangeroepen).
+
+    De oudste entries vallen af zodra de cache boven MAX_CACHE_BYTES komt.
+    """
+    with _lock:
+        if sleutel in _cache:
+            _cache.move_to_end(sleutel)
+            return _cache[sleutel]
+
+    data = maak()
+
+    with _lock:
+        _cache[sleutel] = data
+        _cache.move_to_end(sleutel)
+        while len(_cache) > 1 and sum(len(v) for v in _cache.values()) > MAX_CACHE_BYTES:
+            _cache.popitem(last=False)
+    return data
+
+
+def gecachete_export(sleutel: tuple, maak_df: Callable[[], pd.DataFrame], formaat: str) -> bytes:
+    """Export uit de cache, of maak hem (maak_df wordt alleen dan aangeroepen).
+
+    sleutel identificeert dataset + filterstatus; het formaat wordt toegevoegd.
+    """
+    return gecachet((*sleutel, formaat), lambda: exporteer(maak_df(), formaat))
@@ -0,0 +1,185 @@
+"""Kolombeleid na ingestie — houd alleen gebruikte kolommen in geheugen.
+
+Welke kolommen blijven wordt bepaald door wat de pagina's gebruiken
+(DATAGRID_PAGINA_KOLOMMEN) en wat rekenmodel.yaml refereert. Koude tekstkolommen
+(bijv. CommentLateOrders) gaan naar een Parquet side store op schijf en worden
+alleen opgehaald voor detailweergaven.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import get_alle_performances, get_dedup_config, get_geheugen_config, get_otd_config
+from src.utils.constants import (
+    DATAGRID_PAGINA_KOLOMMEN,
+    LIKP_DATUM_KOLOMMEN,
+    PERFORMANCE_IDS,
+    VERPLICHTE_DATAGRID_KOLOMMEN,
+)
+from src.utils.profiler import profileer
+
+_PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Sleutel in df.attrs met het pad naar het side store bestand
+_ATTR_SIDE_STORE = "koude_kolommen_pad"
+
+# Kolommen die de pipeline zelf toevoegt
+_AFGELEIDE_KOLOMMEN = ["otd_ok", "week", "maand"]
+
+
+def _config_kolommen() -> list[str]:
+    """Kolommen die rekenmodel.yaml refereert (bron- en vergelijkkolommen, datums, dedup key)."""
+    kolommen = []
+    configs = [get_otd_config()] + list(get_alle_performances().values())
+    for cfg in configs:
+        for sleutel in ("source_column", "vergelijk_kolom"):
+            if cfg.get(sleutel):
+                kolommen.append(cfg[sleutel])
+        kolommen.extend(cfg.get("dates", []))
+    kolommen.append(get_dedup_config().get("key", "DeliveryNumber"))
+    return kolommen
+
+
+def bepaal_kolombeleid() -> dict[str, list[str]]:
+    """Bepaal welke kolommen warm (geheugen) en koud (side store) zijn.
+
+    Retourneert dict met:
+    - warm: kolommen die in geheugen blijven
+    - koud: kolommen die naar de side store gaan
+    """
+    cfg = get_geheugen_config()
+    warm = (
+        VERPLICHTE_DATAGRID_KOLOMMEN
+        + DATAGRID_PAGINA_KOLOMMEN
+        + LIKP_DATUM_KOLOMMEN
+        + _config_kolommen()
+        + PERFORMANCE_IDS
+        + _AFGELEIDE_KOLOMMEN
+        + list(cfg.get("extra_kolommen", []))
+    )
+    warm = list(dict.fromkeys(warm))
+    koud = [k for k in cfg.get("koude_kolommen", []) if k not in warm]
+    return {"warm": warm, "koud": koud}
+
+
+def _side_store_map() -> Path:
+    pad = Path(get_geheugen_config().get("side_store", ".cache/koude_kolommen"))
+    return pad if pad.is_absolute() else _PROJECT_DIR / pad
+
+
+def _ruim_side_store_op(maximum: int) -> None:
+    """Verwijder de langst niet gebruikte side store bestanden boven het maximum."""
+    try:
+        bestanden = sorted(_side_store_map().glob("*.parquet"), key=lambda b: b.stat().st_mtime)
+        for oud in bestanden[:max(0, len(bestanden) - max(1, maximum))]:
+            oud.unlink(missing_ok=True)
+    except OSError:
+        pass  # Opruimen is best effort; een volgende upload probeert opnieuw
+
+
+@profileer()
+def snoei_kolommen(df: pd.DataFrame) -> pd.DataFrame:
+    """Pas het kolombeleid toe op een verwerkt dataframe.
+
+    Warme kolommen blijven, koude kolommen worden (met DeliveryNumber) als Parquet
+    weggeschreven, alle overige kolommen vervallen. Het side store pad wordt in
+    df.attrs bewaard zodat detailweergaven de koude kolommen kunnen ophalen.
+    Boven max_side_store bestanden vallen de langst niet gebruikte af (hergebruik
+    telt als gebruik); een sessie die nog naar zo'n bestand wijst ziet de koude
+    kolommen dan niet meer. Lukt wegschrijven niet (bijv. geen pyarrow), dan blijven koude kolommen in geheugen.
+    """
+    beleid = bepaal_kolombeleid()
+    warm = [k for k in beleid["warm"] if k in df.columns]
+    koud = [k for k in beleid["koud"] if k in df.columns]
+
+    pad = None
+    if koud and "DeliveryNumber" in df.columns:
+        koude_df = df[["DeliveryNumber"] + koud].copy()
+        koude_df["DeliveryNumber"] = koude_df["DeliveryNumber"].astype(str).str.strip()
+        for kolom in koud:
+            koude_df[kolom] = koude_df[kolom].astype("string")
+
+        inhoud_hash = hashlib.sha256(
+            pd.util.hash_pandas_object(koude_df, index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
+        pad = _side_store_map() / f"{inhoud_hash}.parquet"
+        try:
+            if pad.exists():
+                os.utime(pad)
+            else:
+                pad.parent.mkdir(parents=True, exist_ok=True)
+                koude_df.to_parquet(pad, index=False)
+                _ruim_side_store_op(int(get_geheugen_config().get("max_side_store", 10)))
+        except (ImportError, OSError, ValueError):
+            pad = None
+
+    behouden = warm if pad is not None else warm + koud
+    resultaat = df[behouden].copy()
+    if pad is not None:
+        resultaat.attrs[_ATTR_SIDE_STORE] = str(pad)
+    return resultaat
+
+
+def voeg_koude_kolommen_toe(
+    df: pd.DataFrame,
+    kolommen: list[str] | None = None,
+    bron: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Haal koude kolommen uit de side store en voeg ze toe op DeliveryNumber.
+
+    bron is het frame dat het side store pad in attrs draagt (standaard df zelf).
+    Kolommen die al aanwezig zijn worden niet opnieuw opgehaald.
+    """
+    bron = df if bron is None else bron
+    pad = bron.attrs.get(_ATTR_SIDE_STORE)
+    if not pad or "DeliveryNumber" not in df.columns:
+        return df
+
+    if kolommen is None:
+        kolommen = bepaal_kolombeleid()["koud"]
+    ontbrekend = [k for k in kolommen if k not in df.columns]
+    if not ontbrekend:
+        return df
+
+    sleutel = df["DeliveryNumber"].astype(str).str.strip()
+    try:
+        # Side store bevat alleen DeliveryNumber + koude kolommen. Voor een deel van de
+        # orders (bijv. één blok) alleen die rijen lezen; voor (bijna) alles is het geheel
+        # in één keer lezen sneller dan filteren.
+        import pyarrow.parquet as pq
+
+        uniek = sleutel.dropna().unique().tolist()
+        if len(uniek) * 2 < pq.read_metadata(pad).num_rows:
+            koud = pd.read_parquet(pad, filters=[("DeliveryNumber", "in", uniek)])
+        else:
+            koud = pd.read_parquet(pad)
+    except (ImportError, OSError, ValueError):
+        return df
+
+    koud = koud.drop_duplicates(subset="DeliveryNumber", keep="first").set_index("DeliveryNumber")
+    resultaat = df.copy()
+    for kolom in ontbrekend:
+        if kolom in koud.columns:
+            resultaat[kolom] = sleutel.map(koud[kolom]).to_numpy()
+    return resultaat
+
+
+def geheugen_gebruik(df: pd.DataFrame | None) -> int:
+    """Resident geheugen van een dataframe in bytes (incl. object-inhoud)."""
+    if df is None:
+        return 0
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def formatteer_bytes(n: int) -> str:
+    """Leesbare weergave, bijv. '12.3 MB'."""
+    for eenheid in ["B", "KB", "MB", "GB"]:
+        if n < 1024 or eenheid == "GB":
+            return f"{n:.0f} {eenheid}" if eenheid == "B" else f"{n:.1f} {eenheid}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -0,0 +1,395 @@
+"""Watch-folder inname — nieuwe exports automatisch in de achtergrond verwerken.
+
+Een daemon-thread scant periodiek de Action Portal downloads map en (optioneel)
+een drop-map met Datagrid- en LIKP-exports. Bestanden worden herkend op
+(mtime, grootte) en pas bij een wijziging opnieuw gehasht; ongewijzigde bestanden
+worden nooit opnieuw gelezen, ook niet na een herstart.
+
+Elk geparst bestand (of verwerkt Datagrid+LIKP-paar) wordt als Parquet in de
+snapshot store gezet, met een index.json die bestandssignaturen, de historie
+per bron en afgekeurde Datagrid+LIKP-paren bijhoudt. Nieuwe AppointmentReports
+worden parallel geparst; alle rapporten samen vormen één ontdubbelde Action
+Portal-historie (ook Parquet), die alleen opnieuw wordt opgebouwd als er een
+rapport bijkomt. Het nieuwste dataset per bron wordt via de dataset-registry
+gedeeld; een versieteller laat draaiende dashboards naar het nieuwe dataset wisselen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import config_hash, get_inname_config
+from src.data import register
+from src.data import action_bron
+from src.data.loader import consolideer_action_portal
+
+_PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+BRONNEN = ("action_portal", "otd")
+
+# Aantal afgekeurde Datagrid+LIKP-paren dat de index onthoudt
+MAX_FOUTEN = 20
+
+# Zoveel seconden wacht haal_dataset op de eerste scan van de thread; daarna gaat de
+# app door met wat al in de store staat en toont hij "inname bezig"
+EERSTE_SCAN_WACHT = 2.0
+
+_lock = threading.RLock()
+_scan_lock = threading.Lock()
+_stop = threading.Event()
+_eerste_scan = threading.Event()  # gezet zodra een scan (thread of synchroon) klaar is
+_thread: threading.Thread | None = None
+
+# Toestand, bij de eerste scan uit index.json geladen
+_index: dict | None = None
+_index_gewijzigd = False
+_versie = 0
+_status = {"laatste_scan": None, "fouten": []}
+
+
+# --- Snapshot store ---
+
+def _store_map() -> Path:
+    pad = Path(get_inname_config()["snapshot_store"])
+    return pad if pad.is_absolute() else _PROJECT_DIR / pad
+
+
+def _laad_index() -> dict:
+    """index.json uit de snapshot store (leeg als die nog niet bestaat). Lock vereist."""
+    global _index
+    if _index is None:
+        pad = _store_map() / "index.json"
+        try:
+            _index = json.loads(pad.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _index = {}
+        _index.setdefault("bestanden", {})
+        _index.setdefault("snapshots", {})
+        _index.setdefault("historie", {})
+        _index.setdefault("fouten", {})
+        for bron in BRONNEN:
+            _index["snapshots"].setdefault(bron, [])
+    return _index
+
+
+def _schrijf_index() -> None:
+    """Schrijf index.json atomair (tijdelijk bestand + replace). Lock vereist."""
+    global _index_gewijzigd
+    _index_gewijzigd = False
+    pad = _store_map() / "index.json"
+    pad.parent.mkdir(parents=True, exist_ok=True)
+    tmp = pad.with_suffix(".tmp")
+    tmp.write_text(json.dumps(_index, indent=1, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, pad)
+
+
+def _bewaar_snapshot(bron: str, sleutel: str, df: pd.DataFrame, meta: dict, **frames: pd.DataFrame) -> dict:
+    """Schrijf df (en extra frames) als Parquet en neem het snapshot op in de index."""
+    global _versie
+    map_pad = _store_map() / bron
+    map_pad.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(map_pad / f"{sleutel}.parquet", index=False)
+    for naam, frame in frames.items():
+        frame.to_parquet(map_pad / f"{sleutel}.{naam}.parquet", index=False)
+
+    meta = {
+        **meta,
+        "bron": bron,
+        "sleutel": sleutel,
+        "rijen": len(df),
+        "frames": list(frames),
+        "gemaakt": datetime.now().isoformat(timespec="seconds"),
+    }
+    with _lock:
+        reeks = _laad_index()["snapshots"][bron]
+        reeks[:] = [s for s in reeks if s["sleutel"] != sleutel] + [meta]
+        reeks.sort(key=lambda s: s["datum"])
+        if bron == "otd":
+            _ruim_op(reeks, get_inname_config()["max_otd_snapshots"])
+        _schrijf_index()
+        _versie += 1
+    return meta
+
+
+def _ruim_op(reeks: list[dict], maximum: int) -> None:
+    """Verwijder de oudste snapshots (bestanden + indexregels) boven het maximum. Lock vereist."""
+    while len(reeks) > max(1, maximum):
+        oud = reeks.pop(0)
+        for naam in [None] + oud.get("frames", []):
+            achtervoegsel = f".{naam}" if naam else ""
+            (_store_map() / oud["bron"] / f"{oud['sleutel']}{achtervoegsel}.parquet").unlink(missing_ok=True)
+
+
+def lees_snapshot(meta: dict) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+    """Lees een snapshot uit de store: (df, extra frames)."""
+    map_pad = _store_map() / meta["bron"]
+    df = pd.read_parquet(map_pad / f"{meta['sleutel']}.parquet")
+    frames = {naam: pd.read_parquet(map_pad / f"{meta['sleutel']}.{naam}.parquet") for naam in meta.get("frames", [])}
+    return df, frames
+
+
+def snapshots(bron: str) -> list[dict]:
+    """Alle snapshots van een bron, oudste eerst."""
+    with _lock:
+        return list(_laad_index()["snapshots"][bron])
+
+
+def actueel(bron: str) -> dict | None:
+    """Meta van het nieuwste snapshot voor een bron (None als er geen is)."""
+    reeks = snapshots(bron)
+    return reeks[-1] if reeks else None
+
+
+def historie(bron: str = "action_portal") -> dict | None:
+    """Meta van de geconsolideerde historie over alle snapshots (None als er geen is).
+
+    Bevat o.a. van/datum (oudste/nieuwste rapport), rapporten (snapshot-sleutels) en rijen.
+    """
+    with _lock:
+        return _laad_index()["historie"].get(bron)
+
+
+def versie() -> int:
+    """Teller die ophoogt bij elk nieuw snapshot — dashboards vergelijken hem per run."""
+    return _versie
+
+
+def status() -> dict:
+    """Status van de inname: draait de thread, laatste scan, recente fouten."""
+    return {"actief": _thread is not None and _thread.is_alive(), "versie": _versie, **_status}
+
+
+def bezig() -> bool:
+    """Loopt de eerste scan van de inname-thread nog (bijv. een grote export bij een koude start)?"""
+    return _thread is not None and _thread.is_alive() and not _eerste_scan.is_set()
+
+
+def haal_dataset(bron: str) -> dict | None:
+    """Registry-entry van de historie (Action Portal) of het nieuwste snapshot (OTD).
+
+    Uit de store geladen als het er niet (meer) in de registry staat.
+
+    Zonder draaiende inname-thread wordt eerst synchroon gescand, hooguit eens per
+    interval_sec (de scan zelf loopt alle bronnen langs, ook als er niets veranderd is).
+    Op de allereerste scan van de thread wordt hooguit EERSTE_SCAN_WACHT seconden
+    gewacht; duurt die langer (zie bezig()), dan komt wat al in de store staat, of None.
+    """
+    if _thread is None:
+        laatste = _status["laatste_scan"]
+        if laatste is None or time.time() - laatste >= float(get_inname_config()["interval_sec"]):
+            scan()
+    else:
+        _eerste_scan.wait(timeout=EERSTE_SCAN_WACHT)
+    meta = historie(bron) or actueel(bron)
+    if meta is None:
+        return None
+    return register.haal_of_maak(meta["sleutel"], lambda: lees_snapshot(meta))
+
+
+# --- Scannen ---
+
+def _bestand_hash(pad: str) -> str | None:
+    """Inhoudshash van een bestand; alleen opnieuw gelezen als mtime of grootte wijzigde."""
+    global _index_gewijzigd
+    try:
+        stat = os.stat(pad)
+    except OSError:
+        return None
+    with _lock:
+        bekend = _laad_index()["bestanden"].get(pad)
+    if bekend and bekend["mtime_ns"] == stat.st_mtime_ns and bekend["grootte"] == stat.st_size:
+        return bekend["hash"]
+
+    with open(pad, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _lock:
+        _laad_index()["bestanden"][pad] = {"mtime_ns": stat.st_mtime_ns, "grootte": stat.st_size, "hash": digest}
+        _index_gewijzigd = True
+    return digest
+
+
+def _bekende_sleutels(bron: str) -> set[str]:
+    with _lock:
+        return {s["sleutel"] for s in _laad_index()["snapshots"][bron]}
+
+
+def _scan_action_portal(cfg: dict) -> int:
+    """Parse nieuwe rapporten uit de Action Portal bron naar de snapshot store en werk de historie bij.
+
+    Bestanden krijgen een sleutel op inhoudshash (alleen opnieuw gehasht bij een andere
+    mtime/grootte); archiefleden en database leveren hun eigen signatuur. Retourneert
+    het aantal nieuwe rapporten.
+    """
+    bekend = _bekende_sleutels("action_portal")
+    aanwezig, nieuw = [], {}
+    for rapport in action_bron.rapporten():
+        sleutel = rapport.get("sleutel")
+        if sleutel is None:
+            digest = _bestand_hash(rapport["pad"])
+            sleutel = f"action-{digest[:24]}" if digest else None
+        if sleutel is None:
+            continue
+        aanwezig.append(sleutel)
+        if sleutel not in bekend:
+            nieuw[sleutel] = rapport
+
+    frames = action_bron.lees_rapporten([r["item"] for r in nieuw.values()])
+    for (sleutel, rapport), df in zip(nieuw.items(), frames):
+        _bewaar_snapshot("action_portal", sleutel, df, {"datum": rapport["datum"], "bestanden": [rapport["naam"]]})
+    _bouw_historie("action_portal", aanwezig)
+    return len(nieuw)
+
+
+def _bouw_historie(bron: str, aanwezig: list[str]) -> bool:
+    """Consolideer de snapshots van de rapporten die de bron nu levert tot één Parquet-historie.
+
+    Alleen als die set veranderd is; levert de bron niets (bijv. database onbereikbaar),
+    dan blijft de vorige historie staan.
+    """
+    global _versie
+    rapporten = [s for s in snapshots(bron) if s["sleutel"] in set(aanwezig)]
+    sleutels = [s["sleutel"] for s in rapporten]
+    vorige = historie(bron)
+    if not rapporten or (vorige is not None and vorige["rapporten"] == sleutels):
+        return False
+
+    df = consolideer_action_portal([(s["datum"], lees_snapshot(s)[0]) for s in rapporten])
+    sleutel = f"historie-{register.inhoud_hash(*sleutels)}"
+    df.to_parquet(_store_map() / bron / f"{sleutel}.parquet", index=False)
+    meta = {
+        "bron": bron,
+        "sleutel": sleutel,
+        "van": rapporten[0]["datum"],
+        "datum": rapporten[-1]["datum"],
+        "rapporten": sleutels,
+        "rijen": len(df),
+        "frames": [],
+        "gemaakt": datetime.now().isoformat(timespec="seconds"),
+    }
+    with _lock:
+        _laad_index()["historie"][bron] = meta
+        _schrijf_index()
+        _versie += 1
+    if vorige is not None:
+        (_store_map() / bron / f"{vorige['sleutel']}.parquet").unlink(missing_ok=True)
+    return True
+
+
+def _nieuwste(map_pad: Path, patroon: str) -> Path | None:
+    kandidaten = [p for p in map_pad.glob(patroon) if p.suffix.lower() in (".csv", ".xlsx", ".xls")]
+    return max(kandidaten, key=lambda p: p.stat().st_mtime_ns) if kandidaten else None
+
+
+def _scan_datagrid(cfg: dict) -> int:
+    """Verwerk het nieuwste Datagrid+LIKP-paar uit de drop-map als dat nog geen snapshot heeft.
+
+    Een paar dat de validatie niet haalt staat in index["fouten"] en wordt overgeslagen
+    tot een van de bestanden (of het rekenmodel) verandert.
+    """
+    if not cfg["datagrid_map"]:
+        return 0
+    map_pad = Path(cfg["datagrid_map"])
+    dg_pad, lk_pad = _nieuwste(map_pad, cfg["datagrid_patroon"]), _nieuwste(map_pad, cfg["likp_patroon"])
+    if dg_pad is None or lk_pad is None:
+        return 0
+    dg_hash, lk_hash = _bestand_hash(str(dg_pad)), _bestand_hash(str(lk_pad))
+    if dg_hash is None or lk_hash is None:
+        return 0
+    # Zelfde sleutel als bij uploaden van dezelfde bestanden (inhoud + rekenmodel)
+    sleutel = register.inhoud_hash(dg_hash, lk_hash, config_hash())
+    with _lock:
+        afgekeurd = sleutel in _laad_index()["fouten"]
+    if afgekeurd or sleutel in _bekende_sleutels("otd"):
+        return 0
+
+    from src.data.pipeline import verwerk
+    from src.data.validator import verzamel_meldingen
+
+    with verzamel_meldingen() as meldingen:
+        resultaat = verwerk(dg_pad.read_bytes(), dg_pad.name, lk_pad.read_bytes(), lk_pad.name)
+    if resultaat is None:
+        fouten = [tekst for niveau, tekst in meldingen if niveau == "error"]
+        melding = f"{dg_pad.name}: validatie mislukt ({'; '.join(fouten)})"
+        _keur_af(sleutel, melding, [str(dg_pad), str(lk_pad)])
+        raise ValueError(melding)
+    df, mismatches = resultaat
+    datum = datetime.fromtimestamp(max(dg_pad.stat().st_mtime, lk_pad.stat().st_mtime)).isoformat(timespec="seconds")
+    _bewaar_snapshot("otd", sleutel, df, {"datum": datum, "bestanden": [str(dg_pad), str(lk_pad)]}, mismatches=mismatches)
+    return 1
+
+
+def _keur_af(sleutel: str, melding: str, bestanden: list[str]) -> None:
+    """Onthoud een paar dat de validatie niet haalt: pas een ander bestand (andere hash) wordt weer verwerkt."""
+    with _lock:
+        fouten = _laad_index()["fouten"]
+        fouten[sleutel] = {
+            "melding": melding,
+            "bestanden": bestanden,
+            "gemaakt": datetime.now().isoformat(timespec="seconds"),
+        }
+        for oud in list(fouten)[:-MAX_FOUTEN]:
+            del fouten[oud]
+        _schrijf_index()
+
+
+def scan() -> int:
+    """Eén scan over alle bewaakte mappen. Retourneert het aantal nieuwe snapshots.
+
+    Fouten per bron worden in status()["fouten"] bijgehouden en breken de scan niet af.
+    """
+    cfg = get_inname_config()
+    nieuw = 0
+    with _scan_lock:
+        try:
+            for naam, scanner in [("action_portal", _scan_action_portal), ("otd", _scan_datagrid)]:
+                try:
+                    nieuw += scanner(cfg)
+                except Exception as e:
+                    _status["fouten"] = (_status["fouten"] + [f"{naam}: {type(e).__name__}: {e}"])[-10:]
+            with _lock:
+                if _index_gewijzigd:
+                    _schrijf_index()
+        finally:
+            _status["laatste_scan"] = time.time()
+            _eerste_scan.set()
+    return nieuw
+
+
+def _lus(interval: float) -> None:
+    while True:
+        scan()
+        if _stop.wait(interval):
+            return
+
+
+def start() -> bool:
+    """Start de inname-thread één keer per proces (als inname aan staat). Retourneert of hij draait."""
+    global _thread
+    cfg = get_inname_config()
+    if not cfg["aan"]:
+        return False
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(
+                target=_lus, args=(float(cfg["interval_sec"]),), name="otd-inname", daemon=True,
+            )
+            _thread.start()
+    return True
+
+
+def stop() -> None:
+    """Stop de inname-thread (bijv. in scripts); start() kan hem opnieuw starten."""
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
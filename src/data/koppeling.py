@@ -0,0 +1,146 @@
+"""Koppeling OTD × Action Portal — welke levering hoorde bij welke DC-afspraak.
+
+De sleutelparen staan in rekenmodel.yaml (action_portal.koppeling), bijv.
+DeliveryNumber ↔ Ship ID. bouw_index() maakt per Action Portal-kolom één keer een
+hash-index (sleutel → rij); koppel() zoekt daarin de OTD-sleutels op en voegt de
+slot-kolommen en slot_ok toe. Beide worden per dataset gecachet in de registry
+(zie gekoppeld()), zodat de join bij een rerun niets kost.
+
+slot_ok (schakel vóór Carrier Transit in de first-failure keten):
+- True: Finished met time label Early/On time
+- False: Finished met time label Late, of Cancelled/NoShow
+- NaN: geen koppeling, Refused/Removed (niet onze schuld) of geen label
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.config import get_action_portal_config
+from src.data import register
+from src.utils.constants import ACTION_TIME_LABEL_GOED, ACTION_TIME_LABEL_SLECHT
+from src.utils.profiler import profileer
+
+# Action Portal-kolom → kolom in het gekoppelde OTD-dataset
+SLOT_KOLOMMEN = {
+    "Ship ID": "Slot Ship ID",
+    "DC": "Slot DC",
+    "Inbound state": "Slot status",
+    "Appointment": "Slot afspraak",
+    "Arrival": "Slot aankomst",
+    "Time label": "Slot label",
+    "Too late (min)": "Slot te laat (min)",
+}
+SLOT_VIA = "Slot gekoppeld via"
+
+# Volgorde van slot_uitkomst() in tabellen en grafieken
+SLOT_UITKOMSTEN = [
+    "Op tijd", "Te laat", "Gemist (Cancelled/NoShow)", "Refused/Removed", "Overig", "Niet gekoppeld",
+]
+
+
+def _sleutel(kolom: pd.Series) -> pd.Series:
+    """Genormaliseerde sleutel: tekst zonder spaties en voorloopnullen (SAP); leeg → NA."""
+    if pd.api.types.is_float_dtype(kolom):
+        kolom = kolom.astype("Int64")
+    tekst = kolom.astype("string").str.strip().str.lstrip("0")
+    return tekst.mask(tekst == "")
+
+
+@profileer()
+def bouw_index(df_action: pd.DataFrame, cfg: dict | None = None) -> dict:
+    """Lookup per Action Portal-sleutelkolom: unieke sleutels (hash-index) → rij in 'slot'.
+
+    Komt een sleutel vaker voor, dan wint de laatste afspraak. De hashtabel van elke
+    index wordt hier al opgebouwd, niet pas bij de eerste koppeling.
+    """
+    cfg = cfg or get_action_portal_config()
+    df_action = df_action.reset_index(drop=True)
+    volgorde = (
+        df_action["Appointment"].argsort(kind="stable").to_numpy()
+        if "Appointment" in df_action.columns else np.arange(len(df_action))
+    )
+
+    index = {}
+    for kolom in dict.fromkeys(paar["action"] for paar in cfg["koppeling"]):
+        if kolom not in df_action.columns:
+            continue
+        sleutels = _sleutel(df_action[kolom]).iloc[volgorde]
+        geldig = sleutels.notna().to_numpy()
+        sleutels, rijen = sleutels[geldig], volgorde[geldig]
+        laatste = ~sleutels.duplicated(keep="last").to_numpy()
+        idx = pd.Index(sleutels[laatste].to_numpy())
+        idx.get_indexer(idx[:1])
+        index[kolom] = {"sleutels": idx, "rijen": rijen[laatste]}
+
+    slot = df_action[[k for k in SLOT_KOLOMMEN if k in df_action.columns]].rename(columns=SLOT_KOLOMMEN)
+    # Extra lege rij: positie -1 (geen koppeling) valt daarop
+    slot = pd.concat([slot, slot.iloc[:0].reindex([len(slot)])], ignore_index=True)
+    return {"index": index, "slot": slot}
+
+
+def slot_ok(status: pd.Series, label: pd.Series) -> pd.Series:
+    """Slot gehaald per gekoppelde levering (True/False/NaN als object, zoals de performances)."""
+    finished = status == "Finished"
+    resultaat = pd.Series(np.nan, index=status.index, dtype="object")
+    resultaat[status.isin(["Cancelled", "NoShow"]).fillna(False)] = False
+    resultaat[(finished & label.isin(ACTION_TIME_LABEL_SLECHT)).fillna(False)] = False
+    resultaat[(finished & label.isin(ACTION_TIME_LABEL_GOED)).fillna(False)] = True
+    return resultaat
+
+
+def slot_uitkomst(df: pd.DataFrame) -> pd.Series:
+    """Uitkomst van het slot per levering, als categorie voor kruistabellen."""
+    status = df.get("Slot status", pd.Series(pd.NA, index=df.index))
+    label = df.get("Slot label", pd.Series(pd.NA, index=df.index))
+    finished = (status == "Finished").fillna(False)
+    keuzes = [
+        df[SLOT_VIA].isna() if SLOT_VIA in df.columns else pd.Series(True, index=df.index),
+        status.isin(["Cancelled", "NoShow"]).fillna(False),
+        status.isin(["Refused", "Removed"]).fillna(False),
+        finished & label.isin(ACTION_TIME_LABEL_GOED).fillna(False),
+        finished & label.isin(ACTION_TIME_LABEL_SLECHT).fillna(False),
+    ]
+    namen = ["Niet gekoppeld", "Gemist (Cancelled/NoShow)", "Refused/Removed", "Op tijd", "Te laat"]
+    uitkomst = np.select([k.to_numpy(dtype=bool) for k in keuzes], namen, default="Overig")
+    return pd.Series(pd.Categorical(uitkomst, categories=SLOT_UITKOMSTEN), index=df.index)
+
+
+@profileer()
+def koppel(df: pd.DataFrame, lookup: dict, cfg: dict | None = None) -> pd.DataFrame:
+    """OTD-dataset met slot-kolommen, SLOT_VIA en slot_ok; de sleutelparen in volgorde."""
+    cfg = cfg or get_action_portal_config()
+    positie = np.full(len(df), -1, dtype=np.int64)
+    via = np.full(len(df), None, dtype=object)
+
+    for paar in cfg["koppeling"]:
+        ingang = lookup["index"].get(paar["action"])
+        open_ = positie < 0
+        if ingang is None or paar["otd"] not in df.columns or not open_.any():
+            continue
+        treffer = ingang["sleutels"].get_indexer(_sleutel(df[paar["otd"]])[open_].to_numpy())
+        gevonden = treffer >= 0
+        rijen = np.where(gevonden, ingang["rijen"][treffer], -1)
+        positie[open_] = rijen
+        via[np.flatnonzero(open_)[gevonden]] = f"{paar['otd']} ↔ {paar['action']}"
+
+    slot = lookup["slot"].iloc[positie].set_axis(df.index)
+    resultaat = df.copy(deep=False)
+    for kolom in slot.columns:
+        resultaat[kolom] = slot[kolom]
+    resultaat[SLOT_VIA] = pd.Series(via, index=df.index, dtype="string")
+    if "Slot status" in slot.columns and "Slot label" in slot.columns:
+        resultaat["slot_ok"] = slot_ok(slot["Slot status"], slot["Slot label"])
+    return resultaat
+
+
+def gekoppeld(otd_sleutel: str | None, action_sleutel: str | None) -> pd.DataFrame | None:
+    """Gekoppeld OTD-dataset uit de registry-cache (index per Action Portal dataset,
+    koppeling per paar); None als een van beide datasets niet geregistreerd is."""
+    if otd_sleutel is None or action_sleutel is None:
+        return None
+    lookup = register.afgeleid(action_sleutel, "koppel_index", bouw_index)
+    if lookup is None:
+        return None
+    return register.afgeleid(otd_sleutel, f"action_koppeling:{action_sleutel}", lambda df: koppel(df, lookup))
@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import csv
+import functools
 import glob
+import hashlib
 import os
 import re
 
@@ -10,45 +13,82 @@ import pandas as pd
 import streamlit as st
 
 from src.data.database import heeft_database_config, laad_orders
+from src.data.schema import lees_dtypes
 from src.utils.constants import ACTION_PORTAL_PAD, ACTION_PORTAL_DATUM_KOLOMMEN
+from src.utils.profiler import profileer
 
 
-def upload_datagrid() -> pd.DataFrame | None:
-    """Toont file uploader voor Datagrid (PowerBI export)."""
+def upload_datagrid():
+    """Toont file uploader voor Datagrid (PowerBI export).
+
+    Retourneert het geüploade bestand (of None); parsen gebeurt pas als de
+    inhoudshash nog niet in de dataset-registry staat.
+    """
     bestand = st.file_uploader(
         "Datagrid (PowerBI export)",
         type=["csv", "xlsx", "xls"],
         help="PowerBI export met orderdata, performances en klantinfo (kolommen A-AL).",
         key="upload_datagrid",
     )
-    if bestand is None:
-        return None
-    return lees_bestand(bestand)
+    return bestand
 
 
-def upload_likp() -> pd.DataFrame | None:
-    """Toont file uploader voor LIKP (SAP SE16n)."""
+def upload_likp():
+    """Toont file uploader voor LIKP (SAP SE16n). Retourneert het bestand of None."""
     bestand = st.file_uploader(
         "LIKP (SAP SE16n)",
         type=["csv", "xlsx", "xls"],
         help="SAP LIKP tabel met Levering, Leveringstermijn en Pickdatum.",
         key="upload_likp",
     )
-    if bestand is None:
-        return None
-    return lees_bestand(bestand)
+    return bestand
 
 
-def lees_bestand(bestand) -> pd.DataFrame:
+def bestand_hash(bestand) -> str:
+    """SHA-256 van de bestandsinhoud, per upload (file_id) gecachet in de sessie."""
+    file_id = getattr(bestand, "file_id", None)
+    cache = st.session_state.setdefault("_bestand_hashes", {})
+    if file_id is not None and file_id in cache:
+        return cache[file_id]
+    digest = hashlib.sha256(bestand.getvalue()).hexdigest()
+    if file_id is not None:
+        cache[file_id] = digest
+    return digest
+
+
+@profileer()
+def lees_bestand(bestand, bron: str | None = None) -> pd.DataFrame:
     """Leest CSV of Excel bestand naar DataFrame.
     Kolomnamen worden NIET naar lowercase geconverteerd — PowerBI/SAP gebruiken CamelCase.
     Alleen whitespace wordt gestript.
+
+    Met bron ("datagrid"/"likp") bepaalt het typeschema de dtypes bij inlezen
+    (zie schema.lees_dtypes): sleutels komen als tekst binnen in plaats van float.
     """
     naam = bestand.name.lower()
     if naam.endswith(".csv"):
-        df = pd.read_csv(bestand, sep=None, engine="python")
+        opties = {"sep": None, "engine": "python"}
+        header = None
+        if bron:
+            # Header uit de eerste regel; met het gevonden scheidingsteken kan de snelle C-engine
+            kop = bestand.readline().decode("utf-8-sig", errors="replace")
+            bestand.seek(0)
+            try:
+                sep = csv.Sniffer().sniff(kop, delimiters=",;\t|").delimiter
+                opties = {"sep": sep}
+            except csv.Error:
+                sep = ","
+            header = next(csv.reader([kop], delimiter=sep), [])
+        lees = functools.partial(pd.read_csv, bestand)
     else:
-        df = pd.read_excel(bestand)
+        # Werkmap één keer openen; header en data komen uit hetzelfde ExcelFile
+        werkmap = pd.ExcelFile(bestand)
+        opties = {}
+        header = werkmap.parse(nrows=0).columns if bron else None
+        lees = werkmap.parse
+    if bron:
+        opties["dtype"] = lees_dtypes(header, bron)
+    df = lees(**opties)
 
     # Alleen whitespace strippen, geen lowercase/underscore conversie
     df.columns = df.columns.str.strip()
@@ -63,33 +103,53 @@ def laad_uit_database() -> pd.DataFrame | None:
     return laad_orders()
 
 
+_ACTION_PORTAL_DATUM_RE = re.compile(r"AppointmentReport_(\d{4}-\d{2}-\d{2})\.xlsx$")
+
+
+def action_portal_bestanden(map_pad: str = ACTION_PORTAL_PAD) -> list[tuple[str, str]]:
+    """Alle gedateerde AppointmentReports in een map als (YYYY-MM-DD, pad), oudste eerst."""
+    bestanden_met_datum = []
+    for pad in glob.glob(os.path.join(map_pad, "AppointmentReport_*.xlsx")):
+        m = _ACTION_PORTAL_DATUM_RE.search(os.path.basename(pad))
+        if m:
+            bestanden_met_datum.append((m.group(1), pad))
+    return sorted(bestanden_met_datum)
+
+
+def _nieuwste_action_portal_bestand() -> str | None:
+    """Pad van het AppointmentReport met de meest recente datum in de bestandsnaam."""
+    bestanden = action_portal_bestanden()
+    return bestanden[-1][1] if bestanden else None
+
+
+def action_portal_signatuur() -> str | None:
+    """Signatuur (pad, mtime, grootte) van het nieuwste AppointmentReport — registry-sleutel."""
+    pad = _nieuwste_action_portal_bestand()
+    if pad is None:
+        return None
+    stat = os.stat(pad)
+    return f"action:{pad}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
 def laad_action_portal() -> pd.DataFrame | None:
     """Laad het nieuwste AppointmentReport bestand uit de action-portal-scraper downloads map.
 
     Selecteert automatisch het bestand met de meest recente datum in de bestandsnaam.
-    Converteert datumkolommen en numerieke kolommen.
     """
-    pattern = os.path.join(ACTION_PORTAL_PAD, "AppointmentReport_*.xlsx")
-    bestanden = glob.glob(pattern)
-
-    if not bestanden:
+    nieuwste_pad = _nieuwste_action_portal_bestand()
+    if nieuwste_pad is None:
         return None
+    return lees_action_portal(nieuwste_pad)
 
-    # Sorteer op datum in bestandsnaam (YYYY-MM-DD)
-    datum_re = re.compile(r"AppointmentReport_(\d{4}-\d{2}-\d{2})\.xlsx$")
-    bestanden_met_datum = []
-    for pad in bestanden:
-        m = datum_re.search(os.path.basename(pad))
-        if m:
-            bestanden_met_datum.append((m.group(1), pad))
 
-    if not bestanden_met_datum:
-        return None
+def lees_action_portal(bestand) -> pd.DataFrame:
+    """Parse één AppointmentReport (pad of file-like). Converteert datum- en numerieke kolommen."""
+    return normaliseer_action_portal(pd.read_excel(bestand))
 
-    bestanden_met_datum.sort(reverse=True)
-    nieuwste_pad = bestanden_met_datum[0][1]
 
-    df = pd.read_excel(nieuwste_pad)
+def normaliseer_action_portal(df: pd.DataFrame) -> pd.DataFrame:
+    """Kolomnamen strippen en datum-, numerieke en labelkolommen typeren (ook voor Parquet/database)."""
+    df = df.copy()
     df.columns = df.columns.str.strip()
 
     # Datumkolommen converteren
@@ -102,12 +162,35 @@ def laad_action_portal() -> pd.DataFrame | None:
         if kolom in df.columns:
             df[kolom] = pd.to_numeric(df[kolom], errors="coerce")
 
-    # Time label opschonen (whitespace-only → NaN)
-    if "Time label" in df.columns:
-        df["Time label"] = df["Time label"].str.strip().replace("", pd.NA)
-
-    # Inbound state opschonen
-    if "Inbound state" in df.columns:
-        df["Inbound state"] = df["Inbound state"].str.strip().replace("", pd.NA)
+    # Time label en Inbound state opschonen (whitespace-only → NaN)
+    for kolom in ["Time label", "Inbound state"]:
+        if kolom in df.columns:
+            df[kolom] = df[kolom].str.strip().replace("", pd.NA)
 
     return df
+
+
+# Sleutel waarop shipments over overlappende AppointmentReports worden ontdubbeld
+ACTION_PORTAL_SLEUTEL = "Ship ID"
+
+
+def consolideer_action_portal(rapporten: list[tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+    """Voeg gedateerde AppointmentReports samen tot één historie.
+
+    rapporten: (YYYY-MM-DD, df) per rapport. Een shipment die in meerdere (overlappende)
+    rapporten staat komt één keer terug, in de versie uit het laatste rapport.
+    Rijen zonder Ship ID blijven allemaal staan. Kolom "Rapportdatum" geeft de herkomst
+    (een al geconsolideerde bron, zoals een Parquet-snapshot, houdt zijn eigen Rapportdatum).
+    """
+    if not rapporten:
+        return pd.DataFrame()
+    frames = [
+        df if "Rapportdatum" in df.columns else df.assign(Rapportdatum=pd.Timestamp(datum))
+        for datum, df in sorted(rapporten, key=lambda r: r[0])
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    if ACTION_PORTAL_SLEUTEL not in df.columns:
+        return df
+    zonder_sleutel = df[ACTION_PORTAL_SLEUTEL].isna()
+    dubbel = df[ACTION_PORTAL_SLEUTEL].duplicated(keep="last") & ~zonder_sleutel
+    return df[~dubbel].reset_index(drop=True)
@@ -0,0 +1,184 @@
+"""Verwerkingspipeline Datagrid + LIKP — synchroon of als achtergrondjob.
+
+De pipeline (inlezen → validatie → dedup → LIKP-join → performances → periodes →
+kolombeleid) draait in een worker-thread. Per stap worden voortgang en duur
+bijgehouden; het resultaat wordt atomair in de dataset-registry gepubliceerd,
+zodat sessies het vorige dataset kunnen blijven bekijken tot de nieuwe klaar is.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable
+
+import pandas as pd
+
+from src.data import register
+from src.data.geheugen import snoei_kolommen
+from src.data.loader import lees_bestand
+from src.data.processor import bereken_performances, dedup_datagrid, join_likp
+from src.data.validator import valideer_bronnen, verzamel_meldingen
+from src.utils.date_utils import voeg_periode_kolommen_toe
+from src.utils.profiler import meet, nieuw_profiel, profiel_actief
+
+STAPPEN = [
+    "Inlezen Datagrid",
+    "Inlezen LIKP",
+    "Validatie",
+    "Dedup",
+    "LIKP-join",
+    "Performances",
+    "Periodes",
+    "Kolombeleid",
+]
+
+# Aantal afgeronde jobs waarvan de status bewaard blijft
+MAX_AFGERONDE_JOBS = 20
+
+# Eén gedeelde worker-pool voor het hele proces
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="otd-pipeline")
+_lock = threading.Lock()
+_jobs: dict[str, dict] = {}
+
+
+def _als_bestand(inhoud: bytes, naam: str) -> BytesIO:
+    """Bytes als file-like object met .name, zoals lees_bestand verwacht."""
+    buffer = BytesIO(inhoud)
+    buffer.name = naam
+    return buffer
+
+
+def verwerk(
+    dg_inhoud: bytes,
+    dg_naam: str,
+    lk_inhoud: bytes,
+    lk_naam: str,
+    bij_stap: Callable[[str], None] | None = None,
+    schema_rapport: dict | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """Voer de volledige pipeline uit. Retourneert (df, mismatches) of None bij validatiefout.
+
+    bij_stap wordt aangeroepen vlak voordat een stap begint. Een meegegeven
+    schema_rapport-dict wordt gevuld met het rapport van de schema-resolutie.
+    """
+    def stap(naam: str):
+        if bij_stap is not None:
+            bij_stap(naam)
+
+    stap("Inlezen Datagrid")
+    df_dg_raw = lees_bestand(_als_bestand(dg_inhoud, dg_naam), "datagrid")
+    stap("Inlezen LIKP")
+    df_lk_raw = lees_bestand(_als_bestand(lk_inhoud, lk_naam), "likp")
+
+    stap("Validatie")
+    df_dg, df_lk, rapport = valideer_bronnen(df_dg_raw, df_lk_raw)
+    if schema_rapport is not None:
+        schema_rapport.update(rapport)
+    if df_dg is None or df_lk is None:
+        return None
+
+    stap("Dedup")
+    df_dg = dedup_datagrid(df_dg)
+    stap("LIKP-join")
+    df_joined, df_mismatches = join_likp(df_dg, df_lk)
+    stap("Performances")
+    df_processed = bereken_performances(df_joined)
+    stap("Periodes")
+    df_processed = voeg_periode_kolommen_toe(df_processed)
+    stap("Kolombeleid")
+    return snoei_kolommen(df_processed), df_mismatches
+
+
+def _draai_job(
+    job: dict, dg_inhoud: bytes, dg_naam: str, lk_inhoud: bytes, lk_naam: str, geheugen: bool,
+):
+    """Worker: voer de pipeline uit (geprofileerd) en werk de job-status bij."""
+    vorige = {"naam": None, "start": 0.0}
+
+    def bij_stap(naam: str):
+        nu = time.perf_counter()
+        if vorige["naam"] is not None:
+            job["stappen"].append({"stap": vorige["naam"], "sec": nu - vorige["start"]})
+        vorige.update(naam=naam, start=nu)
+        job["stap"] = naam
+        job["voortgang"] = STAPPEN.index(naam) / len(STAPPEN)
+
+    job["status"] = "bezig"
+    try:
+        with verzamel_meldingen() as meldingen, profiel_actief(job["profiel"]):
+            job["meldingen"] = meldingen
+            with meet("Verwerking upload") as meting:
+                resultaat = verwerk(
+                    dg_inhoud, dg_naam, lk_inhoud, lk_naam, bij_stap=bij_stap, schema_rapport=job["schema"],
+                )
+                meting["rijen_uit"] = len(resultaat[0]) if resultaat is not None else None
+        if vorige["naam"] is not None:
+            job["stappen"].append({"stap": vorige["naam"], "sec": time.perf_counter() - vorige["start"]})
+
+        if resultaat is None:
+            job["status"] = "fout"
+            job["fout"] = "Validatie mislukt"
+            return
+
+        df, mismatches = resultaat
+        register.publiceer(
+            job["sleutel"], df,
+            mismatches=mismatches, stappen=list(job["stappen"]), profiel=job["profiel"], schema=job["schema"],
+        )
+        job["n_orders"] = len(df)
+        job["n_match"] = len(df) - len(mismatches)
+        job["voortgang"] = 1.0
+        job["status"] = "klaar"
+    except Exception as e:
+        job["status"] = "fout"
+        job["fout"] = f"{type(e).__name__}: {e}"
+    finally:
+        job["duur"] = time.perf_counter() - job["start"]
+
+
+def start_job(
+    sleutel: str, dg_inhoud: bytes, dg_naam: str, lk_inhoud: bytes, lk_naam: str,
+    geheugen: bool = False,
+) -> dict:
+    """Start (of hergebruik) een achtergrondjob voor deze dataset-sleutel.
+
+    geheugen=True meet ook piekgeheugen per stap (tracemalloc, trager).
+
+    Draait er al een job voor dezelfde sleutel — bijv. dezelfde upload in een andere
+    sessie — dan wordt die job geretourneerd in plaats van opnieuw te verwerken.
+    """
+    with _lock:
+        job = _jobs.get(sleutel)
+        if job is not None and job["status"] in ("wachten", "bezig"):
+            return job
+        job = {
+            "sleutel": sleutel,
+            "status": "wachten",
+            "stap": None,
+            "voortgang": 0.0,
+            "stappen": [],
+            "meldingen": [],
+            "schema": {},
+            "fout": None,
+            "start": time.perf_counter(),
+            "duur": None,
+            "profiel": nieuw_profiel("Verwerking upload", geheugen=geheugen),
+        }
+        _jobs[sleutel] = job
+        # Oude afgeronde jobs opruimen
+        afgerond = [s for s, j in _jobs.items() if j["status"] in ("klaar", "fout")]
+        for oud in afgerond[:max(0, len(afgerond) - MAX_AFGERONDE_JOBS)]:
+            del _jobs[oud]
+    _executor.submit(_draai_job, job, dg_inhoud, dg_naam, lk_inhoud, lk_naam, geheugen)
+    return job
+
+
+def haal_job(sleutel: str | None) -> dict | None:
+    """Status van de job voor deze sleutel (None als er geen is)."""
+    if sleutel is None:
+        return None
+    with _lock:
+        return _jobs.get(sleutel)
@@ -9,31 +9,19 @@ import pandas as pd
 import numpy as np
 
 from src.config import get_otd_config, get_performance_config, get_alle_performances, get_dedup_config
+from src.data.schema import los_schema_op
 from src.utils.constants import (
-    PERFORMANCE_STAPPEN, PERFORMANCE_IDS, PERFORMANCE_NAMEN,
-    BESCHIKBARE_STAPPEN, BESCHIKBARE_IDS,
+    PERFORMANCE_STAPPEN, PERFORMANCE_IDS, BESCHIKBARE_IDS, FAAL_KETEN, FAAL_NAMEN,
 )
-
-# LIKP kolomnaam-mapping: SAP SE16n export kan afwijkende namen hebben
-_LIKP_KOLOM_ALIASSEN = {
-    "Leveringstermijn": ["Leveringstermijn", "Lev.termijn", "LFDAT"],
-    "Pickdatum": ["Pickdatum", "KODAT"],
-    "Gecreëerd op": ["Gecreëerd op", "Gecr. op", "ERDAT"],
-}
+from src.utils.profiler import profileer
 
 
 def _normaliseer_likp_kolommen(df_likp: pd.DataFrame) -> pd.DataFrame:
-    """Hernoem bekende LIKP kolomnaam-varianten naar standaard namen."""
-    df = df_likp.copy()
-    for standaard, aliassen in _LIKP_KOLOM_ALIASSEN.items():
-        if standaard not in df.columns:
-            for alias in aliassen:
-                if alias in df.columns:
-                    df = df.rename(columns={alias: standaard})
-                    break
-    return df
+    """Hernoem bekende LIKP kolomnaam-varianten naar standaard namen (zie schema.py)."""
+    return los_schema_op(df_likp, "likp")[0]
 
 
+@profileer()
 def dedup_datagrid(df: pd.DataFrame) -> pd.DataFrame:
     """Dedupliceer datagrid op basis van config (standaard: DeliveryNumber)."""
     cfg = get_dedup_config()
@@ -45,6 +33,17 @@ def dedup_datagrid(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _join_sleutel(kolom: pd.Series) -> pd.Series:
+    """Join-sleutel als tekst zonder voorloopnullen (SAP '0080001234' = PowerBI '80001234').
+
+    Een al getypeerde sleutelkolom wordt niet opnieuw naar tekst geconverteerd.
+    """
+    if not (pd.api.types.is_string_dtype(kolom) and not pd.api.types.is_object_dtype(kolom)):
+        kolom = kolom.astype(str).str.strip()
+    return kolom.str.lstrip("0")
+
+
+@profileer()
 def join_likp(df_datagrid: pd.DataFrame, df_likp: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Join Datagrid met LIKP op DeliveryNumber = Levering.
     Voegt Leveringstermijn en Pickdatum toe aan datagrid.
@@ -63,10 +62,11 @@ def join_likp(df_datagrid: pd.DataFrame, df_likp: pd.DataFrame) -> tuple[pd.Data
     likp_subset = df_likp[likp_cols].copy()
 
     # Join: datagrid.DeliveryNumber = likp.Levering
-    # DeliveryNumber kan numeriek of string zijn, Levering ook — forceer naar string
+    # Na de validatie zijn beide al genormaliseerde tekst (zie schema.KOLOM_SCHEMA);
+    # anders kan het numeriek of string zijn — dan forceren naar string
     df = df_datagrid.copy()
-    df["_join_key"] = df["DeliveryNumber"].astype(str).str.strip()
-    likp_subset["_join_key"] = likp_subset["Levering"].astype(str).str.strip()
+    df["_join_key"] = _join_sleutel(df["DeliveryNumber"])
+    likp_subset["_join_key"] = _join_sleutel(likp_subset["Levering"])
 
     # Drop Levering kolom om dubbele namen te voorkomen
     likp_subset = likp_subset.drop(columns=["Levering"])
@@ -163,6 +163,7 @@ def _bereken_performance(df: pd.DataFrame, kpi_id: str) -> pd.Series:
 
 # --- Hoofd-functies ---
 
+@profileer()
 def bereken_performances(df: pd.DataFrame) -> pd.DataFrame:
     """Berekent de 6 performance booleans op basis van rekenmodel.yaml.
 
@@ -250,10 +251,13 @@ def bereken_kpi_scores(df: pd.DataFrame) -> dict[str, float | None]:
     return scores
 
 
+@profileer()
 def bereken_root_causes(df: pd.DataFrame) -> pd.DataFrame:
     """Bepaalt voor elke te late order de eerste falende beschikbare stap (root cause).
 
     Gebruikt otd_ok kolom als beschikbaar (config-driven) voor bepalen "te laat".
+    Is het dataset aan de Action Portal gekoppeld (slot_ok), dan telt het slot mee
+    als schakel vóór Carrier Transit (zie FAAL_KETEN).
     """
     # Bepaal te late orders via otd_ok kolom of datumvergelijking
     if "otd_ok" in df.columns:
@@ -271,7 +275,7 @@ def bereken_root_causes(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame(columns=["DeliveryNumber", "root_cause", "root_cause_naam"])
 
     def eerste_faal(row):
-        for stap in BESCHIKBARE_STAPPEN:
+        for stap in FAAL_KETEN:
             kpi_id = stap["id"]
             if kpi_id in row.index:
                 val = row[kpi_id]
@@ -284,7 +288,7 @@ def bereken_root_causes(df: pd.DataFrame) -> pd.DataFrame:
 
     te_laat["root_cause"] = te_laat.apply(eerste_faal, axis=1)
     te_laat["root_cause_naam"] = te_laat["root_cause"].map(
-        lambda x: PERFORMANCE_NAMEN.get(x, "Onbekend")
+        lambda x: FAAL_NAMEN.get(x, "Onbekend")
     )
 
     id_col = "DeliveryNumber" if "DeliveryNumber" in te_laat.columns else te_laat.columns[0]
@@ -318,10 +322,12 @@ def waterval_data(df: pd.DataFrame) -> pd.DataFrame:
     nummers = "\u2460\u2461\u2462\u2463\u2464\u2465"
     rijen = [{"stap": "Totaal Orders", "waarde": totaal_orders, "type": "totaal"}]
 
-    for stap in BESCHIKBARE_STAPPEN:
+    for stap in FAAL_KETEN:
         naam = stap["naam"]
         kpi_id = stap["id"]
-        nummer = nummers[stap["nummer"] - 1]
+        if kpi_id not in df.columns and stap["nummer"] is None:
+            continue
+        nummer = nummers[stap["nummer"] - 1] if stap["nummer"] else "🕒"
         aantal_faal = len(rc[rc["root_cause"] == kpi_id])
         rijen.append({
             "stap": f"{nummer} {naam}",
@@ -333,6 +339,102 @@ def waterval_data(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(rijen)
 
 
+def bouw_trend_matrix(
+    df: pd.DataFrame,
+    periode_kolom: str = "week",
+    dimensie: str | None = None,
+    kpi_kolommen: list[str] | None = None,
+) -> dict:
+    """Bouw een dichte (periode × dimensie × KPI) matrix met tellingen in één pass.
+
+    Periode en dimensie worden één keer gefactoriseerd (gesorteerd) tot een
+    gecombineerde celcode; per KPI volgt één bincount over die codes. Daarmee
+    kosten trendlijnen voor alle regio's/carriers/klanten één pass over de data,
+    ongeacht het aantal series.
+
+    Retourneert dict met:
+    - periodes: gesorteerde periode-labels (P)
+    - dimensies: gesorteerde dimensiewaarden (D), ["Totaal"] zonder dimensie
+    - kpis: KPI-kolommen (K), standaard otd_ok + beschikbare performances
+    - ok: int-array (P, D, K) — aantal OK per cel
+    - geldig: int-array (P, D, K) — aantal niet-NaN per cel (noemer)
+    - aantal: int-array (P, D) — aantal orders per cel
+    """
+    if kpi_kolommen is None:
+        kpi_kolommen = ["otd_ok"] + BESCHIKBARE_IDS
+    kpis = [k for k in kpi_kolommen if k in df.columns]
+
+    leeg = {
+        "periodes": [], "dimensies": [], "kpis": kpis,
+        "ok": np.zeros((0, 0, len(kpis)), dtype=np.int64),
+        "geldig": np.zeros((0, 0, len(kpis)), dtype=np.int64),
+        "aantal": np.zeros((0, 0), dtype=np.int64),
+    }
+    if periode_kolom not in df.columns or (dimensie is not None and dimensie not in df.columns):
+        return leeg
+
+    # Factoriseer periode (en dimensie); NaN-sleutels vallen weg zoals bij groupby
+    p_codes, periodes = pd.factorize(df[periode_kolom], sort=True)
+    if dimensie is not None:
+        d_codes, dimensies = pd.factorize(df[dimensie], sort=True)
+    else:
+        d_codes, dimensies = np.zeros(len(df), dtype=np.intp), pd.Index(["Totaal"])
+
+    n_p, n_d = len(periodes), len(dimensies)
+    if n_p == 0 or n_d == 0:
+        return leeg
+
+    geldige_rij = (p_codes >= 0) & (d_codes >= 0)
+    cel = (p_codes * n_d + d_codes)[geldige_rij]
+    n_cellen = n_p * n_d
+
+    aantal = np.bincount(cel, minlength=n_cellen).reshape(n_p, n_d)
+    ok = np.zeros((n_p, n_d, len(kpis)), dtype=np.int64)
+    geldig = np.zeros((n_p, n_d, len(kpis)), dtype=np.int64)
+
+    for i, kpi in enumerate(kpis):
+        waarden = pd.to_numeric(df[kpi], errors="coerce").to_numpy(dtype=float)[geldige_rij]
+        niet_nan = ~np.isnan(waarden)
+        geldig[:, :, i] = np.bincount(cel[niet_nan], minlength=n_cellen).reshape(n_p, n_d)
+        ok[:, :, i] = np.bincount(cel[niet_nan & (waarden == 1.0)], minlength=n_cellen).reshape(n_p, n_d)
+
+    return {
+        "periodes": periodes.tolist(),
+        "dimensies": dimensies.tolist(),
+        "kpis": kpis,
+        "ok": ok,
+        "geldig": geldig,
+        "aantal": aantal,
+    }
+
+
+def trend_matrix_naar_df(matrix: dict, kpi: str = "otd_ok") -> pd.DataFrame:
+    """Zet één KPI uit een trend-matrix om naar lang formaat.
+
+    Kolommen: periode, dimensie, pct (NaN bij lege noemer), aantal.
+    Alleen cellen met minimaal één order worden opgenomen.
+    """
+    kolommen = ["periode", "dimensie", "pct", "aantal"]
+    if kpi not in matrix["kpis"] or matrix["aantal"].size == 0:
+        return pd.DataFrame(columns=kolommen)
+
+    i = matrix["kpis"].index(kpi)
+    ok = matrix["ok"][:, :, i]
+    geldig = matrix["geldig"][:, :, i]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(geldig > 0, ok / np.maximum(geldig, 1) * 100, np.nan)
+
+    p_idx, d_idx = np.nonzero(matrix["aantal"] > 0)
+    periodes = np.asarray(matrix["periodes"], dtype=object)
+    dimensies = np.asarray(matrix["dimensies"], dtype=object)
+    return pd.DataFrame({
+        "periode": periodes[p_idx],
+        "dimensie": dimensies[d_idx],
+        "pct": pct[p_idx, d_idx],
+        "aantal": matrix["aantal"][p_idx, d_idx],
+    }, columns=kolommen)
+
+
 def groepeer_per_periode(df: pd.DataFrame, periode_kolom: str = "week") -> pd.DataFrame:
     """Groepeert performance-scores per periode (week of maand)."""
     if periode_kolom not in df.columns:
@@ -343,11 +445,16 @@ def groepeer_per_periode(df: pd.DataFrame, periode_kolom: str = "week") -> pd.Da
     if not cols:
         return pd.DataFrame()
 
-    # Converteer naar float voor aggregatie (NaN wordt genegeerd door mean)
-    df_num = df[[periode_kolom] + cols].copy()
-    for col in cols:
-        df_num[col] = pd.to_numeric(df_num[col], errors="coerce")
+    matrix = bouw_trend_matrix(df, periode_kolom, kpi_kolommen=cols)
+    if not matrix["periodes"]:
+        return pd.DataFrame()
+
+    # Eén kolom per performance; NaN waar geen enkele geldige waarde is (zoals mean)
+    ok = matrix["ok"][:, 0, :]
+    geldig = matrix["geldig"][:, 0, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(geldig > 0, ok / np.maximum(geldig, 1) * 100, np.nan)
 
-    resultaat = df_num.groupby(periode_kolom)[cols].mean() * 100
-    resultaat = resultaat.reset_index()
+    resultaat = pd.DataFrame(pct, columns=matrix["kpis"])
+    resultaat.insert(0, periode_kolom, matrix["periodes"])
     return resultaat
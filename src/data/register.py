@@ -0,0 +1,205 @@
+"""Procesbrede dataset-registry — één gedeelde, read-only kopie per dataset.
+
+Alle browsersessies die dezelfde upload of snapshot bekijken delen één verwerkt
+frame plus de daarvan afgeleide indexen. Datasets worden gesleuteld op een
+inhoudshash en met referenties per sessie bijgehouden, zodat geheugen groeit met
+het aantal verschillende datasets en niet met het aantal gelijktijdige gebruikers.
+
+Gedeelde frames worden nooit in-place aangepast: filters en pagina's maken
+altijd nieuwe frames (copy-on-write; app.py zet het aan voor pandas 2.x).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+from src.data.geheugen import geheugen_gebruik
+
+# Aantal datasets zonder actieve sessie dat nog bewaard blijft (snelle terugkeer)
+MAX_ONGEBRUIKT = 2
+
+# Afgeleiden met een variant in de naam ("soort:variant", bijv. per filter) per soort en
+# dataset; daarboven valt de langst niet gebruikte variant af
+MAX_VARIANTEN = 8
+
+_lock = threading.RLock()
+_datasets: dict[str, dict] = {}
+# (sessie_id, rol) → sleutel: een sessie houdt per rol (OTD-data, Action Portal) één dataset vast
+_sessie_koppeling: dict[tuple[str, str], str] = {}
+_bezig: dict[str, threading.Event] = {}
+
+
+def inhoud_hash(*delen: bytes | str) -> str:
+    """SHA-256 over één of meer byte/tekst-delen (bijv. bestandsinhoud + config-hash)."""
+    h = hashlib.sha256()
+    for deel in delen:
+        h.update(deel.encode("utf-8") if isinstance(deel, str) else deel)
+        h.update(b"\0")
+    return h.hexdigest()[:24]
+
+
+def _actieve_sessie(sessie_id: str) -> bool:
+    """Controleer via de Streamlit runtime of een sessie nog bestaat."""
+    try:
+        import streamlit as st
+        if not st.runtime.exists():
+            return True
+        return st.runtime.get_instance().is_active_session(sessie_id)
+    except Exception:
+        return True
+
+
+def huidige_sessie_id() -> str | None:
+    """Session-id van de huidige Streamlit-run (None buiten Streamlit)."""
+    try:
+        import streamlit as st
+        ctx = st.runtime.scriptrunner.get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
+    except Exception:
+        return None
+
+
+def _opruimen():
+    """Verwijder referenties van gesloten sessies en oude ongebruikte datasets. Lock vereist."""
+    for ref in [r for r in _sessie_koppeling if not _actieve_sessie(r[0])]:
+        sleutel = _sessie_koppeling.pop(ref)
+        if sleutel in _datasets:
+            _datasets[sleutel]["refs"].discard(ref)
+
+    ongebruikt = sorted(
+        (e["laatst_gebruikt"], s) for s, e in _datasets.items() if not e["refs"]
+    )
+    for _, sleutel in ongebruikt[:max(0, len(ongebruikt) - MAX_ONGEBRUIKT)]:
+        del _datasets[sleutel]
+
+
+def publiceer(sleutel: str, df: pd.DataFrame, **extra: Any) -> dict:
+    """Registreer een verwerkt dataset onder zijn sleutel (atomair vervangen).
+
+    extra: bijbehorende frames/metadata (bijv. mismatches=...), opgeslagen in de entry.
+    """
+    entry = {
+        "sleutel": sleutel,
+        "df": df,
+        "extra": extra,
+        "bytes": geheugen_gebruik(df) + sum(
+            geheugen_gebruik(v) for v in extra.values() if isinstance(v, pd.DataFrame)
+        ),
+        "afgeleid": {},
+        "refs": set(),
+        "geladen": time.time(),
+        "laatst_gebruikt": time.time(),
+    }
+    with _lock:
+        if sleutel in _datasets:
+            entry["refs"] = _datasets[sleutel]["refs"]
+        _datasets[sleutel] = entry
+        _opruimen()
+    return entry
+
+
+def haal(sleutel: str | None) -> dict | None:
+    """Haal een geregistreerde dataset-entry op (None als onbekend)."""
+    if sleutel is None:
+        return None
+    with _lock:
+        entry = _datasets.get(sleutel)
+        if entry is not None:
+            entry["laatst_gebruikt"] = time.time()
+        return entry
+
+
+def haal_of_maak(
+    sleutel: str, maak: Callable[[], pd.DataFrame | tuple[pd.DataFrame, dict] | None],
+) -> dict | None:
+    """Haal een dataset op of bouw hem precies één keer, ook bij gelijktijdige sessies.
+
+    maak() geeft een DataFrame of (DataFrame, extra) — extra zoals bij publiceer.
+    Andere sessies die tijdens het bouwen dezelfde sleutel vragen wachten op het
+    resultaat in plaats van zelf te verwerken. Retourneert None als maak() None geeft.
+    """
+    while True:
+        with _lock:
+            entry = _datasets.get(sleutel)
+            if entry is not None:
+                entry["laatst_gebruikt"] = time.time()
+                return entry
+            wacht = _bezig.get(sleutel)
+            if wacht is None:
+                _bezig[sleutel] = threading.Event()
+                break
+        wacht.wait()
+        with _lock:
+            if sleutel not in _datasets:
+                return None
+
+    try:
+        resultaat = maak()
+        if resultaat is None:
+            return None
+        df, extra = resultaat if isinstance(resultaat, tuple) else (resultaat, {})
+        return publiceer(sleutel, df, **extra)
+    finally:
+        with _lock:
+            _bezig.pop(sleutel).set()
+
+
+def koppel(sleutel: str, sessie_id: str | None = None, rol: str = "otd") -> None:
+    """Koppel een sessie aan een dataset en laat de vorige dataset van die sessie in
+    dezelfde rol los (bijv. rol "action_portal" naast de OTD-data)."""
+    sessie_id = sessie_id or huidige_sessie_id()
+    if sessie_id is None:
+        return
+    ref = (sessie_id, rol)
+    with _lock:
+        vorige = _sessie_koppeling.get(ref)
+        if vorige == sleutel:
+            return
+        if vorige in _datasets:
+            _datasets[vorige]["refs"].discard(ref)
+        if sleutel in _datasets:
+            _datasets[sleutel]["refs"].add(ref)
+            _sessie_koppeling[ref] = sleutel
+        _opruimen()
+
+
+def afgeleid(sleutel: str, naam: str, maak: Callable[[pd.DataFrame], Any]) -> Any:
+    """Gedeelde afgeleide index/aggregatie per dataset, één keer berekend.
+
+    Voorbeeld: afgeleid(sleutel, "trend_week_regio", lambda df: bouw_trend_matrix(...)).
+    Namen als "soort:variant" (bijv. per filterstatus) worden per soort begrensd op
+    MAX_VARIANTEN. Zonder geregistreerde dataset wordt niets gecachet en None geretourneerd.
+    """
+    entry = haal(sleutel)
+    if entry is None:
+        return None
+    cache = entry["afgeleid"]
+    with _lock:
+        if naam in cache:
+            cache[naam] = cache.pop(naam)  # achteraan: recent gebruikt
+            return cache[naam]
+
+    waarde = maak(entry["df"])
+    with _lock:
+        waarde = cache.setdefault(naam, waarde)
+        soort, variant, _ = naam.partition(":")
+        if variant:
+            varianten = [n for n in cache if n.startswith(soort + ":")]
+            for oud in varianten[:max(0, len(varianten) - MAX_VARIANTEN)]:
+                del cache[oud]
+    return waarde
+
+
+def statistiek() -> dict:
+    """Overzicht van de registry: aantal datasets, totaal geheugen, sessies per dataset."""
+    with _lock:
+        return {
+            "datasets": len(_datasets),
+            "bytes": sum(e["bytes"] for e in _datasets.values()),
+            "sessies": {s: len({ref[0] for ref in e["refs"]}) for s, e in _datasets.items()},
+        }
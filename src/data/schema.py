@@ -0,0 +1,348 @@
+"""Schema-resolutie voor Datagrid (PowerBI) en LIKP (SAP) — kolomnamen naar standaardnamen.
+
+Per frame wordt één genormaliseerde kolommap gebouwd (hoofdletterongevoelig, zonder
+spaties/leestekens/accenten, PowerBI-prefixen als 'Tabel[Kolom]' of 'Sum of ...'
+verwijderd). Elke verwachte kolom wordt daarna in O(1) opgezocht: eerst exact, dan
+genormaliseerd, dan via aliassen (SAP-technische namen, SE16n-varianten) en tot
+slot fuzzy, maar alleen voor kolommen met een aliaslijst en alleen tegen die
+aliassen (plus de standaardnaam). Het frame wordt in één keer hernoemd; elke
+hernoeming wordt gelogd en er komt een schema-rapport terug.
+
+Daarnaast een declaratief typeschema (KOLOM_SCHEMA) per bron: sleutelformaten,
+datums, toegestane statuswaarden en getallen. Hetzelfde schema bepaalt de dtypes
+bij inlezen (lees_dtypes) en de gevectoriseerde validatie (typeer_en_valideer).
+"""
+
+from __future__ import annotations
+
+import difflib
+import logging
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from src.utils.constants import (
+    DATAGRID_DATUM_KOLOMMEN,
+    DATAGRID_KOLOMMEN,
+    LIKP_DATUM_KOLOMMEN,
+    LIKP_KOLOMMEN,
+    VERPLICHTE_DATAGRID_KOLOMMEN,
+    VERPLICHTE_LIKP_KOLOMMEN,
+)
+
+# Bekende kolomnaam-varianten per bron (standaardnaam → aliassen)
+KOLOM_ALIASSEN = {
+    "datagrid": {
+        "DeliveryNumber": ["Delivery", "Delivery Nr", "Delivery No", "VBELN"],
+        "SalesOrderNumber": ["Sales Order", "Sales Order Nr", "VBELV"],
+        "SAP Delivery Date": ["SAP Deliv. Date", "SAPDeliveryDate"],
+        "PODDeliveryDateShipment": ["POD Delivery Date", "POD Date"],
+        "ChainName": ["Chain", "Customer Chain"],
+    },
+    "likp": {
+        "Levering": ["Delivery", "VBELN"],
+        "Leveringstermijn": ["Lev.termijn", "LFDAT", "Delivery Date"],
+        "Pickdatum": ["KODAT", "Picking Date"],
+        "Gecreëerd op": ["Gecr. op", "ERDAT", "Created On"],
+    },
+}
+
+# Verwachte en verplichte kolommen per bron
+SCHEMA_KOLOMMEN = {
+    "datagrid": {"verwacht": DATAGRID_KOLOMMEN, "verplicht": VERPLICHTE_DATAGRID_KOLOMMEN},
+    "likp": {"verwacht": list(LIKP_KOLOMMEN.values()), "verplicht": VERPLICHTE_LIKP_KOLOMMEN},
+}
+
+# Minimale gelijkenis (0–1) van genormaliseerde namen voor een fuzzy match tegen een alias
+FUZZY_DREMPEL = 0.85
+
+_log = logging.getLogger(__name__)
+
+# PowerBI-exportvarianten: 'Tabel'[Kolom] en aggregatieprefixen
+_TABEL_PREFIX = re.compile(r"^.*\[(.+)\]$")
+_AGGREGATIE_PREFIX = re.compile(r"^(sum of|count of|average of|min of|max of|first|last|som van|aantal van)\s+", re.I)
+_NIET_ALFANUMERIEK = re.compile(r"[^0-9a-z]")
+
+
+def normaliseer_naam(naam) -> str:
+    """Vergelijkingssleutel voor een kolomnaam: 'Lev.termijn' → 'levtermijn'."""
+    tekst = str(naam).strip()
+    tabel = _TABEL_PREFIX.match(tekst)
+    if tabel:
+        tekst = tabel.group(1)
+    tekst = _AGGREGATIE_PREFIX.sub("", tekst)
+    tekst = unicodedata.normalize("NFKD", tekst).encode("ascii", "ignore").decode("ascii")
+    return _NIET_ALFANUMERIEK.sub("", tekst.casefold())
+
+
+def kolom_map(kolommen) -> dict[str, str]:
+    """Genormaliseerde naam → originele kolomnaam (eerste wint bij dubbelen)."""
+    resultaat: dict[str, str] = {}
+    for kolom in kolommen:
+        resultaat.setdefault(normaliseer_naam(kolom), kolom)
+    return resultaat
+
+
+def los_schema_op(df: pd.DataFrame, bron: str, log: bool = True) -> tuple[pd.DataFrame, dict]:
+    """Herken de kolommen van een bron en hernoem ze naar standaardnamen.
+
+    bron: "datagrid" of "likp"; log: elke hernoeming loggen (uit voor alleen de header).
+    Retourneert (hernoemd frame, rapport) met rapport:
+    - bron, geldig (alle verplichte kolommen gevonden)
+    - gevonden: standaardnaam → originele kolomnaam
+    - hernoemd: originele naam → standaardnaam (alleen waar anders)
+    - methode: standaardnaam → "exact" / "genormaliseerd" / "alias" / "fuzzy"
+    - fuzzy: standaardnaam → {"kolom", "score"}
+    - ontbrekend: verplichte kolommen die niet gevonden zijn
+    - optioneel_ontbrekend: overige verwachte kolommen die niet gevonden zijn
+    - onbekend: kolommen in het bestand die aan geen verwachte kolom gekoppeld zijn
+    """
+    schema = SCHEMA_KOLOMMEN[bron]
+    aliassen = KOLOM_ALIASSEN.get(bron, {})
+    verwacht = list(dict.fromkeys(schema["verwacht"] + schema["verplicht"]))
+
+    exact = set(df.columns)
+    genorm = kolom_map(df.columns)
+    geclaimd: set[str] = set()
+    gevonden: dict[str, str] = {}
+    methode: dict[str, str] = {}
+
+    def claim(standaard: str, kolom: str, hoe: str):
+        gevonden[standaard] = kolom
+        methode[standaard] = hoe
+        geclaimd.add(kolom)
+
+    # 1. Exact (de normale situatie — geen hernoeming)
+    for standaard in verwacht:
+        if standaard in exact:
+            claim(standaard, standaard, "exact")
+
+    # 2. Genormaliseerd en 3. aliassen
+    for standaard in verwacht:
+        if standaard in gevonden:
+            continue
+        kolom = genorm.get(normaliseer_naam(standaard))
+        if kolom is not None and kolom not in geclaimd:
+            claim(standaard, kolom, "genormaliseerd")
+            continue
+        for alias in aliassen.get(standaard, []):
+            kolom = genorm.get(normaliseer_naam(alias))
+            if kolom is not None and kolom not in geclaimd:
+                claim(standaard, kolom, "alias")
+                break
+
+    # 4. Fuzzy, alleen voor overgebleven kolommen met een aliaslijst en alleen tegen die
+    #    aliassen: zo wordt een toevallig gelijkende, andere kolom nooit hernoemd
+    fuzzy: dict[str, dict] = {}
+    open_kolommen = {normaliseer_naam(k): k for k in df.columns if k not in geclaimd}
+    kandidaten = []
+    for standaard in verwacht:
+        if standaard in gevonden or standaard not in aliassen:
+            continue
+        doelen = {normaliseer_naam(naam) for naam in [standaard] + aliassen[standaard]}
+        for sleutel, kolom in open_kolommen.items():
+            score = max(difflib.SequenceMatcher(None, doel, sleutel).ratio() for doel in doelen)
+            if score >= FUZZY_DREMPEL:
+                kandidaten.append((score, standaard, kolom))
+    for score, standaard, kolom in sorted(kandidaten, key=lambda k: -k[0]):
+        if standaard in gevonden or kolom in geclaimd:
+            continue
+        claim(standaard, kolom, "fuzzy")
+        fuzzy[standaard] = {"kolom": kolom, "score": round(score, 3)}
+
+    hernoemd = {kolom: standaard for standaard, kolom in gevonden.items() if kolom != standaard}
+    if hernoemd:
+        df = df.rename(columns=hernoemd)
+        if log:
+            for kolom, standaard in hernoemd.items():
+                _log.info("%s: kolom '%s' hernoemd naar '%s' (%s)", bron, kolom, standaard, methode[standaard])
+
+    ontbrekend = [k for k in schema["verplicht"] if k not in gevonden]
+    rapport = {
+        "bron": bron,
+        "geldig": not ontbrekend,
+        "gevonden": gevonden,
+        "hernoemd": hernoemd,
+        "methode": methode,
+        "fuzzy": fuzzy,
+        "ontbrekend": ontbrekend,
+        "optioneel_ontbrekend": [k for k in verwacht if k not in gevonden and k not in ontbrekend],
+        "onbekend": [k for k in df.columns if k not in gevonden],
+    }
+    return df, rapport
+
+
+# --- Typeschema ---
+#
+# Per bron en standaardkolom het type en eventuele formaatregels:
+# - sleutel: tekst na strip; optioneel patroon (regex); '80001234.0' wordt hersteld.
+#   Voorloopnullen blijven staan (SAP levert '0080001234', PowerBI '80001234'):
+#   gebruikers zien de sleutel zoals in hun bron, de join normaliseert zelf.
+# - datum: dd-mm-jjjj; rijen in een ander formaat vallen terug op de trage parser
+#   en worden gemeld.
+# - status: toegestane waarden (hoofdletterongevoelig), aangevuld met ok_values en
+#   no_pod_values uit rekenmodel.yaml voor kolommen die daar als bron staan.
+# - getal: numeriek; niet-numerieke waarden worden NaN en gemeld.
+_SLEUTEL = {"type": "sleutel", "patroon": r"\d+"}
+_DATUM = {"type": "datum"}
+_GETAL = {"type": "getal"}
+_KLANTSTATUS = {"type": "status", "waarden": ["OnTime", "Late", "NO POD"]}
+
+KOLOM_SCHEMA = {
+    "datagrid": {
+        "DeliveryNumber": _SLEUTEL,
+        "SalesOrderNumber": {"type": "sleutel", "patroon": r"\d+"},
+        "ShipmentNumber": {"type": "sleutel"},
+        "CustomerNumber": {"type": "sleutel"},
+        **{kolom: _DATUM for kolom in DATAGRID_DATUM_KOLOMMEN},
+        "DAYS_TO_LATE": _GETAL,
+        "DAYS_DELAY_GI": _GETAL,
+        "PERFORMANCE_CAPACITY": {"type": "status", "waarden": ["not moved", "moved"]},
+        "PERFORMANCE_LOGISTIC": {"type": "status", "waarden": ["On schedule", "Late"]},
+        "PERFORMANCE_TRANSPORT": _KLANTSTATUS,
+        "PERFORMANCE_CUSTOMER": _KLANTSTATUS,
+        "PERFORMANCE_CUSTOMER_FINAL": _KLANTSTATUS,
+        "PERFORMANCE_CUSTOMER_BOOK_IN": _KLANTSTATUS,
+    },
+    "likp": {
+        "Levering": _SLEUTEL,
+        **{kolom: _DATUM for kolom in LIKP_DATUM_KOLOMMEN},
+    },
+}
+
+# Aantal voorbeeldrijen per kolom in het rapport
+MAX_VOORBEELDEN = 5
+
+_DATUM_FORMAAT = "%d-%m-%Y"
+
+
+def lees_dtypes(kolommen, bron: str) -> dict[str, str]:
+    """dtype per originele kolomnaam voor read_csv/read_excel, via de schema-resolutie.
+
+    Sleutels worden als tekst ingelezen, zodat 80001234 geen 80001234.0 wordt en
+    voorloopnullen bewaard blijven.
+    """
+    _, rapport = los_schema_op(pd.DataFrame(columns=list(kolommen)), bron, log=False)
+    schema = KOLOM_SCHEMA.get(bron, {})
+    return {
+        origineel: "string"
+        for standaard, origineel in rapport["gevonden"].items()
+        if schema.get(standaard, {}).get("type") == "sleutel"
+    }
+
+
+def _status_waarden(bron: str, kolom: str, regel: dict) -> list[str]:
+    """Toegestane statuswaarden: schema + ok/no_pod-waarden uit rekenmodel.yaml."""
+    from src.config import get_alle_performances, get_otd_config
+
+    waarden = list(regel.get("waarden", []))
+    if bron == "datagrid":
+        for cfg in [get_otd_config()] + list(get_alle_performances().values()):
+            if kolom in (cfg.get("source_column"), cfg.get("vergelijk_kolom")):
+                waarden += cfg.get("ok_values", []) + cfg.get("no_pod_values", [])
+    return waarden
+
+
+def _kolom_info(kolom: pd.Series, leeg: pd.Series, ongeldig: pd.Series, hersteld: int, melding: str | None) -> dict:
+    """Rapportregel voor één kolom, met de eerste ongeldige rijen als voorbeeld."""
+    voorbeelden = kolom[ongeldig].head(MAX_VOORBEELDEN)
+    return {
+        "leeg": int(leeg.sum()),
+        "hersteld": hersteld,
+        "ongeldig": int(ongeldig.sum()),
+        "voorbeelden": [{"rij": idx, "waarde": str(w)} for idx, w in voorbeelden.items()],
+        "melding": melding,
+    }
+
+
+def _typeer_sleutel(kolom: pd.Series, regel: dict) -> tuple[pd.Series, dict]:
+    tekst = kolom.astype("string").str.strip()
+    leeg = tekst.isna() | (tekst == "")
+    # Float-notatie uit Excel/CSV ('80001234.0') herstellen
+    float_notatie = tekst.str.fullmatch(r"\d+\.0+").fillna(False)
+    tekst = tekst.where(~float_notatie, tekst.str.replace(r"\.0+$", "", regex=True))
+    hersteld = int(float_notatie.sum())
+
+    if regel.get("patroon"):
+        ongeldig = ~leeg & ~tekst.str.fullmatch(regel["patroon"]).fillna(False)
+    else:
+        ongeldig = pd.Series(False, index=kolom.index)
+    melding = f"{int(ongeldig.sum())} waarden voldoen niet aan formaat {regel['patroon']}" if ongeldig.any() else None
+    return tekst.mask(leeg), _kolom_info(kolom, leeg, ongeldig, hersteld, melding)
+
+
+def _typeer_datum(kolom: pd.Series, regel: dict) -> tuple[pd.Series, dict]:
+    if pd.api.types.is_datetime64_any_dtype(kolom):
+        geen = pd.Series(False, index=kolom.index)
+        return kolom, _kolom_info(kolom, kolom.isna(), geen, 0, None)
+
+    leeg = kolom.isna() | (kolom.astype("string").str.strip() == "").fillna(True)
+    # Snel pad: vast formaat; alleen afwijkende rijen gaan door de trage parser
+    datums = pd.to_datetime(kolom, format=_DATUM_FORMAAT, errors="coerce")
+    afwijkend = datums.isna() & ~leeg
+    if afwijkend.any():
+        terugval = pd.to_datetime(kolom[afwijkend].astype(str), dayfirst=True, errors="coerce", format="mixed")
+        datums = datums.where(~afwijkend, terugval)
+    ongeldig = datums.isna() & ~leeg
+    hersteld = int((afwijkend & ~ongeldig).sum())
+
+    meldingen = []
+    if hersteld:
+        meldingen.append(f"{hersteld} waarden in een afwijkend datumformaat")
+    if ongeldig.any():
+        meldingen.append(f"{int(ongeldig.sum())} ongeldige datums")
+    return datums, _kolom_info(kolom, leeg, ongeldig, hersteld, "; ".join(meldingen) or None)
+
+
+def _typeer_status(kolom: pd.Series, toegestaan: list[str]) -> tuple[pd.Series, dict]:
+    # Alleen de unieke waarden normaliseren en controleren
+    codes, uniek = pd.factorize(kolom)
+    genorm = pd.Index(uniek).astype(str).str.strip().str.lower()
+    onbekend = ~genorm.isin([w.lower() for w in toegestaan])
+    ongeldig = pd.Series(np.append(onbekend, False)[codes], index=kolom.index)
+    onbekende_waarden = sorted(map(str, pd.Index(uniek)[onbekend]))
+    melding = f"onbekende waarden: {', '.join(onbekende_waarden[:MAX_VOORBEELDEN])}" if onbekende_waarden else None
+    return kolom, _kolom_info(kolom, kolom.isna(), ongeldig, 0, melding)
+
+
+def _typeer_getal(kolom: pd.Series, regel: dict) -> tuple[pd.Series, dict]:
+    getallen = pd.to_numeric(kolom, errors="coerce")
+    leeg = kolom.isna()
+    ongeldig = getallen.isna() & ~leeg
+    melding = f"{int(ongeldig.sum())} niet-numerieke waarden" if ongeldig.any() else None
+    return getallen, _kolom_info(kolom, leeg, ongeldig, 0, melding)
+
+
+def typeer_en_valideer(df: pd.DataFrame, bron: str) -> tuple[pd.DataFrame, dict]:
+    """Typeer de schemakolommen van een (hernoemd) frame en valideer ze, per kolom vectorized.
+
+    Retourneert (getypeerd frame, rapport) met rapport:
+    - bron
+    - kolommen: kolom → {type, leeg, hersteld, ongeldig, voorbeelden [{rij, waarde}], melding}
+    - ongeldig: totaal aantal ongeldige waarden over alle kolommen
+    """
+    schema = KOLOM_SCHEMA.get(bron, {})
+    df = df.copy()
+    kolommen = {}
+    for kolom, regel in schema.items():
+        if kolom not in df.columns:
+            continue
+        soort = regel["type"]
+        if soort == "sleutel":
+            waarden, info = _typeer_sleutel(df[kolom], regel)
+        elif soort == "datum":
+            waarden, info = _typeer_datum(df[kolom], regel)
+        elif soort == "status":
+            waarden, info = _typeer_status(df[kolom], _status_waarden(bron, kolom, regel))
+        else:
+            waarden, info = _typeer_getal(df[kolom], regel)
+        df[kolom] = waarden
+        kolommen[kolom] = {"type": soort, **info}
+
+    return df, {
+        "bron": bron,
+        "kolommen": kolommen,
+        "ongeldig": sum(k["ongeldig"] for k in kolommen.values()),
+    }
@@ -3,9 +3,31 @@
 from __future__ import annotations
 
 import os
+import threading
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
 
+# Per thread: lijst waarin meldingen worden verzameld (achtergrondjobs)
+_verzamelaar = threading.local()
+
+
+@contextmanager
+def verzamel_meldingen():
+    """Verzamel meldingen als (niveau, tekst) in plaats van ze te tonen.
+
+    Voor validatie buiten de Streamlit-scriptthread (bijv. een achtergrondjob),
+    waar st.* niet beschikbaar is. De lijst wordt bij binnenkomst geretourneerd.
+    """
+    meldingen: list[tuple[str, str]] = []
+    vorige = getattr(_verzamelaar, "lijst", None)
+    _verzamelaar.lijst = meldingen
+    try:
+        yield meldingen
+    finally:
+        _verzamelaar.lijst = vorige
+
 
 def _in_streamlit() -> bool:
     """Detecteer of we in Streamlit-context draaien."""
@@ -18,7 +40,11 @@ def _in_streamlit() -> bool:
 
 
 def _melding(niveau: str, tekst: str):
-    """Toon melding via Streamlit (dashboard) of print (CLI)."""
+    """Toon melding via Streamlit (dashboard) of print (CLI), of verzamel hem."""
+    lijst = getattr(_verzamelaar, "lijst", None)
+    if lijst is not None:
+        lijst.append((niveau, tekst))
+        return
     if _in_streamlit():
         import streamlit as st
         if niveau == "success":
@@ -36,236 +62,407 @@ def _melding(niveau: str, tekst: str):
 from src.utils.constants import (
     VERPLICHTE_DATAGRID_KOLOMMEN,
     VERPLICHTE_LIKP_KOLOMMEN,
-    DATAGRID_DATUM_KOLOMMEN,
-    LIKP_DATUM_KOLOMMEN,
     BESCHIKBARE_IDS,
     PERFORMANCE_NAMEN,
 )
+from src.data.schema import los_schema_op, typeer_en_valideer
+from src.utils.profiler import profileer
 
 
-def _zoek_kolom(df: pd.DataFrame, naam: str) -> str | None:
-    """Zoek kolom case-insensitive. Retourneert originele kolomnaam of None."""
-    naam_lower = naam.lower()
-    for kolom in df.columns:
-        if kolom.lower() == naam_lower:
-            return kolom
-    return None
-
-
-def _valideer_kolommen(df: pd.DataFrame, verplicht: list[str], bron: str) -> tuple[bool, list[str]]:
-    """Controleert of verplichte kolommen aanwezig zijn (case-insensitive).
-    Retourneert (is_valid, lijst_met_fouten).
+def _meld_schema(rapport: dict, naam: str, verplicht: list[str]) -> bool:
+    """Meld het resultaat van de schema-resolutie. Retourneert of de bron geldig is."""
+    if not rapport["geldig"]:
+        _melding("error", f"❌ {naam}: ontbrekende kolommen: {', '.join(rapport['ontbrekend'])}")
+        _melding("info", f"💡 Verwachte kolommen: {', '.join(verplicht)}")
+        return False
+    # Elke hernoeming melden, met hoe de kolom herkend is
+    herkend = [
+        f"'{kolom}' → '{standaard}' ({rapport['methode'][standaard]})"
+        for kolom, standaard in rapport["hernoemd"].items()
+    ]
+    if herkend:
+        _melding("info", f"ℹ️ {naam}: kolommen hernoemd: {', '.join(herkend)}")
+    return True
+
+
+def _meld_typen(rapport: dict, naam: str) -> None:
+    """Meld typeproblemen per kolom, met de eerste ongeldige rijen als voorbeeld."""
+    for kolom, info in rapport["kolommen"].items():
+        if not info["melding"]:
+            continue
+        voorbeelden = ", ".join(f"rij {v['rij']}: '{v['waarde']}'" for v in info["voorbeelden"])
+        niveau, icoon = ("warning", "⚠️") if info["ongeldig"] else ("info", "ℹ️")
+        _melding(niveau, f"{icoon} {naam} '{kolom}': {info['melding']}" + (f" ({voorbeelden})" if voorbeelden else ""))
+
+
+def _valideer_bron(df: pd.DataFrame, bron: str) -> tuple[pd.DataFrame | None, dict]:
+    """Schema-resolutie + hernoemen + typering/validatie (zie schema.KOLOM_SCHEMA) voor één bron.
+
+    Het rapport is dat van los_schema_op, aangevuld met "typen" (zie schema.typeer_en_valideer).
     """
-    fouten = []
-    ontbrekend = []
-    for kolom in verplicht:
-        if _zoek_kolom(df, kolom) is None:
-            ontbrekend.append(kolom)
-    if ontbrekend:
-        fouten.append(f"{bron}: ontbrekende kolommen: {', '.join(ontbrekend)}")
-    return len(fouten) == 0, fouten
-
-
-def _converteer_datums(df: pd.DataFrame, datum_kolommen: list[str]) -> pd.DataFrame:
-    """Converteert datumkolommen naar datetime (case-insensitive lookup)."""
-    df = df.copy()
-    for kolom_naam in datum_kolommen:
-        kolom = _zoek_kolom(df, kolom_naam)
-        if kolom is not None:
-            df[kolom] = pd.to_datetime(df[kolom], dayfirst=True, errors="coerce")
-            n_fout = df[kolom].isna().sum()
-            if n_fout > 0:
-                _melding("warning", f"⚠️ {n_fout} rijen met ongeldig datumformaat in '{kolom}'")
-    return df
-
-
+    naam, verplicht = {
+        "datagrid": ("Datagrid", VERPLICHTE_DATAGRID_KOLOMMEN),
+        "likp": ("LIKP", VERPLICHTE_LIKP_KOLOMMEN),
+    }[bron]
+    df, rapport = los_schema_op(df, bron)
+    if not _meld_schema(rapport, naam, verplicht):
+        return None, rapport
+    df, typen = typeer_en_valideer(df, bron)
+    _meld_typen(typen, naam)
+    return df, {**rapport, "typen": typen}
+
+
+@profileer()
 def valideer_datagrid(df: pd.DataFrame) -> pd.DataFrame | None:
     """Valideer en verwerk Datagrid (PowerBI export)."""
-    is_valid, fouten = _valideer_kolommen(df, VERPLICHTE_DATAGRID_KOLOMMEN, "Datagrid")
-    if not is_valid:
-        for fout in fouten:
-            _melding("error", f"❌ {fout}")
-        _melding("info", f"💡 Verwachte kolommen: {', '.join(VERPLICHTE_DATAGRID_KOLOMMEN)}")
-        return None
-
-    df = _converteer_datums(df, DATAGRID_DATUM_KOLOMMEN)
-    _melding("success", f"✅ Datagrid: {len(df)} orders geladen")
+    df, _ = _valideer_bron(df, "datagrid")
+    if df is not None:
+        _melding("success", f"✅ Datagrid: {len(df)} orders geladen")
     return df
 
 
+@profileer()
 def valideer_likp(df: pd.DataFrame) -> pd.DataFrame | None:
-    """Valideer en verwerk LIKP (SAP SE16n)."""
-    # Normaliseer bekende kolomnaam-varianten vóór validatie
-    from src.data.processor import _normaliseer_likp_kolommen
-    df = _normaliseer_likp_kolommen(df)
-
-    is_valid, fouten = _valideer_kolommen(df, VERPLICHTE_LIKP_KOLOMMEN, "LIKP")
-    if not is_valid:
-        for fout in fouten:
-            _melding("error", f"❌ {fout}")
-        _melding("info", f"💡 Verwachte kolommen: {', '.join(VERPLICHTE_LIKP_KOLOMMEN)}")
-        return None
-
-    df = _converteer_datums(df, LIKP_DATUM_KOLOMMEN)
-    _melding("success", f"✅ LIKP: {len(df)} leveringen geladen")
+    """Valideer en verwerk LIKP (SAP SE16n). Bekende kolomnaam-varianten worden hernoemd."""
+    df, _ = _valideer_bron(df, "likp")
+    if df is not None:
+        _melding("success", f"✅ LIKP: {len(df)} leveringen geladen")
     return df
 
 
-# --- Kruisvalidatie & Data Quality ---
+@profileer()
+def valideer_bronnen(
+    df_datagrid: pd.DataFrame, df_likp: pd.DataFrame,
+) -> tuple[pd.DataFrame | None, pd.DataFrame | None, dict]:
+    """Valideer en hernoem Datagrid en LIKP in één doorloop.
 
-def kruisvalidatie(df: pd.DataFrame) -> pd.DataFrame:
-    """Vergelijk Python-berekende KPI's met PowerBI-bronkolommen.
-
-    Retourneert een DataFrame met per KPI:
-    - kpi_naam, python_pct, powerbi_pct, verschil, status (✅/⚠️/❌)
+    Retourneert (datagrid, likp, schema_rapport) met schema_rapport
+    {"datagrid": ..., "likp": ...} (zie _valideer_bron). Een bron die niet
+    valideert wordt None.
     """
-    from src.config import get_performance_config, get_otd_config
-    from src.data.processor import bereken_otd
-
-    resultaten = []
+    df_dg, rapport_dg = _valideer_bron(df_datagrid, "datagrid")
+    df_lk, rapport_lk = _valideer_bron(df_likp, "likp")
+    if df_dg is not None:
+        _melding("success", f"✅ Datagrid: {len(df_dg)} orders geladen")
+    if df_lk is not None:
+        _melding("success", f"✅ LIKP: {len(df_lk)} leveringen geladen")
+    return df_dg, df_lk, {"datagrid": rapport_dg, "likp": rapport_lk}
 
-    # OTD kruisvalidatie
-    otd_cfg = get_otd_config()
-    python_otd = bereken_otd(df)
-    if otd_cfg.get("method") == "column":
-        src_col = otd_cfg.get("source_column", "")
-        if src_col in df.columns:
-            ok_vals = [v.lower() for v in otd_cfg.get("ok_values", [])]
-            no_pod_vals = [v.lower() for v in otd_cfg.get("no_pod_values", [])]
-            col = df[src_col].astype(str).str.strip().str.lower()
-            if no_pod_vals:
-                mask = ~col.isin(no_pod_vals) & df[src_col].notna()
-            else:
-                mask = df[src_col].notna()
-            valid = col[mask]
-            powerbi_otd = (valid.isin(ok_vals).sum() / len(valid) * 100) if len(valid) > 0 else 0.0
-            verschil = abs(python_otd - powerbi_otd)
-            resultaten.append({
-                "KPI": "OTD",
-                "Python %": round(python_otd, 2),
-                "PowerBI kolom %": round(powerbi_otd, 2),
-                "Verschil": round(verschil, 2),
-                "Status": _validatie_status(verschil),
-            })
-
-    # Per performance-stap
-    for kpi_id in BESCHIKBARE_IDS:
-        cfg = get_performance_config(kpi_id)
-        naam = PERFORMANCE_NAMEN.get(kpi_id, kpi_id)
 
-        # Python-berekend percentage
-        if kpi_id in df.columns:
-            valid_py = df[kpi_id].dropna()
-            python_pct = valid_py.astype(float).mean() * 100 if len(valid_py) > 0 else None
-        else:
-            python_pct = None
+# --- Kruisvalidatie & Data Quality ---
 
-        # PowerBI-bronkolom percentage (alleen bij method=column)
-        powerbi_pct = None
-        if cfg.get("method") == "column":
-            src_col = cfg.get("source_column", "")
-            if src_col in df.columns:
-                ok_vals = [v.lower() for v in cfg.get("ok_values", [])]
-                no_pod_vals = [v.lower() for v in cfg.get("no_pod_values", [])]
-                col = df[src_col].astype(str).str.strip().str.lower()
-                niet_leeg = df[src_col].notna()
-                if no_pod_vals:
-                    niet_leeg = niet_leeg & ~col.isin(no_pod_vals)
-                valid_pb = col[niet_leeg]
-                powerbi_pct = (valid_pb.isin(ok_vals).sum() / len(valid_pb) * 100) if len(valid_pb) > 0 else None
-
-        if python_pct is not None and powerbi_pct is not None:
-            verschil = abs(python_pct - powerbi_pct)
-            status = _validatie_status(verschil)
-        elif python_pct is not None:
-            verschil = None
-            status = "- (geen bronkolom)"
-        else:
-            verschil = None
-            status = "- (geen data)"
+# Codes per order voor de confusiematrix (rijen: Python, kolommen: PowerBI-bron)
+PYTHON_LABELS = ["ok", "niet ok", "geen data"]
+BRON_LABELS = ["ok", "niet ok", "NO POD", "leeg"]
+_OK, _FAAL, _NAN = 0, 1, 2
+_NO_POD, _LEEG = 2, 3
+
+# Redenen waarom Python en PowerBI voor een order van mening verschillen
+AFWIJKING_REDENEN = [
+    "NO POD",                             # PowerBI sluit uit, Python telt mee
+    "Bronkolom leeg",                     # Python heeft een waarde, PowerBI-kolom is leeg
+    "Waarde buiten ok_values",            # Python ok, bronwaarde niet in ok_values
+    "Waarde in ok_values",                # Python niet ok, bronwaarde wél in ok_values
+    "Python zonder waarde",               # bron gevuld, Python-kolom NaN
+    "Herberekening uit datums wijkt af",  # method=recalculate: datums geven ander oordeel
+    "Datum ontbreekt",                    # method=recalculate: datum leeg, bron gevuld
+]
+
+
+def _bron_codes(kolom: pd.Series, ok_values: list[str], no_pod_values: list[str]) -> np.ndarray:
+    """Classificeer een PowerBI-bronkolom per order (ok / niet ok / NO POD / leeg).
+
+    Normaliseert alleen de unieke waarden (strip + lowercase), niet elke rij.
+    NO POD gaat vóór ok, zoals in _bereken_from_column.
+    """
+    codes, uniek = pd.factorize(kolom)
+    genorm = pd.Index(uniek).astype(str).str.strip().str.lower()
+    ok_lower = [v.lower() for v in ok_values]
+    no_pod_lower = [v.lower() for v in no_pod_values]
+    per_uniek = np.where(
+        genorm.isin(no_pod_lower), _NO_POD, np.where(genorm.isin(ok_lower), _OK, _FAAL)
+    )
+    # Code -1 (NaN) valt op het laatste element: leeg
+    return np.append(per_uniek, _LEEG).astype(np.int8)[codes]
+
+
+def _python_codes(kolom: pd.Series) -> np.ndarray:
+    """Classificeer een berekende KPI-kolom (True/False/NaN) per order."""
+    waarden = pd.to_numeric(kolom, errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isnan(waarden), _NAN, np.where(waarden != 0, _OK, _FAAL)).astype(np.int8)
+
+
+def _pct(ok: int, totaal: int) -> float | None:
+    return ok / totaal * 100 if totaal > 0 else None
+
+
+def _bronkolom(cfg: dict) -> str | None:
+    """PowerBI-kolom om tegen te valideren: vergelijk_kolom als die er is, anders
+    source_column (method=column; de vergelijking is dan per order altijd gelijk)."""
+    if cfg.get("vergelijk_kolom"):
+        return cfg["vergelijk_kolom"]
+    if cfg.get("method") == "column":
+        return cfg.get("source_column") or None
+    return None
 
-        resultaten.append({
-            "KPI": naam,
-            "Python %": round(python_pct, 2) if python_pct is not None else None,
-            "PowerBI kolom %": round(powerbi_pct, 2) if powerbi_pct is not None else None,
-            "Verschil": round(verschil, 2) if verschil is not None else None,
-            "Status": status,
-        })
 
-    return pd.DataFrame(resultaten)
+def _afwijkingen(
+    df: pd.DataFrame, py: np.ndarray, bron: np.ndarray, bronkolom: str, herberekend: bool,
+) -> pd.DataFrame:
+    """Compacte index van alleen de orders waar Python en PowerBI verschillen, met reden."""
+    py_gevuld = py != _NAN
+    bron_gevuld = bron <= _FAAL
+    oneens = (py_gevuld & ~bron_gevuld) | (~py_gevuld & bron_gevuld) | (py_gevuld & bron_gevuld & (py != bron))
+    idx = np.flatnonzero(oneens)
+
+    p, b = py[idx], bron[idx]
+    herb = np.full(len(idx), herberekend)
+    code = {naam: i for i, naam in enumerate(AFWIJKING_REDENEN)}
+    reden = np.select(
+        [b == _NO_POD, b == _LEEG, (p == _NAN) & herb, p == _NAN, herb, p == _OK],
+        [
+            code["NO POD"], code["Bronkolom leeg"], code["Datum ontbreekt"],
+            code["Python zonder waarde"], code["Herberekening uit datums wijkt af"],
+            code["Waarde buiten ok_values"],
+        ],
+        default=code["Waarde in ok_values"],
+    )
+    id_kolom = df["DeliveryNumber"] if "DeliveryNumber" in df.columns else pd.Series(df.index, index=df.index)
+    return pd.DataFrame({
+        "DeliveryNumber": id_kolom.to_numpy()[idx],
+        "Python": pd.Categorical.from_codes(p, PYTHON_LABELS),
+        "PowerBI waarde": df[bronkolom].iloc[idx].astype("category").to_numpy(),
+        "Reden": pd.Categorical.from_codes(reden, AFWIJKING_REDENEN),
+    })
+
+
+def _kpi_vergelijking(
+    kpi_id: str, naam: str, py: np.ndarray | None, bron: np.ndarray | None, bronkolom: str | None,
+    df: pd.DataFrame, herberekend: bool = False,
+) -> dict:
+    """Vergelijk Python vs PowerBI voor één KPI vanuit de per-order codes."""
+    if py is not None and bron is not None:
+        confusie = np.bincount(py * 4 + bron, minlength=12).reshape(3, 4)
+    else:
+        confusie = None
 
+    if py is not None:
+        py_telling = np.bincount(py, minlength=3)
+        python_pct = _pct(py_telling[_OK], py_telling[_OK] + py_telling[_FAAL])
+    else:
+        python_pct = None
+    if bron is not None:
+        bron_telling = np.bincount(bron, minlength=4)
+        powerbi_pct = _pct(bron_telling[_OK], bron_telling[_OK] + bron_telling[_FAAL])
+    else:
+        powerbi_pct = None
 
-def _validatie_status(verschil: float) -> str:
-    """Bepaal status-icoon op basis van verschil."""
-    if verschil < 0.5:
-        return "✅"
-    elif verschil < 2.0:
-        return "⚠️"
+    if confusie is not None:
+        vergelijkbaar = int(confusie[:2, :2].sum())
+        eens = int(confusie[_OK, _OK] + confusie[_FAAL, _FAAL])
+        overeenstemming = {
+            "vergelijkbaar": vergelijkbaar,
+            "eens": eens,
+            "oneens": vergelijkbaar - eens,
+            "pct": _pct(eens, vergelijkbaar),
+        }
+        confusie_df = pd.DataFrame(confusie, index=PYTHON_LABELS, columns=BRON_LABELS)
+        afwijkingen = _afwijkingen(df, py, bron, bronkolom, herberekend)
     else:
-        return "❌"
+        overeenstemming = None
+        confusie_df = None
+        afwijkingen = None
 
+    return {
+        "id": kpi_id,
+        "naam": naam,
+        "bronkolom": bronkolom,
+        "python_pct": python_pct,
+        "powerbi_pct": powerbi_pct,
+        "overeenstemming": overeenstemming,
+        "confusie": confusie_df,
+        "afwijkingen": afwijkingen,
+    }
 
-def data_quality_rapport(df: pd.DataFrame) -> dict:
-    """Genereer een data quality rapport.
 
+def validatie_rapport(df: pd.DataFrame) -> dict:
+    """Kruisvalidatie en data quality in één doorloop over het frame.
+
+    Elke bronkolom wordt één keer genormaliseerd (ook als meerdere KPI's hem delen).
     Retourneert dict met:
+    - totaal_orders
+    - kpis: lijst per KPI met python_pct, powerbi_pct, verschil, status,
+      overeenstemming {vergelijkbaar, eens, oneens, pct} en confusie (DataFrame
+      Python × PowerBI, zie PYTHON_LABELS/BRON_LABELS) en afwijkingen (alleen de
+      orders waar Python en PowerBI verschillen, met reden uit AFWIJKING_REDENEN)
     - missing: dict[kolom] -> {count, pct}
-    - duplicaten: {voor_dedup, na_dedup, verwijderd}
+    - duplicaten: {totaal, uniek, duplicaten}
     - no_pod: {count, pct}
-    - nan_performances: dict[kpi_id] -> {count, pct}
+    - nan_performances: dict[kpi_id] -> {naam, count, pct}
+    - meldingen: waarschuwingen over de configuratie (één per bronkolom), om te tonen
+      door wie het rapport weergeeft — het rapport zelf wordt gedeeld gecachet
     """
-    from src.config import get_otd_config
+    from src.config import get_performance_config, get_otd_config
+    from src.data.processor import bereken_otd
 
     totaal = len(df)
+    bron_cache: dict[tuple, np.ndarray] = {}
+    meldingen: list[str] = []
+
+    def bron(cfg: dict) -> np.ndarray | None:
+        src_col = _bronkolom(cfg)
+        if src_col not in df.columns:
+            return None
+        if not cfg.get("ok_values"):
+            # Zonder ok_values telt elke bronwaarde als niet ok: niet vergelijken
+            melding = f"⚠️ '{src_col}' niet vergeleken: ok_values ontbreekt in rekenmodel.yaml"
+            if melding not in meldingen:
+                meldingen.append(melding)
+            return None
+        sleutel = (src_col, tuple(cfg.get("ok_values", [])), tuple(cfg.get("no_pod_values", [])))
+        if sleutel not in bron_cache:
+            bron_cache[sleutel] = _bron_codes(df[src_col], cfg.get("ok_values", []), cfg.get("no_pod_values", []))
+        return bron_cache[sleutel]
+
+    kpis = []
+    python_codes: dict[str, np.ndarray] = {}
+
+    # OTD — alleen vergelijkbaar als er een PowerBI-kolom voor OTD is
+    otd_cfg = get_otd_config()
+    otd_bron = bron(otd_cfg)
+    if otd_bron is not None:
+        otd_py = _python_codes(df["otd_ok"]) if "otd_ok" in df.columns else None
+        otd = _kpi_vergelijking(
+            "otd_ok", "OTD", otd_py, otd_bron, _bronkolom(otd_cfg), df,
+            herberekend=otd_cfg.get("method") == "recalculate",
+        )
+        # Zelfde semantiek als voorheen: 0% als er niets te vergelijken valt
+        otd["python_pct"] = otd["python_pct"] if otd_py is not None and otd["python_pct"] is not None else bereken_otd(df)
+        otd["powerbi_pct"] = otd["powerbi_pct"] if otd["powerbi_pct"] is not None else 0.0
+        kpis.append(otd)
 
-    # Missing values per verplichte kolom
-    verplicht = VERPLICHTE_DATAGRID_KOLOMMEN + ["Leveringstermijn", "Pickdatum"]
-    missing = {}
-    for kolom in verplicht:
-        if kolom in df.columns:
-            n_miss = df[kolom].isna().sum()
-            missing[kolom] = {"count": int(n_miss), "pct": round(n_miss / totaal * 100, 1) if totaal > 0 else 0}
-
-    # Duplicaten check
-    if "DeliveryNumber" in df.columns:
-        n_uniek = df["DeliveryNumber"].nunique()
-        n_dupl = totaal - n_uniek
-    else:
-        n_uniek = totaal
-        n_dupl = 0
-    duplicaten = {"totaal": totaal, "uniek": n_uniek, "duplicaten": n_dupl}
+    for kpi_id in BESCHIKBARE_IDS:
+        cfg = get_performance_config(kpi_id)
+        py = _python_codes(df[kpi_id]) if kpi_id in df.columns else None
+        if py is not None:
+            python_codes[kpi_id] = py
+        kpis.append(_kpi_vergelijking(
+            kpi_id, PERFORMANCE_NAMEN.get(kpi_id, kpi_id), py, bron(cfg), _bronkolom(cfg), df,
+            herberekend=cfg.get("method") == "recalculate",
+        ))
+
+    for kpi in kpis:
+        if kpi["python_pct"] is not None and kpi["powerbi_pct"] is not None:
+            kpi["verschil"] = abs(kpi["python_pct"] - kpi["powerbi_pct"])
+            kpi["status"] = _validatie_status(kpi["verschil"])
+        else:
+            kpi["verschil"] = None
+            kpi["status"] = "- (geen bronkolom)" if kpi["python_pct"] is not None else "- (geen data)"
+
+    # Missing values per verplichte kolom (één isna-scan over alle kolommen)
+    verplicht = [k for k in VERPLICHTE_DATAGRID_KOLOMMEN + ["Leveringstermijn", "Pickdatum"] if k in df.columns]
+    n_missing = df[verplicht].isna().sum() if verplicht else pd.Series(dtype=int)
+    missing = {
+        kolom: {"count": int(n), "pct": round(n / totaal * 100, 1) if totaal > 0 else 0}
+        for kolom, n in n_missing.items()
+    }
+
+    # Duplicaten
+    n_uniek = df["DeliveryNumber"].nunique() if "DeliveryNumber" in df.columns else totaal
+    duplicaten = {"totaal": totaal, "uniek": n_uniek, "duplicaten": totaal - n_uniek}
 
-    # NO POD telling
+    # NO POD telling uit source_column (niet vergelijk_kolom, en ook zonder ok_values)
     no_pod = {"count": 0, "pct": 0.0}
-    otd_cfg = get_otd_config()
-    if otd_cfg.get("method") == "column":
-        src_col = otd_cfg.get("source_column", "")
-        no_pod_vals = [v.lower() for v in otd_cfg.get("no_pod_values", [])]
-        if src_col in df.columns and no_pod_vals:
-            col = df[src_col].astype(str).str.strip().str.lower()
-            n_no_pod = col.isin(no_pod_vals).sum()
-            no_pod = {"count": int(n_no_pod), "pct": round(n_no_pod / totaal * 100, 1) if totaal > 0 else 0}
+    src_col = otd_cfg.get("source_column", "")
+    if otd_cfg.get("method") == "column" and otd_cfg.get("no_pod_values") and src_col in df.columns:
+        n_no_pod = int((_bron_codes(df[src_col], [], otd_cfg["no_pod_values"]) == _NO_POD).sum())
+        no_pod = {"count": n_no_pod, "pct": round(n_no_pod / totaal * 100, 1) if totaal > 0 else 0}
 
     # NaN in performance-kolommen
     nan_performances = {}
-    for kpi_id in BESCHIKBARE_IDS:
-        if kpi_id in df.columns:
-            n_nan = df[kpi_id].isna().sum()
-            nan_performances[kpi_id] = {
-                "naam": PERFORMANCE_NAMEN.get(kpi_id, kpi_id),
-                "count": int(n_nan),
-                "pct": round(n_nan / totaal * 100, 1) if totaal > 0 else 0,
-            }
+    for kpi_id, py in python_codes.items():
+        n_nan = int((py == _NAN).sum())
+        nan_performances[kpi_id] = {
+            "naam": PERFORMANCE_NAMEN.get(kpi_id, kpi_id),
+            "count": n_nan,
+            "pct": round(n_nan / totaal * 100, 1) if totaal > 0 else 0,
+        }
 
     return {
         "totaal_orders": totaal,
+        "kpis": kpis,
         "missing": missing,
         "duplicaten": duplicaten,
         "no_pod": no_pod,
         "nan_performances": nan_performances,
+        "meldingen": meldingen,
     }
 
 
+def kruisvalidatie_tabel(rapport: dict) -> pd.DataFrame:
+    """Kruisvalidatie-tabel uit een validatie_rapport."""
+    def rond(v):
+        return round(v, 2) if v is not None else None
+
+    return pd.DataFrame([
+        {
+            "KPI": kpi["naam"],
+            "Python %": rond(kpi["python_pct"]),
+            "PowerBI kolom %": rond(kpi["powerbi_pct"]),
+            "Verschil": rond(kpi["verschil"]),
+            "Eens %": rond(kpi["overeenstemming"]["pct"]) if kpi["overeenstemming"] else None,
+            "Status": kpi["status"],
+        }
+        for kpi in rapport["kpis"]
+    ])
+
+
+def afwijkingen_index(rapport: dict) -> pd.DataFrame:
+    """Alle afwijkende orders uit een validatie_rapport in één lange tabel (KPI, order, reden)."""
+    delen = [
+        kpi["afwijkingen"].assign(KPI=kpi["naam"], Bronkolom=kpi["bronkolom"])
+        for kpi in rapport["kpis"]
+        if kpi["afwijkingen"] is not None and len(kpi["afwijkingen"]) > 0
+    ]
+    kolommen = ["KPI", "DeliveryNumber", "Python", "Bronkolom", "PowerBI waarde", "Reden"]
+    if not delen:
+        return pd.DataFrame(columns=kolommen)
+    index = pd.concat(delen, ignore_index=True)[kolommen]
+    return index.astype({"KPI": "category", "Bronkolom": "category", "Reden": "category"})
+
+
+def kruisvalidatie(df: pd.DataFrame) -> pd.DataFrame:
+    """Vergelijk Python-berekende KPI's met PowerBI-bronkolommen.
+
+    Retourneert een DataFrame met per KPI:
+    - KPI, Python %, PowerBI kolom %, Verschil, Eens %, Status (✅/⚠️/❌)
+    """
+    return kruisvalidatie_tabel(validatie_rapport(df))
+
+
+def _validatie_status(verschil: float) -> str:
+    """Bepaal status-icoon op basis van verschil."""
+    if verschil < 0.5:
+        return "✅"
+    elif verschil < 2.0:
+        return "⚠️"
+    else:
+        return "❌"
+
+
+def data_quality_rapport(df: pd.DataFrame) -> dict:
+    """Genereer een data quality rapport (deelverzameling van validatie_rapport).
+
+    Retourneert dict met:
+    - missing: dict[kolom] -> {count, pct}
+    - duplicaten: {totaal, uniek, duplicaten}
+    - no_pod: {count, pct}
+    - nan_performances: dict[kpi_id] -> {count, pct}
+    """
+    rapport = validatie_rapport(df)
+    return {k: v for k, v in rapport.items() if k != "kpis"}
+
+
 def reconciliatie_data(df: pd.DataFrame) -> pd.DataFrame:
     """Maak per-order vergelijking Python vs PowerBI voor elke KPI.
 
@@ -296,3 +493,16 @@ def reconciliatie_data(df: pd.DataFrame) -> pd.DataFrame:
                 result[f"{naam}_powerbi ({src_col})"] = df[src_col]
 
     return result
+
+
+# Orders per blok bij het streamen van de reconciliatie naar Excel
+RECONCILIATIE_BLOK = 100_000
+
+
+def reconciliatie_blokken(df: pd.DataFrame, blokgrootte: int = RECONCILIATIE_BLOK):
+    """Reconciliatie per blok orders, voor streaming exports van grote datasets.
+
+    Levert altijd minstens één (eventueel leeg) blok, zodat de kolomkoppen bekend zijn.
+    """
+    for start in range(0, max(len(df), 1), blokgrootte):
+        yield reconciliatie_data(df.iloc[start:start + blokgrootte])
@@ -0,0 +1,225 @@
+"""Verblijftijden Action Portal — verdelingen, heatmaps en uitschieters met quantile sketches.
+
+Per shipment worden vier tijden in minuten bepaald (te laat, wachttijd, lostijd,
+totale verblijftijd), uit de minutenkolommen van de portal of anders uit de
+tijdstempels. Kwantielen komen uit een logaritmische histogram-sketch (zoals
+DDSketch): vaste buckets met relatieve fout ALPHA, optelbaar per cel. Eén
+histogram per metriek × DC × uur van de dag is genoeg voor de totale verdeling,
+per-DC-cijfers en de heatmap, in begrensd geheugen, ongeacht het aantal shipments.
+Shipments zonder Appointment-uur tellen mee in een eigen cel (ZONDER_UUR), zodat
+aantallen en kwantielen over dezelfde shipments gaan; de heatmap laat die cel weg.
+De data wordt in blokken verwerkt, zodat ook tussenresultaten begrensd blijven.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.utils.profiler import profileer
+
+# Relatieve fout van de sketch (1%) en grootste onderscheiden waarde (4 weken)
+ALPHA = 0.01
+MAX_MINUTEN = 4 * 7 * 24 * 60
+
+_GAMMA = (1 + ALPHA) / (1 - ALPHA)
+_K = int(np.ceil(np.log(MAX_MINUTEN) / np.log(_GAMMA)))
+# Buckets: negatief (K..0), nul (|x| < 1 minuut), positief (0..K)
+_NUL = _K + 1
+N_BUCKETS = 2 * _K + 3
+
+# Rijen per blok bij het verwerken
+BLOK = 100_000
+
+# Aantal uitschieters dat per metriek bewaard blijft
+MAX_UITSCHIETERS = 200
+
+KWANTIELEN = [0.5, 0.9, 0.99]
+
+# Uur-cel voor shipments zonder (geldig) Appointment-uur: na uur 0-23
+ZONDER_UUR = 24
+_N_UUR = ZONDER_UUR + 1
+
+# Metriek → minutenkolom van de portal, anders (van, tot) tijdstempels, anders de som van delen
+METRIEKEN = {
+    "Te laat": {"kolom": "Too late (min)", "van": "Appointment", "tot": "Arrival"},
+    "Wachttijd": {"kolom": "Waiting (min)", "van": "Arrival", "tot": "Start unloading"},
+    "Lostijd": {"kolom": "Unloading (min)", "van": "Start unloading", "tot": "Finished unloading"},
+    "Verblijftijd": {
+        "kolom": None, "van": "Arrival", "tot": "Finished unloading",
+        "delen": ["Waiting (min)", "Unloading (min)"],
+    },
+}
+
+
+# --- Sketch ---
+
+def bucket_index(waarden: np.ndarray) -> np.ndarray:
+    """Bucket per waarde (minuten); -1 voor NaN. Waarden boven MAX_MINUTEN vallen in de laatste bucket."""
+    waarden = np.asarray(waarden, dtype=float)
+    absoluut = np.abs(waarden)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.ceil(np.log(np.maximum(absoluut, 1.0)) / np.log(_GAMMA))
+    k = np.clip(np.nan_to_num(k), 0, _K).astype(np.int64)
+    idx = np.where(waarden >= 1, _NUL + 1 + k, np.where(waarden <= -1, _K - k, _NUL))
+    return np.where(np.isnan(waarden), -1, idx)
+
+
+def _bucket_waarden() -> np.ndarray:
+    """Representatieve waarde per bucket (midden in relatieve zin)."""
+    k = np.arange(_K + 1)
+    midden = 2 * _GAMMA ** k / (_GAMMA + 1)
+    return np.concatenate([-midden[::-1], [0.0], midden])
+
+
+_WAARDEN = _bucket_waarden()
+
+
+def kwantielen(telling: np.ndarray, qs: list[float] = KWANTIELEN) -> np.ndarray:
+    """Kwantielen uit een histogram (laatste as = buckets); NaN bij een lege cel."""
+    telling = np.asarray(telling)
+    cum = np.cumsum(telling, axis=-1)
+    totaal = cum[..., -1:]
+    uit = []
+    for q in qs:
+        rang = np.maximum(np.ceil(q * totaal), 1)
+        idx = np.minimum((cum < rang).sum(axis=-1), N_BUCKETS - 1)
+        uit.append(np.where(totaal[..., 0] > 0, _WAARDEN[idx], np.nan))
+    return np.stack(uit, axis=-1)
+
+
+# --- Analyse ---
+
+def _minuten(df: pd.DataFrame, cfg: dict) -> pd.Series:
+    """Minuten voor één metriek: portalkolom waar gevuld, anders uit de tijdstempels of de delen."""
+    afgeleid = pd.Series(np.nan, index=df.index)
+    if cfg["van"] in df.columns and cfg["tot"] in df.columns:
+        verschil = pd.to_datetime(df[cfg["tot"]], errors="coerce") - pd.to_datetime(df[cfg["van"]], errors="coerce")
+        afgeleid = verschil.dt.total_seconds() / 60
+    delen = cfg.get("delen", [])
+    if delen and all(k in df.columns for k in delen):
+        som = df[delen].apply(pd.to_numeric, errors="coerce").sum(axis=1, min_count=len(delen))
+        afgeleid = afgeleid.fillna(som)
+    if cfg["kolom"] and cfg["kolom"] in df.columns:
+        return pd.to_numeric(df[cfg["kolom"]], errors="coerce").fillna(afgeleid)
+    return afgeleid
+
+
+@profileer()
+def verblijftijd_analyse(df: pd.DataFrame) -> dict:
+    """Verblijftijden per metriek in één blokgewijze pass (plus één pass voor uitschieters).
+
+    Retourneert dict met:
+    - metrieken: namen (zie METRIEKEN)
+    - dcs: DC-labels (rijen van de histogrammen)
+    - histogram: metriek → int-array (DC, uur 0-23 plus ZONDER_UUR, N_BUCKETS)
+    - som, aantal: metriek → array per DC (minuten en shipments met een waarde)
+    - uitschieters: DataFrame met de grootste waarden boven p99, per metriek
+    """
+    dc_codes, dcs = pd.factorize(df["DC"].fillna("Onbekend") if "DC" in df.columns else pd.Series("Onbekend", index=df.index))
+    uur = (
+        pd.to_datetime(df["Appointment"], errors="coerce").dt.hour
+        if "Appointment" in df.columns else pd.Series(np.nan, index=df.index)
+    )
+    n_dc = max(len(dcs), 1)
+
+    histogram = {m: np.zeros((n_dc * _N_UUR, N_BUCKETS), dtype=np.int64) for m in METRIEKEN}
+    som = {m: np.zeros(n_dc) for m in METRIEKEN}
+    aantal = {m: np.zeros(n_dc, dtype=np.int64) for m in METRIEKEN}
+    kandidaten = {m: [] for m in METRIEKEN}
+
+    for start in range(0, len(df), BLOK):
+        blok = df.iloc[start:start + BLOK]
+        uur_blok = uur.iloc[start:start + BLOK].to_numpy(dtype=float)
+        dc_blok = dc_codes[start:start + BLOK]
+        cel = dc_blok * _N_UUR + np.nan_to_num(uur_blok, nan=ZONDER_UUR).astype(np.int64)
+        for metriek, cfg in METRIEKEN.items():
+            minuten = _minuten(blok, cfg).to_numpy(dtype=float)
+            idx = bucket_index(minuten)
+            ok = idx >= 0
+            histogram[metriek] += np.bincount(
+                cel[ok] * N_BUCKETS + idx[ok], minlength=n_dc * _N_UUR * N_BUCKETS,
+            ).reshape(n_dc * _N_UUR, N_BUCKETS)
+            gevuld = ~np.isnan(minuten)
+            som[metriek] += np.bincount(dc_blok[gevuld], weights=minuten[gevuld], minlength=n_dc)
+            aantal[metriek] += np.bincount(dc_blok[gevuld], minlength=n_dc)
+            # Grootste waarden per blok bewaren; drempel volgt na de pass
+            if gevuld.any():
+                reeks = pd.Series(minuten, index=blok.index)[gevuld]
+                kandidaten[metriek].append(reeks.nlargest(MAX_UITSCHIETERS))
+
+    histogram = {m: h.reshape(n_dc, _N_UUR, N_BUCKETS) for m, h in histogram.items()}
+
+    uitschieters = []
+    for metriek, reeksen in kandidaten.items():
+        if not reeksen:
+            continue
+        p99 = kwantielen(histogram[metriek].sum(axis=(0, 1)), [0.99])[0]
+        top = pd.concat(reeksen).nlargest(MAX_UITSCHIETERS)
+        top = top[top > p99]
+        if top.empty:
+            continue
+        kolommen = [k for k in ["Ship ID", "DC", "Appointment", "Inbound state"] if k in df.columns]
+        rijen = df.loc[top.index, kolommen].assign(Metriek=metriek, Minuten=top.round(1), **{"Drempel p99": round(p99, 1)})
+        uitschieters.append(rijen)
+
+    return {
+        "metrieken": list(METRIEKEN),
+        "dcs": [str(dc) for dc in dcs],
+        "histogram": histogram,
+        "som": som,
+        "aantal": aantal,
+        "uitschieters": pd.concat(uitschieters, ignore_index=True) if uitschieters else pd.DataFrame(),
+    }
+
+
+def beperk_dcs(analyse: dict, dcs: list | None) -> dict:
+    """Analyse beperkt tot de gekozen DC's (rijen van de histogrammen); zonder keuze ongewijzigd."""
+    if not dcs:
+        return analyse
+    keuze = [i for i, dc in enumerate(analyse["dcs"]) if dc in {str(d) for d in dcs}]
+    uitschieters = analyse["uitschieters"]
+    if not uitschieters.empty and "DC" in uitschieters.columns:
+        uitschieters = uitschieters[uitschieters["DC"].astype(str).isin([analyse["dcs"][i] for i in keuze])]
+    return {
+        **analyse,
+        "dcs": [analyse["dcs"][i] for i in keuze],
+        "histogram": {m: h[keuze] for m, h in analyse["histogram"].items()},
+        "som": {m: s[keuze] for m, s in analyse["som"].items()},
+        "aantal": {m: a[keuze] for m, a in analyse["aantal"].items()},
+        "uitschieters": uitschieters,
+    }
+
+
+def verdeling(analyse: dict) -> pd.DataFrame:
+    """Per metriek: aantal, gemiddelde en p50/p90/p99 (minuten)."""
+    rijen = []
+    for metriek in analyse["metrieken"]:
+        q = kwantielen(analyse["histogram"][metriek].sum(axis=(0, 1)))
+        aantal = int(analyse["aantal"][metriek].sum())
+        rijen.append({
+            "Metriek": metriek,
+            "Shipments": aantal,
+            "Gemiddeld": analyse["som"][metriek].sum() / aantal if aantal else np.nan,
+            **{f"p{int(k * 100)}": v for k, v in zip(KWANTIELEN, q)},
+        })
+    return pd.DataFrame(rijen)
+
+
+def per_dc(analyse: dict, metriek: str) -> pd.DataFrame:
+    """Per DC voor één metriek: aantal en p50/p90/p99."""
+    h = analyse["histogram"][metriek].sum(axis=1)
+    q = kwantielen(h)
+    tabel = pd.DataFrame(q, columns=[f"p{int(k * 100)}" for k in KWANTIELEN])
+    tabel.insert(0, "Shipments", h.sum(axis=1))
+    tabel.insert(0, "DC", analyse["dcs"])
+    return tabel[tabel["Shipments"] > 0].reset_index(drop=True)
+
+
+def heatmap(analyse: dict, metriek: str, q: float = 0.9) -> pd.DataFrame:
+    """DC × uur van de dag (0-23) met kwantiel q in minuten; NaN voor lege cellen.
+
+    Shipments zonder Appointment-uur (ZONDER_UUR) staan niet in de heatmap.
+    """
+    waarden = kwantielen(analyse["histogram"][metriek][:, :ZONDER_UUR], [q])[..., 0]
+    return pd.DataFrame(waarden, index=analyse["dcs"], columns=range(24))
@@ -56,6 +56,14 @@ def laad_feedback(limit: int = 10) -> list[dict]:
     return resultaten
 
 
+def feedback_versie() -> str:
+    """Versie van de feedback (aantal + nieuwste bestand); verandert bij elke nieuwe correctie."""
+    if not _FEEDBACK_DIR.exists():
+        return ""
+    bestanden = sorted(_FEEDBACK_DIR.glob("*.yaml"))
+    return f"{len(bestanden)}:{bestanden[-1].name}" if bestanden else ""
+
+
 def feedback_als_tekst(limit: int = 10) -> str:
     """Geef feedback terug als leesbare tekst voor LLM-context."""
     items = laad_feedback(limit)
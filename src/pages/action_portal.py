@@ -4,52 +4,50 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
-from src.utils.constants import (
-    ELHO_GROEN, ELHO_DONKER, ROOD, GRIJS, ORANJE,
-    ACTION_TIME_LABEL_GOED, ACTION_TIME_LABEL_SLECHT,
-)
-from src.utils.date_utils import week_label
+from src.data import register
+from src.data.action_kpi import action_aggregaat, filter_aggregaat, per_dc, per_week, slot_pct, totalen
+from src.data.verblijftijd import ALPHA, KWANTIELEN, beperk_dcs, heatmap, verblijftijd_analyse, verdeling
+from src.utils.constants import ELHO_GROEN, ELHO_DONKER, ROOD, GRIJS, ORANJE, ACTION_STATES
 
-# Inbound states die meetellen als "onze performance"
-ONZE_PERFORMANCE_STATES = ["Finished", "Cancelled", "NoShow"]
-SLECHT_STATES = ["Cancelled", "NoShow"]
 
+def _aggregaat(df: pd.DataFrame, sleutel: str | None) -> pd.DataFrame:
+    """Aggregaat per DC × dag, gedeeld gecachet per dataset."""
+    agg = register.afgeleid(sleutel, "action_aggregaat", action_aggregaat)
+    return agg if agg is not None else action_aggregaat(df)
 
-def render_action_portal(df: pd.DataFrame):
-    """Render de Action Portal pagina."""
+
+def render_action_portal(df: pd.DataFrame, sleutel: str | None = None):
+    """Render de Action Portal pagina.
+
+    sleutel: registry-sleutel van het dataset, voor het gedeelde aggregaat.
+    """
     st.header("Action Portal")
 
     if df is None or df.empty:
         st.warning("Geen Action Portal data beschikbaar.")
         return
 
-    # Sidebar filters
-    _render_action_filters(df)
-    df = _pas_action_filters_toe(df)
+    # Sidebar filters — op het aggregaat; alleen de detailtabel filtert shipments
+    agg = _aggregaat(df, sleutel)
+    _render_action_filters(agg)
+    filters = _action_filters()
+    dagen = agg["dag"].dropna()
+    agg = filter_aggregaat(agg, **filters)
 
-    if df.empty:
+    t = totalen(agg)
+    if t["totaal"] == 0:
         st.warning("Geen shipments gevonden voor de geselecteerde filters.")
         return
 
     # === Slot Performance ===
     # Onze performance = Finished vs Cancelled + NoShow (Refused/Removed = niet onze schuld)
-    df_onze = df[df["Inbound state"].isin(ONZE_PERFORMANCE_STATES)].copy()
-    totaal_onze = len(df_onze)
-    finished = (df_onze["Inbound state"] == "Finished").sum()
-    cancelled = (df_onze["Inbound state"] == "Cancelled").sum()
-    noshow = (df_onze["Inbound state"] == "NoShow").sum()
-    slot_pct = (finished / totaal_onze * 100) if totaal_onze > 0 else 0
-
-    # Refused apart (niet onze performance)
-    refused = (df["Inbound state"] == "Refused").sum()
-    removed = (df["Inbound state"] == "Removed").sum()
+    totaal_onze = int(t["onze"])
+    finished, cancelled, noshow = int(t["finished"]), int(t["cancelled"]), int(t["noshow"])
+    slot = slot_pct(t)
 
     # OTD van finished shipments (Early + On time vs Late)
-    df_finished = df_onze[df_onze["Inbound state"] == "Finished"].copy()
-    df_met_label = df_finished[df_finished["Time label"].notna()].copy()
-    totaal_met_label = len(df_met_label)
-    op_tijd = df_met_label["Time label"].isin(ACTION_TIME_LABEL_GOED).sum() if totaal_met_label > 0 else 0
-    te_laat = df_met_label["Time label"].isin(ACTION_TIME_LABEL_SLECHT).sum() if totaal_met_label > 0 else 0
+    totaal_met_label = int(t["met_label"])
+    op_tijd, te_laat = int(t["op_tijd"]), int(t["te_laat"])
     otd_pct = (op_tijd / totaal_met_label * 100) if totaal_met_label > 0 else 0
 
     # Toggle: Late meetellen in slot performance
@@ -64,12 +62,12 @@ def render_action_portal(df: pd.DataFrame):
         goed_slot = op_tijd
         slecht_slot = cancelled + noshow + te_laat
         totaal_slot = goed_slot + slecht_slot
-        slot_pct = (goed_slot / totaal_slot * 100) if totaal_slot > 0 else 0
+        slot = (goed_slot / totaal_slot * 100) if totaal_slot > 0 else 0
 
     # KPI headers
     col_slot, col_otd = st.columns(2)
     with col_slot:
-        _render_kpi_header("Slot Performance", slot_pct, totaal_onze,
+        _render_kpi_header("Slot Performance", slot, totaal_onze,
                            "Finished vs Cancelled + NoShow" + (" + Late" if tel_late_mee else ""))
     with col_otd:
         _render_kpi_header("OTD (Finished)", otd_pct, totaal_met_label,
@@ -81,8 +79,8 @@ def render_action_portal(df: pd.DataFrame):
     c1.metric("Finished", finished)
     c2.metric("Cancelled", cancelled)
     c3.metric("NoShow", noshow)
-    _metric_card_grijs(c4, "Refused", refused, "Door Action")
-    _metric_card_grijs(c5, "Removed", removed, "Gepland")
+    _metric_card_grijs(c4, "Refused", int(t["refused"]), "Door Action")
+    _metric_card_grijs(c5, "Removed", int(t["removed"]), "Gepland")
 
     st.markdown("---")
 
@@ -90,58 +88,129 @@ def render_action_portal(df: pd.DataFrame):
     col_links, col_rechts = st.columns([3, 2])
 
     with col_links:
-        _render_dc_barchart(df_onze, tel_late_mee)
+        _render_dc_barchart(agg, tel_late_mee)
 
     with col_rechts:
-        _render_pie_chart(df)
+        _render_pie_chart(t)
 
     st.markdown("---")
 
     # Trend chart
-    _render_trend_chart(df_onze, tel_late_mee)
+    _render_trend_chart(agg, tel_late_mee)
+
+    st.markdown("---")
+
+    # Verblijftijden (wachten, lossen, te laat)
+    _render_verblijftijden(_verblijftijden(df, sleutel, filters, dagen))
 
     st.markdown("---")
 
     # Detail tabel
-    _render_detail_tabel(df)
+    _render_detail_tabel(_pas_action_filters_toe(df, **filters))
 
 
-def _render_action_filters(df: pd.DataFrame):
-    """Render Action Portal specifieke sidebar filters."""
+def _render_action_filters(agg: pd.DataFrame):
+    """Render Action Portal specifieke sidebar filters (opties uit het aggregaat)."""
     st.sidebar.header("Action Portal Filters")
 
-    if "DC" in df.columns:
-        dcs = sorted(df["DC"].dropna().unique())
+    dcs = sorted(agg["DC"].dropna().unique())
+    if dcs:
         st.sidebar.multiselect("DC (distributiecentrum)", dcs, key="action_dc_filter")
 
-    if "Appointment" in df.columns:
-        datum_vals = df["Appointment"].dropna()
-        if not datum_vals.empty:
-            min_d = datum_vals.min().date()
-            max_d = datum_vals.max().date()
-            st.sidebar.date_input("Van", value=min_d, min_value=min_d, max_value=max_d, key="action_datum_van")
-            st.sidebar.date_input("Tot", value=max_d, min_value=min_d, max_value=max_d, key="action_datum_tot")
+    dagen = agg["dag"].dropna()
+    if not dagen.empty:
+        min_d = dagen.min().date()
+        max_d = dagen.max().date()
+        st.sidebar.date_input("Van", value=min_d, min_value=min_d, max_value=max_d, key="action_datum_van")
+        st.sidebar.date_input("Tot", value=max_d, min_value=min_d, max_value=max_d, key="action_datum_tot")
+
+
+def _action_filters() -> dict:
+    """Actieve filterwaarden uit de sessie."""
+    return {
+        "dcs": st.session_state.get("action_dc_filter", []),
+        "van": st.session_state.get("action_datum_van"),
+        "tot": st.session_state.get("action_datum_tot"),
+    }
 
 
-def _pas_action_filters_toe(df: pd.DataFrame) -> pd.DataFrame:
-    """Pas Action Portal filters toe."""
+def _pas_action_filters_toe(df: pd.DataFrame, dcs: list, van, tot) -> pd.DataFrame:
+    """Pas Action Portal filters toe op de shipments (voor de detailtabel)."""
     mask = pd.Series(True, index=df.index)
 
-    geselecteerde_dcs = st.session_state.get("action_dc_filter", [])
-    if geselecteerde_dcs:
-        mask &= df["DC"].isin(geselecteerde_dcs)
+    if dcs:
+        mask &= df["DC"].isin(dcs)
 
     if "Appointment" in df.columns:
-        datum_van = st.session_state.get("action_datum_van")
-        datum_tot = st.session_state.get("action_datum_tot")
-        if datum_van is not None:
-            mask &= df["Appointment"].dt.date >= datum_van
-        if datum_tot is not None:
-            mask &= df["Appointment"].dt.date <= datum_tot
+        if van is not None:
+            mask &= df["Appointment"].dt.date >= van
+        if tot is not None:
+            mask &= df["Appointment"].dt.date <= tot
 
     return df[mask]
 
 
+def _verblijftijden(df: pd.DataFrame, sleutel: str | None, filters: dict, dagen: pd.Series) -> dict:
+    """Verblijftijd-analyse: per dataset gecachet over het hele datumbereik, anders op de gefilterde shipments."""
+    van, tot = filters["van"], filters["tot"]
+    volledig = dagen.empty or (van in (None, dagen.min().date()) and tot in (None, dagen.max().date()))
+    if not volledig:
+        return verblijftijd_analyse(_pas_action_filters_toe(df, **filters))
+    analyse = register.afgeleid(sleutel, "verblijftijden", verblijftijd_analyse)
+    if analyse is None:
+        analyse = verblijftijd_analyse(df)
+    return beperk_dcs(analyse, filters["dcs"])
+
+
+def _render_verblijftijden(analyse: dict):
+    """Verdeling (p50/p90/p99), heatmap DC × uur en uitschieters per metriek."""
+    st.subheader("Verblijftijden")
+
+    tabel = verdeling(analyse)
+    if tabel["Shipments"].sum() == 0:
+        st.info("Geen tijden (minuten of tijdstempels) beschikbaar voor de geselecteerde shipments.")
+        return
+
+    st.dataframe(
+        tabel.round(1),
+        width="stretch",
+        hide_index=True,
+        column_config={k: st.column_config.NumberColumn(k, format="%.0f min") for k in ["Gemiddeld", "p50", "p90", "p99"]},
+    )
+    st.caption(f"Kwantielen uit een sketch met maximaal {ALPHA:.0%} relatieve afwijking.")
+
+    col_metriek, col_q = st.columns(2)
+    metriek = col_metriek.selectbox("Metriek", analyse["metrieken"], index=1, key="action_verblijf_metriek")
+    q = col_q.selectbox(
+        "Kwantiel", KWANTIELEN, index=1, format_func=lambda k: f"p{int(k * 100)}", key="action_verblijf_kwantiel",
+    )
+
+    kaart = heatmap(analyse, metriek, q).dropna(how="all")
+    if not kaart.empty:
+        fig = go.Figure(go.Heatmap(
+            z=kaart.values,
+            x=[f"{u:02d}:00" for u in kaart.columns],
+            y=kaart.index,
+            colorscale=[[0, ELHO_GROEN], [0.5, ORANJE], [1, ROOD]],
+            colorbar=dict(title="min"),
+            hovertemplate="%{y} %{x}<br>%{z:.0f} min<extra></extra>",
+        ))
+        fig.update_layout(
+            title=f"{metriek} p{int(q * 100)} per DC en uur (Appointment)",
+            height=120 + 40 * len(kaart),
+        )
+        st.plotly_chart(fig, width="stretch")
+
+    uitschieters = analyse["uitschieters"]
+    if not uitschieters.empty:
+        uitschieters = uitschieters[uitschieters["Metriek"] == metriek]
+    with st.expander(f"Uitschieters {metriek} (boven p99, {len(uitschieters)})"):
+        if uitschieters.empty:
+            st.write("Geen uitschieters.")
+        else:
+            st.dataframe(uitschieters.sort_values("Minuten", ascending=False), width="stretch", hide_index=True)
+
+
 def _render_kpi_header(titel: str, pct: float, totaal: int, subtitel: str):
     """KPI header blok."""
     kleur = ELHO_GROEN if pct >= 95 else ROOD
@@ -184,32 +253,18 @@ def _metric_card_grijs(col, label: str, waarde: int, hint: str):
     )
 
 
-def _render_dc_barchart(df: pd.DataFrame, tel_late_mee: bool):
+def _render_dc_barchart(agg: pd.DataFrame, tel_late_mee: bool):
     """Barchart: slot performance % per distributiecentrum."""
     st.subheader("Slot Performance per DC")
 
-    if "DC" not in df.columns:
+    dc_stats = per_dc(agg)
+    dc_stats = dc_stats[dc_stats["onze"] > 0]
+    if dc_stats.empty:
         st.info("Geen DC-data beschikbaar.")
         return
 
-    # Groepeer per DC
-    dc_groups = []
-    for dc, groep in df.groupby("DC"):
-        totaal = len(groep)
-        finished = (groep["Inbound state"] == "Finished").sum()
-
-        if tel_late_mee:
-            # Goed = Finished + On time/Early time labels
-            goed = groep["Time label"].isin(ACTION_TIME_LABEL_GOED).sum()
-            slecht = totaal - goed
-        else:
-            goed = finished
-            slecht = totaal - finished
-
-        pct = (goed / totaal * 100) if totaal > 0 else 0
-        dc_groups.append({"DC": dc, "pct": round(pct, 1), "totaal": totaal})
-
-    dc_stats = pd.DataFrame(dc_groups).sort_values("pct", ascending=True)
+    dc_stats["pct"] = slot_pct(dc_stats, tel_late_mee)
+    dc_stats = dc_stats.sort_values("pct", ascending=True)
 
     kleuren = [ELHO_GROEN if pct >= 95 else ROOD for pct in dc_stats["pct"]]
 
@@ -219,7 +274,7 @@ def _render_dc_barchart(df: pd.DataFrame, tel_late_mee: bool):
         x=dc_stats["pct"],
         orientation="h",
         marker_color=kleuren,
-        text=[f"{v:.0f}% ({t})" for v, t in zip(dc_stats["pct"], dc_stats["totaal"])],
+        text=[f"{v:.0f}% ({t})" for v, t in zip(dc_stats["pct"], dc_stats["onze"])],
         textposition="outside",
     ))
     fig.add_vline(x=95, line_dash="dash", line_color=ELHO_DONKER, annotation_text="Target 95%")
@@ -231,16 +286,18 @@ def _render_dc_barchart(df: pd.DataFrame, tel_late_mee: bool):
     st.plotly_chart(fig, width="stretch")
 
 
-def _render_pie_chart(df: pd.DataFrame):
-    """Pie chart: verdeling Inbound state."""
+def _render_pie_chart(t: pd.Series):
+    """Pie chart: verdeling Inbound state (uit de opgetelde tellingen)."""
     st.subheader("Inbound State Verdeling")
 
-    if "Inbound state" not in df.columns:
+    aantallen = {state: int(t[state.lower()]) for state in ACTION_STATES}
+    aantallen["Overig"] = int(t["overig"])
+    verdeling = pd.DataFrame(
+        [(state, n) for state, n in aantallen.items() if n > 0], columns=["Inbound state", "Aantal"],
+    ).sort_values("Aantal", ascending=False)
+    if verdeling.empty:
         return
 
-    verdeling = df["Inbound state"].value_counts().reset_index()
-    verdeling.columns = ["Inbound state", "Aantal"]
-
     kleur_map = {
         "Finished": ELHO_GROEN,
         "Cancelled": ROOD,
@@ -265,34 +322,18 @@ def _render_pie_chart(df: pd.DataFrame):
     st.plotly_chart(fig, width="stretch")
 
 
-def _render_trend_chart(df: pd.DataFrame, tel_late_mee: bool):
+def _render_trend_chart(agg: pd.DataFrame, tel_late_mee: bool):
     """Trend chart: slot performance % per week."""
     st.subheader("Slot Performance Trend per Week")
 
-    if "Appointment" not in df.columns:
-        st.info("Geen trenddata beschikbaar.")
-        return
-
-    df_trend = df.copy()
-    df_trend["week"] = df_trend["Appointment"].apply(week_label)
-    df_trend = df_trend[df_trend["week"] != "Onbekend"]
-
-    if df_trend.empty:
+    # Chronologisch op (jaar, week) — de labels zelf sorteren niet over jaargrenzen
+    trend = per_week(agg)
+    trend = trend[trend["onze"] > 0]
+    if trend.empty:
         st.info("Geen geldige datums voor trendberekening.")
         return
 
-    # Groepeer per week
-    trend_groups = []
-    for week, groep in df_trend.groupby("week"):
-        totaal = len(groep)
-        if tel_late_mee:
-            goed = groep["Time label"].isin(ACTION_TIME_LABEL_GOED).sum()
-        else:
-            goed = (groep["Inbound state"] == "Finished").sum()
-        pct = (goed / totaal * 100) if totaal > 0 else 0
-        trend_groups.append({"week": week, "pct": round(pct, 1), "totaal": totaal})
-
-    trend = pd.DataFrame(trend_groups).sort_values("week")
+    trend["pct"] = slot_pct(trend, tel_late_mee)
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(
@@ -302,7 +343,7 @@ def _render_trend_chart(df: pd.DataFrame, tel_late_mee: bool):
         name="Slot Performance %",
         line=dict(color=ELHO_GROEN, width=2),
         marker=dict(size=8),
-        text=[f"{t} shipments" for t in trend["totaal"]],
+        text=[f"{t} shipments" for t in trend["onze"]],
         hovertemplate="%{x}<br>%{y:.1f}%<br>%{text}<extra></extra>",
     ))
     fig.add_hline(y=95, line_dash="dash", line_color=ROOD, annotation_text="Target 95%")
@@ -9,11 +9,16 @@ from src.components.chat import (
     render_voorbeeldvragen,
     voeg_bericht_toe,
 )
-from src.utils.llm_service import is_beschikbaar, bereid_context_voor, stel_vraag
+from src.utils.llm_service import is_beschikbaar, bereid_context_voor, stel_vraag_stream
+from src.utils.prompt_budget import tel_tokens
 
 
-def render_assistent(df: pd.DataFrame):
-    """Render de chat assistent pagina."""
+def render_assistent(df: pd.DataFrame, sleutel: tuple | None = None):
+    """Render de chat assistent pagina.
+
+    sleutel: (dataset, filterstatus) van df — de data-context en antwoorden op
+    openingsvragen worden daarop gecachet.
+    """
     st.header("🤖 OTD Assistent")
 
     if not is_beschikbaar():
@@ -30,11 +35,12 @@ def render_assistent(df: pd.DataFrame):
 
     init_chat()
 
-    # Data-context voorbereiden
-    context = bereid_context_voor(df)
+    # Data-context voorbereiden (gecachet per dataset, filter en rekenmodel)
+    context = bereid_context_voor(df, sleutel)
 
     # Info over de dataset
     with st.expander("📊 Data-context (wat de assistent weet)"):
+        st.caption(f"≈ {tel_tokens(context)} tokens — prompts blijven binnen prompt.budget_tokens uit rekenmodel.yaml")
         st.text(context)
 
     # Chatgeschiedenis tonen
@@ -55,15 +61,15 @@ def render_assistent(df: pd.DataFrame):
         with st.chat_message("user"):
             st.markdown(actieve_vraag)
 
-        # LLM antwoord ophalen
+        # LLM antwoord streamen (tokens verschijnen zodra ze binnenkomen)
         with st.chat_message("assistant"):
-            with st.spinner("Denken..."):
-                antwoord = stel_vraag(
-                    actieve_vraag,
-                    context,
-                    st.session_state.chat_berichten[:-1],  # Exclusief huidige vraag
-                )
-                st.markdown(antwoord)
+            antwoord = st.write_stream(stel_vraag_stream(
+                actieve_vraag,
+                context,
+                st.session_state.chat_berichten[:-1],  # Exclusief huidige vraag
+                sleutel,
+                df,  # Cijfervragen lokaal beantwoorden
+            ))
 
         voeg_bericht_toe("assistant", antwoord)
 
@@ -6,7 +6,9 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 
-from src.data.processor import bereken_kpi_scores, bereken_otd, groepeer_per_periode
+from src.data.processor import (
+    bereken_kpi_scores, bereken_otd, bouw_trend_matrix, trend_matrix_naar_df,
+)
 from src.components.kpi_cards import render_kpi_kaarten, render_otd_header
 from src.utils.constants import (
     BESCHIKBARE_IDS, BESCHIKBARE_STAPPEN, PERFORMANCE_NAMEN, PERFORMANCE_STAPPEN,
@@ -155,19 +157,16 @@ def render_regio(df: pd.DataFrame):
     periode = st.radio("Groepeer per", ["week", "maand"], horizontal=True, key="regio_periode")
     df_t = voeg_periode_kolommen_toe(df)
 
-    # Bereken OTD per regio per periode
-    trend_data = []
-    for regio, groep in df_t.groupby("SalesArea"):
-        for per, per_groep in groep.groupby(periode):
-            trend_data.append({
-                "Periode": per,
-                "SalesArea": regio,
-                "OTD %": bereken_otd(per_groep),
-                "Aantal": len(per_groep),
-            })
-
-    if trend_data:
-        trend_df = pd.DataFrame(trend_data).sort_values("Periode")
+    # Bereken OTD per regio per periode — één pass voor alle regio's
+    matrix = bouw_trend_matrix(df_t, periode, dimensie="SalesArea", kpi_kolommen=["otd_ok"])
+    trend_df = trend_matrix_naar_df(matrix, "otd_ok").rename(columns={
+        "periode": "Periode", "dimensie": "SalesArea", "pct": "OTD %", "aantal": "Aantal",
+    })
+
+    if not trend_df.empty:
+        # Zelfde semantiek als bereken_otd: geen geldige orders → 0%
+        trend_df["OTD %"] = trend_df["OTD %"].fillna(0.0)
+        trend_df = trend_df.sort_values("Periode", kind="stable")
 
         fig_trend = px.line(
             trend_df, x="Periode", y="OTD %",
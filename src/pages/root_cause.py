@@ -4,8 +4,9 @@ import streamlit as st
 import pandas as pd
 
 from src.data.processor import bereken_root_causes, root_cause_samenvatting
+from src.data.geheugen import voeg_koude_kolommen_toe
 from src.components.charts import pareto_chart
-from src.utils.constants import BESCHIKBARE_STAPPEN, PERFORMANCE_NAMEN, ELHO_GROEN, ROOD
+from src.utils.constants import FAAL_KETEN, PERFORMANCE_NAMEN, ELHO_GROEN, ROOD
 
 
 def render_root_cause(df: pd.DataFrame):
@@ -32,11 +33,16 @@ def render_root_cause(df: pd.DataFrame):
 
     # First-failure tabel
     st.subheader("📋 First-Failure Analyse")
-    st.caption("Voor elke te late order: de eerste falende stap in de keten (van de 4 beschikbare performances)")
+    st.caption(
+        "Voor elke te late order: de eerste falende stap in de keten (de beschikbare performances"
+        + (", met het Action Portal slot vóór Carrier Transit)" if "slot_ok" in df.columns else ")")
+    )
 
     if not rc.empty:
         # Merge met originele data voor context
         detail = df.merge(rc[["DeliveryNumber", "root_cause_naam"]], on="DeliveryNumber", how="inner")
+        # Koude tekstkolommen (reason codes, commentaar) alleen hier ophalen
+        detail = voeg_koude_kolommen_toe(detail, bron=df)
         display_cols = ["DeliveryNumber"]
         for col in ["ChainName", "Country", "Carrier", "RequestedDeliveryDateFinal",
                      "PODDeliveryDateShipment", "ReasonCodeLatesCorrected", "CommentLateOrders",
@@ -60,7 +66,7 @@ def render_root_cause(df: pd.DataFrame):
             order_row = df[df["DeliveryNumber"].astype(str) == geselecteerde_order].iloc[0]
             st.markdown(f"**Levering: {geselecteerde_order}**")
 
-            for stap in BESCHIKBARE_STAPPEN:
+            for stap in FAAL_KETEN:
                 kpi_id = stap["id"]
                 if kpi_id in order_row.index:
                     val = order_row[kpi_id]
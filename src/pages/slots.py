@@ -0,0 +1,110 @@
+"""Analyse pagina: OTD × Action Portal — late leveringen terug naar de DC-afspraak."""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from src.data.koppeling import SLOT_UITKOMSTEN, SLOT_VIA, slot_uitkomst
+from src.data.processor import bereken_root_causes
+from src.utils.constants import ELHO_GROEN, ROOD, GRIJS, ORANJE, SLOT_STAP
+
+_UITKOMST_KLEUREN = {
+    "Op tijd": ELHO_GROEN,
+    "Te laat": ORANJE,
+    "Gemist (Cancelled/NoShow)": ROOD,
+    "Refused/Removed": GRIJS,
+    "Overig": GRIJS,
+    "Niet gekoppeld": "#d5dbdb",
+}
+
+
+def render_slots(df: pd.DataFrame):
+    """Render de gekoppelde OTD × Action Portal analyse (df komt uit koppeling.gekoppeld)."""
+    st.header("🕒 OTD × Action Portal")
+
+    if SLOT_VIA not in df.columns:
+        st.info(
+            "Geen Action Portal data gekoppeld. Zodra er AppointmentReports zijn, worden leveringen "
+            "via de sleutels onder action_portal.koppeling in rekenmodel.yaml aan hun DC-afspraak gekoppeld."
+        )
+        return
+
+    uitkomst = slot_uitkomst(df)
+    gekoppeld = df[SLOT_VIA].notna()
+    otd = df["otd_ok"] if "otd_ok" in df.columns else pd.Series(pd.NA, index=df.index)
+    otd_status = otd.map({True: "Op tijd", False: "Te laat"}).fillna("Geen POD")
+
+    te_laat = otd_status == "Te laat"
+    slot_fout = uitkomst.isin(["Te laat", "Gemist (Cancelled/NoShow)"])
+    rc = bereken_root_causes(df)
+    n_slot_rc = int((rc["root_cause"] == SLOT_STAP["id"]).sum()) if not rc.empty else 0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Gekoppeld", f"{gekoppeld.mean() * 100:.1f}%", help=f"{int(gekoppeld.sum())} van {len(df)} leveringen")
+    col2.metric("Te late leveringen", int(te_laat.sum()))
+    col3.metric(
+        "…met slot te laat/gemist", int((te_laat & slot_fout).sum()),
+        help="Te late POD waarbij de DC-afspraak te laat was of gemist werd",
+    )
+    col4.metric("Slot als root cause", n_slot_rc, help="Eerste falende stap in de keten (vóór Carrier Transit)")
+
+    if not gekoppeld.any():
+        st.warning("Geen enkele levering gekoppeld — controleer de sleutelparen onder action_portal.koppeling.")
+        return
+
+    st.markdown("---")
+
+    # OTD per slot-uitkomst
+    st.subheader("OTD per slot-uitkomst")
+    kruis = pd.crosstab(uitkomst, otd_status).reindex(index=SLOT_UITKOMSTEN, fill_value=0)
+    kruis = kruis.reindex(columns=["Op tijd", "Te laat", "Geen POD"], fill_value=0)
+    met_pod = kruis["Op tijd"] + kruis["Te laat"]
+    kruis["OTD %"] = (kruis["Op tijd"] / met_pod.where(met_pod > 0) * 100).round(1)
+    kruis = kruis[kruis[["Op tijd", "Te laat", "Geen POD"]].sum(axis=1) > 0]
+
+    col_tabel, col_chart = st.columns([2, 3])
+    with col_tabel:
+        st.dataframe(kruis.rename_axis("Slot").reset_index(), width="stretch", hide_index=True)
+    with col_chart:
+        laat = uitkomst[te_laat].value_counts().reindex(SLOT_UITKOMSTEN, fill_value=0)
+        laat = laat[laat > 0].rename_axis("Slot").reset_index(name="aantal")
+        if not laat.empty:
+            fig = px.bar(
+                laat, x="Slot", y="aantal", color="Slot", color_discrete_map=_UITKOMST_KLEUREN,
+                title="Te late leveringen naar slot-uitkomst", text="aantal",
+            )
+            fig.update_layout(showlegend=False, height=350)
+            st.plotly_chart(fig, width="stretch")
+
+    # Per DC en carrier: waar gaan slots mis bij te late leveringen
+    groepen = [k for k in ["Slot DC", "Carrier"] if k in df.columns]
+    if groepen:
+        st.markdown("---")
+        st.subheader("Te late leveringen met slot te laat/gemist")
+        kolommen = st.columns(len(groepen))
+        for kolom, groep in zip(kolommen, groepen):
+            basis = df.loc[te_laat & gekoppeld, [groep]].assign(slot_fout=slot_fout[te_laat & gekoppeld])
+            if basis.empty:
+                continue
+            tabel = basis.groupby(groep, dropna=True).agg(
+                te_laat=("slot_fout", "size"), slot_fout=("slot_fout", "sum"),
+            )
+            tabel["% door slot"] = (tabel["slot_fout"] / tabel["te_laat"] * 100).round(1)
+            kolom.dataframe(
+                tabel.sort_values("slot_fout", ascending=False).reset_index(),
+                width="stretch", hide_index=True,
+            )
+
+    # Detail: te late leveringen met hun afspraak
+    st.markdown("---")
+    st.subheader("Te late leveringen met DC-afspraak")
+    detail = df[te_laat & gekoppeld].assign(Slot=uitkomst[te_laat & gekoppeld])
+    toon = [k for k in [
+        "DeliveryNumber", "ChainName", "Carrier", "RequestedDeliveryDateFinal", "PODDeliveryDateShipment",
+        "Slot", "Slot DC", "Slot afspraak", "Slot aankomst", "Slot te laat (min)", "Slot Ship ID", SLOT_VIA,
+    ] if k in detail.columns]
+    st.dataframe(
+        detail[toon].sort_values("Slot afspraak", ascending=False, na_position="last")
+        if "Slot afspraak" in toon else detail[toon],
+        width="stretch", hide_index=True, height=400,
+    )
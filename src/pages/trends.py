@@ -3,7 +3,7 @@
 import streamlit as st
 import pandas as pd
 
-from src.data.processor import groepeer_per_periode, bereken_otd
+from src.data.processor import groepeer_per_periode, bouw_trend_matrix, trend_matrix_naar_df
 from src.components.charts import trend_chart
 from src.utils.constants import BESCHIKBARE_IDS, PERFORMANCE_NAMEN
 from src.utils.date_utils import voeg_periode_kolommen_toe
@@ -31,9 +31,11 @@ def render_trends(df: pd.DataFrame):
 
     # OTD trend
     st.subheader("On-Time Delivery Trend")
-    otd_trend = df_t.groupby(periode).apply(
-        lambda g: bereken_otd(g), include_groups=False
-    ).reset_index(name="otd")
+    otd_trend = (
+        trend_matrix_naar_df(bouw_trend_matrix(df_t, periode, kpi_kolommen=["otd_ok"]), "otd_ok")
+        .rename(columns={"periode": periode, "pct": "otd"})[[periode, "otd"]]
+        .fillna({"otd": 0.0})
+    )
 
     if not otd_trend.empty:
         import plotly.express as px
@@ -1,13 +1,61 @@
 """Validatie pagina — automatische controle Python vs PowerBI."""
 
-from io import BytesIO
-
 import pandas as pd
 import streamlit as st
 
-from src.data.validator import kruisvalidatie, data_quality_rapport, reconciliatie_data
+from src.components.filters import filter_sleutel
+from src.config import config_hash
+from src.data import register
+from src.data.export import FORMATEN, gecachet, schrijf_xlsx_bladen
+from src.data.validator import afwijkingen_index, kruisvalidatie_tabel, reconciliatie_blokken, validatie_rapport
+from src.data.geheugen import voeg_koude_kolommen_toe
 from src.utils.constants import ELHO_GROEN, ROOD, ORANJE, BESCHIKBARE_IDS, PERFORMANCE_NAMEN
 
+# Maximaal aantal afwijkende orders in de tabel op de pagina
+MAX_AFWIJKINGEN_TONEN = 5_000
+
+
+def _validatie_rapport(df: pd.DataFrame, sleutel: tuple) -> dict:
+    """validatie_rapport, gedeeld gecachet per dataset/filter/rekenmodel."""
+    def maak(_):
+        return validatie_rapport(df)
+
+    dataset_sleutel, filter_hash, cfg_hash = sleutel
+    rapport = register.afgeleid(dataset_sleutel, f"validatie:{filter_hash}:{cfg_hash}", maak)
+    return rapport if rapport is not None else maak(df)
+
+
+def _recon_blokken(df: pd.DataFrame):
+    """Per-order reconciliatie in blokken, met koude kolommen uit de side store.
+
+    De koude kolommen worden per blok opgehaald, zodat ze nooit voor het hele frame
+    tegelijk in geheugen staan.
+    """
+    for blok in reconciliatie_blokken(df):
+        if "DeliveryNumber" not in df.columns or blok.empty:
+            yield blok
+            continue
+        koud = voeg_koude_kolommen_toe(df.loc[blok.index, ["DeliveryNumber"]], bron=df)
+        extra = [k for k in koud.columns if k != "DeliveryNumber"]
+        yield blok.join(koud[extra]) if extra else blok
+
+
+def _maak_recon_excel(df: pd.DataFrame, kv_df: pd.DataFrame, rapport: dict) -> bytes:
+    """Reconciliatie-werkboek; het blad Per Order wordt blok voor blok geschreven."""
+    dq_rows = []
+    dq_rows.append({"Metric": "Totaal orders", "Waarde": rapport["totaal_orders"]})
+    dq_rows.append({"Metric": "NO POD", "Waarde": rapport["no_pod"]["count"]})
+    dq_rows.append({"Metric": "Duplicaten", "Waarde": rapport["duplicaten"]["duplicaten"]})
+    for kolom, info in rapport["missing"].items():
+        if info["count"] > 0:
+            dq_rows.append({"Metric": f"Missing: {kolom}", "Waarde": info["count"]})
+    return schrijf_xlsx_bladen({
+        "Afwijkingen": afwijkingen_index(rapport),
+        "Per Order": _recon_blokken(df),
+        "Kruisvalidatie": kv_df,
+        "Data Quality": pd.DataFrame(dq_rows),
+    })
+
 
 def render_validatie(df: pd.DataFrame):
     """Render de validatie-pagina."""
@@ -17,7 +65,12 @@ def render_validatie(df: pd.DataFrame):
     # --- a) Kruisvalidatie Python vs PowerBI ---
     st.subheader("Kruisvalidatie Python vs PowerBI")
 
-    kv = kruisvalidatie(df)
+    sleutel = (st.session_state.get("dataset_sleutel"), filter_sleutel(), config_hash())
+    rapport = _validatie_rapport(df, sleutel)
+    for melding in rapport["meldingen"]:
+        st.warning(melding)
+
+    kv = kruisvalidatie_tabel(rapport)
     if kv.empty:
         st.info("Geen kruisvalidatie mogelijk — controleer rekenmodel.yaml configuratie.")
     else:
@@ -32,7 +85,7 @@ def render_validatie(df: pd.DataFrame):
             return ""
 
         styled = kv.style.format(
-            {"Python %": "{:.2f}%", "PowerBI kolom %": "{:.2f}%", "Verschil": "{:.2f}%"},
+            {"Python %": "{:.2f}%", "PowerBI kolom %": "{:.2f}%", "Verschil": "{:.2f}%", "Eens %": "{:.2f}%"},
             na_rep="—",
         ).map(_kleur_status, subset=["Status"])
 
@@ -49,12 +102,52 @@ def render_validatie(df: pd.DataFrame):
         else:
             st.success(f"✅ Alle {n_ok} KPI's valideren — Python en PowerBI zijn in sync")
 
+        # Confusiematrix per KPI: waar wijken Python en PowerBI per order af?
+        with st.expander("Confusiematrix per KPI (Python × PowerBI)"):
+            for kpi in rapport["kpis"]:
+                if kpi["confusie"] is None:
+                    continue
+                ov = kpi["overeenstemming"]
+                st.markdown(
+                    f"**{kpi['naam']}** — bron `{kpi['bronkolom']}`: "
+                    f"{ov['eens']:,} eens, {ov['oneens']:,} oneens van {ov['vergelijkbaar']:,} vergelijkbare orders"
+                )
+                st.dataframe(kpi["confusie"], width="stretch")
+
+        # Alleen de afwijkende orders, met reden — direct uit het gecachte rapport
+        afwijkingen = afwijkingen_index(rapport)
+        st.markdown(f"**Afwijkende orders** ({len(afwijkingen):,})")
+        if afwijkingen.empty:
+            st.success("Geen orders waar Python en PowerBI van elkaar verschillen.")
+        else:
+            per_reden = (
+                afwijkingen.groupby(["KPI", "Reden"], observed=True).size()
+                .reset_index(name="Orders").sort_values("Orders", ascending=False)
+            )
+            st.dataframe(per_reden, width="stretch", hide_index=True)
+
+            kpi_keuze = st.selectbox(
+                "Toon afwijkingen voor", ["Alle KPI's"] + list(afwijkingen["KPI"].cat.categories),
+                key="validatie_afwijking_kpi",
+            )
+            selectie = afwijkingen if kpi_keuze == "Alle KPI's" else afwijkingen[afwijkingen["KPI"] == kpi_keuze]
+            st.dataframe(selectie.head(MAX_AFWIJKINGEN_TONEN), width="stretch", hide_index=True)
+            if len(selectie) > MAX_AFWIJKINGEN_TONEN:
+                st.caption(f"Eerste {MAX_AFWIJKINGEN_TONEN:,} van {len(selectie):,} — download voor de volledige lijst.")
+            st.download_button(
+                "📥 Download afwijkingen (CSV)",
+                data=lambda: selectie.to_csv(index=False, sep=";").encode("utf-8"),
+                file_name="otd_afwijkingen.csv",
+                mime="text/csv",
+                on_click="ignore",
+            )
+
     st.markdown("---")
 
     # --- b) Data Quality ---
     st.subheader("Data Quality")
 
-    dq = data_quality_rapport(df)
+    dq = rapport
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Totaal orders", f"{dq['totaal_orders']:,}")
@@ -134,28 +227,11 @@ def render_validatie(df: pd.DataFrame):
     st.subheader("Reconciliatie Export")
     st.caption("Download per-order vergelijking: Python-berekening vs PowerBI-waarde voor elke KPI")
 
-    recon = reconciliatie_data(df)
-
-    def _maak_recon_excel(recon_df: pd.DataFrame, kv_df: pd.DataFrame, dq_dict: dict) -> bytes:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            recon_df.to_excel(writer, index=False, sheet_name="Per Order")
-            kv_df.to_excel(writer, index=False, sheet_name="Kruisvalidatie")
-            # Data quality sheet
-            dq_rows = []
-            dq_rows.append({"Metric": "Totaal orders", "Waarde": dq_dict["totaal_orders"]})
-            dq_rows.append({"Metric": "NO POD", "Waarde": dq_dict["no_pod"]["count"]})
-            dq_rows.append({"Metric": "Duplicaten", "Waarde": dq_dict["duplicaten"]["duplicaten"]})
-            for kolom, info in dq_dict["missing"].items():
-                if info["count"] > 0:
-                    dq_rows.append({"Metric": f"Missing: {kolom}", "Waarde": info["count"]})
-            pd.DataFrame(dq_rows).to_excel(writer, index=False, sheet_name="Data Quality")
-        return output.getvalue()
-
-    excel_data = _maak_recon_excel(recon, kv, dq)
+    # Werkboek pas maken bij klikken; gecachet per dataset/filter/rekenmodel
     st.download_button(
         "📥 Download reconciliatie (Excel)",
-        data=excel_data,
+        data=lambda: gecachet(("reconciliatie", *sleutel), lambda: _maak_recon_excel(df, kv, dq)),
         file_name="otd_reconciliatie.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        mime=FORMATEN["xlsx"]["mime"],
+        on_click="ignore",
     )
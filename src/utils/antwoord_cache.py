@@ -0,0 +1,262 @@
+"""Antwoord-cache voor de Assistent — herhaalde vragen zonder LLM-aanroep.
+
+Een antwoord hoort bij (genormaliseerde vraag, dataset, filterstatus, feedbackversie);
+de laatste drie plus rekenmodel, promptbudget en model vormen samen de context_id. Normaliseren:
+kleine letters, zonder accenten en leestekens, zonder stopwoorden, als verzameling
+woorden — "Wat is de huidige OTD-score?" en "huidige otd score" zijn dezelfde vraag.
+
+Staat de vraag er niet letterlijk in, dan zoekt zoek() binnen dezelfde context_id
+het meest gelijkende antwoord (token-set gelijkenis, woorden mogen licht afwijken).
+Woorden die de betekenis bepalen — getallen, maanden, landen en namen met een
+hoofdletter — moeten dan wél in beide vragen staan. Vraagwoorden, ontkenningen,
+vergelijkende en relatieve tijdwoorden (hoeveel, wanneer, niet, hoogste, vorige, ...)
+tellen ook bij exact gelijke normalisatie en moeten letterlijk in beide staan:
+"welke carriers leveren niet te laat" en "hoeveel orders waren te laat" (een aantal
+in plaats van een lijst) zijn andere vragen.
+
+Entries verlopen na ttl_uur; boven max_items valt het langst niet gebruikte af.
+De cache staat als JSON in de .cache-map (atomair geschreven) en overleeft herstarts,
+inclusief het gebruik (treffers worden hooguit elke SCHRIJF_INTERVAL seconden weggeschreven).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from src.config import config_hash, get_antwoord_cache_config
+from src.utils.entiteiten import LAND_ALIASSEN, MAAND_NAMEN
+
+_PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+STOPWOORDEN = {
+    "de", "het", "een", "is", "zijn", "was", "wat", "hoe",
+    "van", "in", "op", "voor", "met", "bij", "aan", "en", "of", "er", "nu",
+    "die", "dat", "dit", "ik", "je", "we", "wij", "mij", "me", "ons", "onze", "kan",
+    "kun", "kunnen", "graag", "eens", "even", "ook", "nog", "dan", "te", "om", "naar", "per",
+    "heeft", "hebben", "heb", "wordt", "worden", "werd", "zou", "moet", "mag", "zien", "geef",
+    "the", "a", "an", "are", "what", "how", "of", "for", "to", "on", "at", "our", "me",
+    "please", "can", "you", "could",
+}
+
+# Woorden die de vraag inhoudelijk bepalen: zonder deze in beide vragen geen gelijkenis-treffer
+_BETEKENIS_WOORDEN = {
+    unicodedata.normalize("NFKD", w).encode("ascii", "ignore").decode().lower()
+    for woorden in [MAAND_NAMEN, *LAND_ALIASSEN.values(), LAND_ALIASSEN]
+    for w in woorden
+}
+
+# Ontkenning, vergelijking en relatieve tijd: beschermd, en alleen exact gelijk telt
+# (laagste/laatste en vorige/volgende lijken te veel op elkaar voor de woordgelijkenis)
+RICHTING_WOORDEN = {
+    "niet", "geen", "nooit", "zonder", "hoogste", "laagste", "beste", "slechtste", "meeste", "minste",
+    "vorige", "vorig", "deze", "laatste", "eerste", "volgende", "huidige", "afgelopen",
+    "not", "no", "without", "highest", "lowest", "best", "worst", "most", "least",
+    "previous", "last", "this", "next", "current",
+}
+
+# Vraagwoorden bepalen de soort antwoord (aantal, lijst, tijdstip, plaats): beschermd en exact
+VRAAGWOORDEN = {
+    "hoeveel", "welke", "welk", "wie", "waar", "wanneer", "waarom",
+    "which", "who", "where", "when", "why", "many", "much",
+}
+
+# Twee woorden gelden als hetzelfde vanaf deze gelijkenis (tikfouten), of als het ene
+# woord een verbuiging van het andere is (gedeeld begin van minstens STAM_LENGTE tekens)
+WOORD_DREMPEL = 0.85
+STAM_LENGTE = 4
+
+_WOORD_RE = re.compile(r"\w+")
+
+# Minimale tijd (s) tussen twee keer wegschrijven na alleen treffers (gebruik bijwerken)
+SCHRIJF_INTERVAL = 30
+
+_cache: OrderedDict[str, dict] | None = None
+_lock = threading.Lock()
+_geschreven = 0.0
+
+
+# --- Normaliseren en vergelijken ---
+
+def _woorden(vraag: str) -> list[tuple[str, bool]]:
+    """(genormaliseerd woord, beschermd) per woord, zonder stopwoorden."""
+    ascii_ = unicodedata.normalize("NFKD", vraag).encode("ascii", "ignore").decode()
+    resultaat = []
+    for i, m in enumerate(_WOORD_RE.finditer(ascii_)):
+        woord = m.group().lower()
+        if woord in STOPWOORDEN:
+            continue
+        beschermd = (
+            any(t.isdigit() for t in woord)
+            or woord in _BETEKENIS_WOORDEN
+            or woord in RICHTING_WOORDEN
+            or woord in VRAAGWOORDEN
+            # Hoofdletter midden in de zin (of afkorting als OTD/DC) wijst op een naam of code
+            or (i > 0 and m.group()[0].isupper())
+            or (len(m.group()) > 1 and m.group().isupper())
+        )
+        resultaat.append((woord, beschermd))
+    return resultaat
+
+
+def normaliseer_vraag(vraag: str) -> str:
+    """Volgorde-onafhankelijke vorm van de vraag: gesorteerde unieke inhoudswoorden."""
+    return " ".join(sorted({w for w, _ in _woorden(vraag)}))
+
+
+def _zelfde_woord(a: str, b: str) -> bool:
+    if {a, b} & (RICHTING_WOORDEN | VRAAGWOORDEN):
+        return a == b
+    kort, lang = sorted((a, b), key=len)
+    if len(kort) >= STAM_LENGTE and lang.startswith(kort) and len(lang) - len(kort) <= 3:
+        return True
+    return SequenceMatcher(None, a, b).ratio() >= WOORD_DREMPEL
+
+
+def _gelijkenis(a: list[tuple[str, bool]], b: list[tuple[str, bool]]) -> float:
+    """Token-set gelijkenis (gekoppelde woorden / vereniging); 0 als een beschermd woord geen partner heeft."""
+    a = list(dict(a).items())
+    b_vrij = dict(b)
+    gekoppeld = 0
+    for woord, beschermd in a:
+        partner = woord if woord in b_vrij else next(
+            (w for w in b_vrij if _zelfde_woord(woord, w)), None,
+        )
+        if partner is None:
+            if beschermd:
+                return 0.0
+            continue
+        gekoppeld += 1
+        b_vrij.pop(partner)
+    if any(beschermd for beschermd in b_vrij.values()):
+        return 0.0
+    totaal = len(a) + len(b_vrij)
+    return gekoppeld / totaal if totaal else 0.0
+
+
+# --- Opslag ---
+
+def _pad() -> Path:
+    pad = Path(get_antwoord_cache_config()["pad"])
+    return pad if pad.is_absolute() else _PROJECT_DIR / pad
+
+
+def _laad() -> OrderedDict[str, dict]:
+    """Cache uit het JSON-bestand (leeg als dat ontbreekt of onleesbaar is). Lock vereist."""
+    global _cache
+    if _cache is None:
+        try:
+            items = json.loads(_pad().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            items = []
+        _cache = OrderedDict((item["id"], item) for item in sorted(items, key=lambda i: i["gebruikt"]))
+    return _cache
+
+
+def _schrijf() -> None:
+    """Schrijf de cache atomair weg (tijdelijk bestand + replace). Lock vereist."""
+    global _geschreven
+    _geschreven = time.time()
+    pad = _pad()
+    try:
+        pad.parent.mkdir(parents=True, exist_ok=True)
+        tmp = pad.with_suffix(".tmp")
+        tmp.write_text(json.dumps(list(_cache.values()), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, pad)
+    except OSError:
+        pass  # Cache blijft in geheugen werken
+
+
+def _ruim_op(nu: float, cfg: dict) -> None:
+    """Verwijder verlopen entries en de langst niet gebruikte boven max_items. Lock vereist."""
+    grens = nu - float(cfg["ttl_uur"]) * 3600
+    for sleutel in [s for s, item in _cache.items() if item["gemaakt"] < grens]:
+        del _cache[sleutel]
+    while len(_cache) > int(cfg["max_items"]):
+        _cache.popitem(last=False)
+
+
+# --- Publieke API ---
+
+def context_id(dataset, filters: str | None, feedback: str, model: str) -> str:
+    """Korte hash van alles waar een antwoord van afhangt, behalve de vraag zelf.
+
+    Naast het rekenmodel telt de prompt-sectie mee: een ander tokenbudget geeft de LLM
+    andere context, en dus een ander antwoord.
+    """
+    tekst = repr((dataset, filters or "", feedback, model, config_hash(), config_hash("prompt")))
+    return hashlib.sha256(tekst.encode("utf-8")).hexdigest()[:16]
+
+
+def zoek(vraag: str, context: str) -> str | None:
+    """Gecachet antwoord op vraag binnen context (context_id), of None.
+
+    Eerst exact op de genormaliseerde vraag, dan het meest gelijkende antwoord
+    boven de drempel gelijkenis uit de config.
+    """
+    cfg = get_antwoord_cache_config()
+    if not cfg["aan"]:
+        return None
+    nu = time.time()
+    vorm = normaliseer_vraag(vraag)
+    with _lock:
+        cache = _laad()
+        grens = nu - float(cfg["ttl_uur"]) * 3600
+        item = cache.get(f"{context}:{vorm}")
+        if item is None or item["gemaakt"] < grens:
+            woorden = _woorden(vraag)
+            scores = [
+                (_gelijkenis(woorden, [tuple(w) for w in kandidaat["woorden"]]), kandidaat)
+                for kandidaat in cache.values()
+                if kandidaat["context"] == context and kandidaat["gemaakt"] >= grens
+            ]
+            score, item = max(scores, key=lambda s: s[0], default=(0.0, None))
+            if score < float(cfg["gelijkenis"]):
+                return None
+        item["gebruikt"] = nu
+        item["treffers"] = item.get("treffers", 0) + 1
+        cache.move_to_end(item["id"])
+        # Gebruik bewaren, zodat de LRU-volgorde een herstart overleeft
+        if nu - _geschreven >= SCHRIJF_INTERVAL:
+            _schrijf()
+        return item["antwoord"]
+
+
+def bewaar(vraag: str, context: str, antwoord: str) -> None:
+    """Bewaar een antwoord (overschrijft dezelfde genormaliseerde vraag) en schrijf de cache weg."""
+    cfg = get_antwoord_cache_config()
+    if not cfg["aan"] or not normaliseer_vraag(vraag):
+        return
+    nu = time.time()
+    sleutel = f"{context}:{normaliseer_vraag(vraag)}"
+    with _lock:
+        cache = _laad()
+        cache[sleutel] = {
+            "id": sleutel,
+            "context": context,
+            "vraag": vraag,
+            "woorden": _woorden(vraag),
+            "antwoord": antwoord,
+            "gemaakt": nu,
+            "gebruikt": nu,
+            "treffers": 0,
+        }
+        cache.move_to_end(sleutel)
+        _ruim_op(nu, cfg)
+        _schrijf()
+
+
+def wis() -> None:
+    """Leeg de cache (geheugen en bestand)."""
+    global _cache
+    with _lock:
+        _cache = OrderedDict()
+        _schrijf()
@@ -17,6 +17,19 @@ PERFORMANCE_NAMEN = {s["id"]: s["naam"] for s in PERFORMANCE_STAPPEN}
 BESCHIKBARE_STAPPEN = [s for s in PERFORMANCE_STAPPEN if s["beschikbaar"]]
 BESCHIKBARE_IDS = [s["id"] for s in BESCHIKBARE_STAPPEN]
 
+# Slot (Action Portal) — extra schakel in de first-failure keten, vóór Carrier Transit.
+# Telt alleen mee als het OTD-dataset aan de Action Portal gekoppeld is (kolom slot_ok).
+SLOT_STAP = {
+    "id": "slot_ok",
+    "naam": "Slot (Action Portal)",
+    "nummer": None,
+    "beschikbaar": True,
+    "beschrijving": "Afspraak bij het DC gehaald (Finished, Early/On time)",
+}
+_TRANSIT = next((i for i, s in enumerate(BESCHIKBARE_STAPPEN) if s["id"] == "carrier_transit_ok"), len(BESCHIKBARE_STAPPEN))
+FAAL_KETEN = BESCHIKBARE_STAPPEN[:_TRANSIT] + [SLOT_STAP] + BESCHIKBARE_STAPPEN[_TRANSIT:]
+FAAL_NAMEN = {**PERFORMANCE_NAMEN, SLOT_STAP["id"]: SLOT_STAP["naam"]}
+
 # Standaard targets (%)
 DEFAULT_TARGETS = {
     "planned_performance_ok": 95.0,
@@ -49,6 +62,14 @@ VERPLICHTE_DATAGRID_KOLOMMEN = [
     "PODDeliveryDateShipment", "PERFORMANCE_CAPACITY", "PERFORMANCE_LOGISTIC",
 ]
 
+# Datagrid-kolommen die pagina's direct gebruiken — blijven na ingestie in geheugen.
+# Kolommen uit rekenmodel.yaml (source_column, dates, dedup key) komen daar automatisch bij.
+DATAGRID_PAGINA_KOLOMMEN = [
+    "DeliveryNumber", "ChainName", "Country", "SalesArea", "Carrier",
+    "RequestedDeliveryDateFinal", "PODDeliveryDateShipment",
+    "PERFORMANCE_CUSTOMER_FINAL",
+]
+
 # LIKP kolommen (SAP SE16n)
 LIKP_KOLOMMEN = {
     "levering": "Levering",
@@ -83,6 +104,14 @@ ACTION_PORTAL_DATUM_KOLOMMEN = [
     "Appointment", "Arrival", "Start unloading", "Finished unloading", "Cancel date",
 ]
 
+# Inbound states; Finished vs Cancelled + NoShow is "onze performance"
+# (Refused/Removed = niet onze schuld)
+ACTION_STATES = ["Finished", "Cancelled", "NoShow", "Refused", "Removed"]
+ACTION_ONZE_STATES = ["Finished", "Cancelled", "NoShow"]
+
+# Minutenkolommen per shipment
+ACTION_MINUTEN_KOLOMMEN = ["Too late (min)", "Waiting (min)", "Unloading (min)"]
+
 # Time labels: welke tellen als "op tijd"
 ACTION_TIME_LABEL_GOED = ["Early", "On time"]
 ACTION_TIME_LABEL_SLECHT = ["Late", "Late - Reported"]
@@ -3,6 +3,8 @@
 import pandas as pd
 from datetime import datetime, timedelta
 
+from src.utils.profiler import profileer
+
 
 def week_label(datum: pd.Timestamp) -> str:
     """Geeft 'W03-2026' formaat."""
@@ -37,6 +39,7 @@ def snelkeuze_periodes() -> dict[str, tuple[datetime, datetime]]:
     }
 
 
+@profileer()
 def voeg_periode_kolommen_toe(df: pd.DataFrame, datumkolom: str = "RequestedDeliveryDateFinal") -> pd.DataFrame:
     """Voegt week- en maandkolommen toe aan het dataframe."""
     df = df.copy()
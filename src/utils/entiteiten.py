@@ -0,0 +1,286 @@
+"""Entiteiten in vragen herkennen — landen, maanden, jaren, klanten, carriers, SalesAreas.
+
+bouw_entiteit_index() maakt per dataset één Aho-Corasick automaat over alle
+aliassen en dimensiewaarden. detecteer_filters() vindt daarmee alle vermeldingen
+in één pass over de vraag (hele woorden; bij overlap wint de langste). Klantnamen
+die niet exact voorkomen worden daarna fuzzy gezocht via een trigram-index, met
+SequenceMatcher als controle. Per dimensie kunnen meerdere waarden gevonden worden.
+Maanden met een jaartal worden gekoppeld tot perioden ("dec 2024 en jan 2025"
+→ periode 2024-12 en 2025-01, niet elke combinatie van die maanden en jaren);
+een jaartal zonder maand wordt een jaar-filter.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+# Land-naam mapping (Nederlands/Engels/Italiaans -> waarde in data); eerste waarde is de ISO-code
+LAND_ALIASSEN = {
+    "nederland": ["NL", "Netherlands", "Nederland"],
+    "belgie": ["BE", "Belgium", "Belgie"],
+    "duitsland": ["DE", "Germany", "Duitsland", "Deutschland"],
+    "frankrijk": ["FR", "France", "Frankrijk"],
+    "italie": ["IT", "Italy", "Italie", "Italia"],
+    "spanje": ["ES", "Spain", "Spanje", "Espana"],
+    "portugal": ["PT", "Portugal"],
+    "oostenrijk": ["AT", "Austria", "Oostenrijk"],
+    "zwitserland": ["CH", "Switzerland", "Zwitserland"],
+    "polen": ["PL", "Poland", "Polen"],
+    "tsjechie": ["CZ", "Czech", "Tsjechie"],
+    "denemarken": ["DK", "Denmark", "Denemarken"],
+    "zweden": ["SE", "Sweden", "Zweden"],
+    "noorwegen": ["NO", "Norway", "Noorwegen"],
+    "finland": ["FI", "Finland"],
+    "engeland": ["GB", "UK", "VK", "England", "Engeland", "United Kingdom", "Verenigd Koninkrijk", "Groot-Brittannie"],
+    "ierland": ["IE", "Ireland", "Ierland"],
+    "griekenland": ["GR", "Greece", "Griekenland"],
+    "hongarije": ["HU", "Hungary", "Hongarije"],
+    "roemenie": ["RO", "Romania", "Roemenie"],
+    "kroatie": ["HR", "Croatia", "Kroatie"],
+    "slovenie": ["SI", "Slovenia", "Slovenie"],
+    "slowakije": ["SK", "Slovakia", "Slowakije"],
+    "bulgarije": ["BG", "Bulgaria", "Bulgarije"],
+    "litouwen": ["LT", "Lithuania", "Litouwen"],
+    "letland": ["LV", "Latvia", "Letland"],
+    "estland": ["EE", "Estonia", "Estland"],
+    "luxemburg": ["LU", "Luxembourg", "Luxemburg"],
+}
+
+MAAND_NAMEN = {
+    "januari": 1, "februari": 2, "maart": 3, "april": 4,
+    "mei": 5, "juni": 6, "juli": 7, "augustus": 8,
+    "september": 9, "oktober": 10, "november": 11, "december": 12,
+    "january": 1, "february": 2, "march": 3, "may": 5,
+    "june": 6, "july": 7, "august": 8, "october": 10,
+    "jan": 1, "feb": 2, "mrt": 3, "apr": 4,
+    "jun": 6, "jul": 7, "aug": 8, "sep": 9, "okt": 10, "nov": 11, "dec": 12,
+}
+
+# Kolommen waarvan de waarden zelf als entiteit gezocht worden
+DIMENSIES = ["ChainName", "Carrier", "SalesArea"]
+
+# Landcodes van twee letters zijn ook gewone woorden ("de", "it", "no"); alleen in hoofdletters
+_CODE_LENGTE = 2
+
+# Fuzzy klantnamen: minimale gelijkenis en lengte
+FUZZY_DREMPEL = 0.85
+FUZZY_MIN_LENGTE = 4
+
+_WOORD_RE = re.compile(r"\w+")
+_JAAR_RE = re.compile(r"\b20\d{2}\b")
+
+
+# --- Aho-Corasick ---
+
+def bouw_automaat(patronen: list[str]) -> dict:
+    """Aho-Corasick automaat over patronen (al genormaliseerd, bijv. lowercase).
+
+    Retourneert dict met goto (per toestand: teken → toestand), fail en uit
+    (per toestand: indexen van patronen die daar eindigen, incl. via fail-links).
+    """
+    goto: list[dict[str, int]] = [{}]
+    uit: list[list[int]] = [[]]
+    for i, patroon in enumerate(patronen):
+        toestand = 0
+        for teken in patroon:
+            volgende = goto[toestand].get(teken)
+            if volgende is None:
+                goto.append({})
+                uit.append([])
+                volgende = len(goto) - 1
+                goto[toestand][teken] = volgende
+            toestand = volgende
+        uit[toestand].append(i)
+
+    # Fail-links in breedte-eerst volgorde
+    fail = [0] * len(goto)
+    rij = list(goto[0].values())
+    for toestand in rij:
+        for teken, volgende in goto[toestand].items():
+            rij.append(volgende)
+            f = fail[toestand]
+            while f and teken not in goto[f]:
+                f = fail[f]
+            fail[volgende] = goto[f].get(teken, 0)
+            uit[volgende] = uit[volgende] + uit[fail[volgende]]
+    return {"goto": goto, "fail": fail, "uit": uit, "patronen": patronen}
+
+
+def zoek(automaat: dict, tekst: str) -> list[tuple[int, int, int]]:
+    """Alle voorkomens (start, eind, patroonindex) in één pass over tekst."""
+    goto, fail, uit, patronen = automaat["goto"], automaat["fail"], automaat["uit"], automaat["patronen"]
+    gevonden = []
+    toestand = 0
+    for positie, teken in enumerate(tekst):
+        while toestand and teken not in goto[toestand]:
+            toestand = fail[toestand]
+        toestand = goto[toestand].get(teken, 0)
+        for i in uit[toestand]:
+            gevonden.append((positie + 1 - len(patronen[i]), positie + 1, i))
+    return gevonden
+
+
+# --- Entiteit-index per dataset ---
+
+def _trigrammen(tekst: str) -> set[str]:
+    tekst = f"  {tekst} "
+    return {tekst[i:i + 3] for i in range(len(tekst) - 2)}
+
+
+def bouw_entiteit_index(df: pd.DataFrame) -> dict:
+    """Eén keer per dataset: automaat over aliassen/dimensiewaarden plus fuzzy klant-index.
+
+    Landen en dimensiewaarden die niet in de data voorkomen worden niet opgenomen.
+    """
+    # alias (lowercase) → lijst van (dimensie, waarde)
+    betekenis: dict[str, list[tuple[str, object]]] = {}
+
+    def voeg_toe(alias: str, dimensie: str, waarde):
+        alias = alias.strip().lower()
+        if alias and (dimensie, waarde) not in betekenis.setdefault(alias, []):
+            betekenis[alias].append((dimensie, waarde))
+
+    codes = set()
+    if "Country" in df.columns:
+        landen_in_data = {str(land).upper(): land for land in df["Country"].dropna().unique()}
+        for aliassen in LAND_ALIASSEN.values():
+            iso_code = aliassen[0].upper()
+            if iso_code not in landen_in_data:
+                continue
+            for alias in aliassen:
+                if len(alias) == _CODE_LENGTE:
+                    codes.add(alias.lower())
+                voeg_toe(alias, "Country", landen_in_data[iso_code])
+
+    for naam, nr in MAAND_NAMEN.items():
+        voeg_toe(naam, "maand", nr)
+
+    klanten: list[str] = []
+    for kolom in DIMENSIES:
+        if kolom not in df.columns:
+            continue
+        waarden = df[kolom].dropna().unique().tolist()
+        for waarde in waarden:
+            voeg_toe(str(waarde), kolom, waarde)
+        if kolom == "ChainName":
+            klanten = waarden
+
+    aliassen = list(betekenis)
+    trigram_index: dict[str, list[int]] = {}
+    klant_namen = [str(k).lower() for k in klanten]
+    for i, naam in enumerate(klant_namen):
+        for tri in _trigrammen(naam):
+            trigram_index.setdefault(tri, []).append(i)
+
+    return {
+        "automaat": bouw_automaat(aliassen),
+        "betekenis": [betekenis[a] for a in aliassen],
+        "codes": codes,
+        "klanten": klanten,
+        "klant_namen": klant_namen,
+        "klant_woorden": {len(n.split()) for n in klant_namen},
+        "trigrammen": trigram_index,
+    }
+
+
+def _heel_woord(tekst: str, start: int, eind: int) -> bool:
+    """Vermelding staat los (geen letter/cijfer ervoor of erna)."""
+    return (start == 0 or not tekst[start - 1].isalnum()) and (eind == len(tekst) or not tekst[eind].isalnum())
+
+
+def _fuzzy_klanten(index: dict, vraag_lower: str, bezet: list[tuple[int, int]]) -> list[tuple[object, int, int]]:
+    """Klantnamen die bijna letterlijk in de vraag staan (tikfouten, spaties, accenten),
+    als (klant, start, eind) van het gevonden fragment."""
+    woorden = [(m.start(), m.end()) for m in _WOORD_RE.finditer(vraag_lower)]
+    vrij = [w for w in woorden if not any(s < w[1] and w[0] < e for s, e in bezet)]
+    gevonden = []
+    for n in sorted(index["klant_woorden"]):
+        for i in range(len(vrij) - n + 1):
+            start, eind = vrij[i][0], vrij[i + n - 1][1]
+            fragment = vraag_lower[start:eind]
+            if len(fragment) < FUZZY_MIN_LENGTE:
+                continue
+            tris = _trigrammen(fragment)
+            teller = Counter(k for tri in tris for k in index["trigrammen"].get(tri, ()))
+            for k, gedeeld in teller.most_common(3):
+                naam = index["klant_namen"][k]
+                if gedeeld * 2 / (len(tris) + len(_trigrammen(naam))) < FUZZY_DREMPEL - 0.2:
+                    continue
+                if SequenceMatcher(None, fragment, naam).ratio() >= FUZZY_DREMPEL:
+                    gevonden.append((index["klanten"][k], start, eind))
+                    break
+    return gevonden
+
+
+def _perioden(maanden: list[tuple[int, int]], jaren: list[tuple[int, int]]) -> list[str]:
+    """Koppel elke maand (positie, nr) aan zijn jaartal (positie, jaar) als "JJJJ-MM".
+
+    Een maand hoort bij het eerstvolgende jaartal ("maart en april 2025"), of bij het
+    laatste jaartal ervoor als er na de maand geen meer komt ("maart 2024 en april").
+    """
+    perioden = []
+    for positie, maand in maanden:
+        erna = [jaar for p, jaar in jaren if p > positie]
+        ervoor = [jaar for p, jaar in jaren if p < positie]
+        jaar = erna[0] if erna else ervoor[-1]
+        perioden.append(f"{jaar}-{maand:02d}")
+    return list(dict.fromkeys(perioden))
+
+
+def detecteer_filters(vraag: str, index: dict) -> dict:
+    """Filters uit de vraagtekst: per dimensie een lijst waarden (Country, ChainName,
+    Carrier, SalesArea, maand, jaar). Maanden met een jaartal worden perioden ("JJJJ-MM")
+    in plaats van maanden; jaartallen zonder maand worden jaar. Dimensies zonder
+    vermelding ontbreken."""
+    return detecteer_met_posities(vraag, index)[0]
+
+
+def detecteer_met_posities(vraag: str, index: dict) -> tuple[dict, list[tuple[int, int]]]:
+    """Als detecteer_filters(), plus de (start, eind) van elke vermelding in de vraag
+    (entiteiten, fuzzy klantnamen en jaartallen) — wat daarbuiten staat is niet herkend."""
+    vraag_lower = vraag.lower()
+    automaat = index["automaat"]
+
+    # Hele-woord-vermeldingen; bij overlap wint de langste (dan de eerste)
+    treffers = [
+        (start, eind, i) for start, eind, i in zoek(automaat, vraag_lower)
+        if _heel_woord(vraag_lower, start, eind)
+        # Landcodes van twee letters alleen als ze in hoofdletters geschreven zijn ("DE", niet "de")
+        and (automaat["patronen"][i] not in index["codes"] or vraag[start:eind].isupper())
+    ]
+    treffers.sort(key=lambda t: (-(t[1] - t[0]), t[0]))
+    bezet: list[tuple[int, int, int]] = []
+    for start, eind, i in treffers:
+        if not any(s < eind and start < e for s, e, _ in bezet):
+            bezet.append((start, eind, i))
+
+    # Waarden in volgorde van vermelding
+    filters: dict[str, list] = {}
+    maanden: list[tuple[int, int]] = []
+    for start, _, i in sorted(bezet):
+        for dimensie, waarde in index["betekenis"][i]:
+            if dimensie == "maand":
+                maanden.append((start, waarde))
+            if waarde not in filters.setdefault(dimensie, []):
+                filters[dimensie].append(waarde)
+
+    posities = [(s, e) for s, e, _ in bezet]
+    fuzzy = _fuzzy_klanten(index, vraag_lower, posities) if index["klanten"] else []
+    for klant, start, eind in fuzzy:
+        posities.append((start, eind))
+        if klant not in filters.setdefault("ChainName", []):
+            filters["ChainName"].append(klant)
+
+    jaren = [(m.start(), int(m.group())) for m in _JAAR_RE.finditer(vraag)]
+    posities += [(p, p + 4) for p, _ in jaren]
+    if jaren and maanden:
+        filters["periode"] = _perioden(maanden, jaren)
+        del filters["maand"]
+    elif jaren:
+        filters["jaar"] = list(dict.fromkeys(jaar for _, jaar in jaren))
+
+    return {k: v for k, v in filters.items() if v}, sorted(posities)
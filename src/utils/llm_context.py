@@ -0,0 +1,84 @@
+"""Data-context voor de LLM — aggregaten één keer per dataset, filter en rekenmodel.
+
+De Assistent-pagina rendert bij elke toetsaanslag opnieuw. context_aggregaten()
+rekent OTD, KPI-scores, root causes, klanten en periode uit; het resultaat (plus
+de contexttekst) wordt procesbreed bewaard op (dataset, filterstatus, rekenmodel).
+Een nieuwe sleutel ontstaat alleen als een van die drie verandert.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+import pandas as pd
+
+from src.config import config_hash
+from src.data.processor import bereken_kpi_scores, bereken_otd, root_cause_samenvatting
+from src.utils.profiler import profileer
+
+# Aantal contexten dat bewaard blijft (oudste valt af)
+MAX_CONTEXTEN = 32
+
+_cache: OrderedDict[tuple, Any] = OrderedDict()
+_lock = threading.Lock()
+
+
+def context_sleutel(dataset: Any, filters: str | None = None) -> tuple | None:
+    """Cache-sleutel (dataset, filterstatus, rekenmodel); None zonder dataset (niet cachen)."""
+    if dataset is None:
+        return None
+    return (dataset, filters or "", config_hash())
+
+
+@profileer()
+def context_aggregaten(df: pd.DataFrame) -> dict:
+    """Alle cijfers waar de contextteksten uit bestaan.
+
+    Retourneert dict met totaal, otd, scores, root_causes (top 5), klanten (aantal),
+    top_klanten_laat (Series), periode ((min, max) of None), landen en salesareas.
+    """
+    agg = {
+        "totaal": len(df),
+        "otd": bereken_otd(df),
+        "scores": bereken_kpi_scores(df),
+        "root_causes": root_cause_samenvatting(df).head(5),
+        "klanten": df["ChainName"].nunique() if "ChainName" in df.columns else None,
+        "top_klanten_laat": pd.Series(dtype="int64"),
+        "periode": None,
+        "landen": sorted(str(v) for v in df["Country"].dropna().unique()) if "Country" in df.columns else [],
+        "salesareas": sorted(str(v) for v in df["SalesArea"].dropna().unique()) if "SalesArea" in df.columns else [],
+    }
+
+    req = None
+    if "RequestedDeliveryDateFinal" in df.columns:
+        req = pd.to_datetime(df["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
+        if req.notna().any():
+            agg["periode"] = (req.min(), req.max())
+
+    if "ChainName" in df.columns and req is not None and "PODDeliveryDateShipment" in df.columns:
+        pod = pd.to_datetime(df["PODDeliveryDateShipment"], dayfirst=True, errors="coerce")
+        te_laat = pod.notna() & req.notna() & (pod > req)
+        agg["top_klanten_laat"] = df.loc[te_laat, "ChainName"].value_counts().head(5)
+
+    return agg
+
+
+def gecachete_context(sleutel: tuple | None, maak: Callable[[], Any]) -> Any:
+    """Context uit de cache, of maak hem één keer; zonder sleutel altijd opnieuw."""
+    if sleutel is None:
+        return maak()
+    with _lock:
+        if sleutel in _cache:
+            _cache.move_to_end(sleutel)
+            return _cache[sleutel]
+
+    waarde = maak()
+
+    with _lock:
+        _cache[sleutel] = waarde
+        _cache.move_to_end(sleutel)
+        while len(_cache) > MAX_CONTEXTEN:
+            _cache.popitem(last=False)
+    return waarde
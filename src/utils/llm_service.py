@@ -2,13 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import queue
+import threading
+from typing import Iterator
+
 import pandas as pd
 import streamlit as st
 
-from src.data.processor import bereken_kpi_scores, bereken_otd, root_cause_samenvatting
 from src.utils.constants import PERFORMANCE_NAMEN, BESCHIKBARE_IDS
 from src.config import toon_config_tekst
-from src.feedback_manager import feedback_als_tekst
+from src.feedback_manager import feedback_als_tekst, feedback_versie
+from src.utils import antwoord_cache
+from src.utils.entiteiten import bouw_entiteit_index, detecteer_met_posities
+from src.utils.llm_context import context_aggregaten, context_sleutel, gecachete_context
+from src.utils.prompt_budget import bouw_berichten
+from src.utils.vraag_analyse import bouw_analyse_index
+from src.utils.vraag_intentie import herken_intentie, lokaal_antwoord
 
 
 SYSTEM_PROMPT = """Je bent een OTD-analist voor Elho B.V., een toonaangevend bedrijf in tuinproducten.
@@ -53,116 +63,258 @@ def is_beschikbaar() -> bool:
     return _heeft_llm_config()
 
 
-def _get_client():
-    """Maak OpenAI client aan op basis van configuratie."""
-    config = st.secrets["llm"]
-    provider = config.get("provider", "openrouter")
+# --- Async client: één event loop en gepoolde HTTP-verbindingen per proces ---
+#
+# Streamlit draait elke rerun in een andere thread; een eigen event loop in een
+# achtergrondthread houdt de AsyncOpenAI client (en zijn keep-alive verbindingen)
+# tussen vragen in leven. stream_antwoord() geeft tokens synchroon door, zodat
+# st.write_stream en de CLI ze direct kunnen tonen.
+
+# Standaard time-outs (seconden) en retries; overschrijfbaar per config
+LLM_DEFAULTS = {
+    "provider": "openrouter",
+    "base_url": "https://openrouter.ai/api/v1",
+    "model": "anthropic/claude-sonnet-4",
+    "timeout": 60.0,
+    "connect_timeout": 10.0,
+    "max_retries": 2,
+    "max_verbindingen": 10,
+}
+
+# Langste wachttijd (s) van de openai SDK tussen twee retries
+MAX_RETRY_WACHT = 8.0
+
+_KLAAR = object()
+_lus: asyncio.AbstractEventLoop | None = None
+_lus_lock = threading.Lock()
+_clients: dict[tuple, object] = {}
+
 
-    if provider == "azure":
-        from openai import AzureOpenAI
-        return AzureOpenAI(
-            api_key=config["api_key"],
-            api_version=config.get("api_version", "2024-02-01"),
-            azure_endpoint=config["endpoint"],
+def llm_config() -> dict | None:
+    """LLM-instellingen uit .streamlit/secrets.toml ([llm]), aangevuld met LLM_DEFAULTS."""
+    if not _heeft_llm_config():
+        return None
+    return {**LLM_DEFAULTS, **dict(st.secrets["llm"])}
+
+
+def _achtergrond_lus() -> asyncio.AbstractEventLoop:
+    """Event loop in een daemon-thread, één keer per proces gestart."""
+    global _lus
+    with _lus_lock:
+        if _lus is None:
+            _lus = asyncio.new_event_loop()
+            threading.Thread(target=_lus.run_forever, name="llm-lus", daemon=True).start()
+    return _lus
+
+
+def _async_client(cfg: dict):
+    """Gepoolde AsyncOpenAI client per configuratie (hergebruikt tussen vragen)."""
+    sleutel = tuple(sorted((k, str(v)) for k, v in cfg.items()))
+    with _lus_lock:
+        if sleutel in _clients:
+            return _clients[sleutel]
+
+    import httpx
+    from openai import AsyncAzureOpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+
+    opties = {
+        "api_key": cfg["api_key"],
+        "timeout": httpx.Timeout(float(cfg["timeout"]), connect=float(cfg["connect_timeout"])),
+        "max_retries": int(cfg["max_retries"]),
+        "http_client": DefaultAsyncHttpxClient(limits=httpx.Limits(
+            max_connections=int(cfg["max_verbindingen"]),
+            max_keepalive_connections=int(cfg["max_verbindingen"]),
+        )),
+    }
+    if cfg["provider"] == "azure":
+        client = AsyncAzureOpenAI(
+            api_version=cfg.get("api_version", "2024-02-01"), azure_endpoint=cfg["endpoint"], **opties,
         )
     else:
-        from openai import OpenAI
-        return OpenAI(
-            api_key=config["api_key"],
-            base_url=config.get("base_url", "https://openrouter.ai/api/v1"),
-        )
+        client = AsyncOpenAI(base_url=cfg["base_url"], **opties)
 
+    with _lus_lock:
+        return _clients.setdefault(sleutel, client)
 
-def _get_model() -> str:
-    """Haal het model op uit config."""
-    config = st.secrets["llm"]
-    return config.get("model", "anthropic/claude-sonnet-4")
 
+async def _vul_wachtrij(cfg: dict, berichten: list[dict], wachtrij: queue.Queue, opties: dict):
+    """Stream de completion token voor token naar de wachtrij; fout of _KLAAR als laatste item.
 
-def bereid_context_voor(df: pd.DataFrame) -> str:
-    """Bereid data-samenvatting voor als context voor de LLM."""
-    totaal = len(df)
-    otd = bereken_otd(df)
-    scores = bereken_kpi_scores(df)
-    rc = root_cause_samenvatting(df)
-
+    Retries doet alleen de SDK (max_retries): verbindingsfouten, time-outs en 429/5xx
+    bij het openen van de stream. Een fout midden in de stream gaat direct naar de lezer.
+    """
+    client = _async_client(cfg)
+    try:
+        stream = await client.chat.completions.create(
+            model=cfg["model"], messages=berichten, stream=True, **opties,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                wachtrij.put(chunk.choices[0].delta.content)
+        wachtrij.put(_KLAAR)
+    except Exception as e:  # noqa: BLE001 — fout gaat naar de lezer van de stream
+        wachtrij.put(e)
+
+
+def _wachttijd(cfg: dict) -> float:
+    """Bovengrens (s) voor het volgende token: alle SDK-pogingen plus hun wachttijden.
+
+    De SDK wacht maximaal MAX_RETRY_WACHT seconden tussen twee pogingen.
+    """
+    pogingen = int(cfg["max_retries"]) + 1
+    return (
+        pogingen * (float(cfg["timeout"]) + float(cfg["connect_timeout"]))
+        + (pogingen - 1) * MAX_RETRY_WACHT
+    )
+
+
+def stream_antwoord(cfg: dict, berichten: list[dict], max_tokens: int = 1024,
+                    temperature: float = 0.3) -> Iterator[str]:
+    """Tokens van de LLM zodra ze binnenkomen (synchrone generator over de async client).
+
+    Stopt de lezer vroegtijdig, dan wordt de request afgebroken.
+    """
+    wachtrij: queue.Queue = queue.Queue()
+    taak = asyncio.run_coroutine_threadsafe(
+        _vul_wachtrij(cfg, berichten, wachtrij, {"max_tokens": max_tokens, "temperature": temperature}),
+        _achtergrond_lus(),
+    )
+    # Vangnet: de SDK bewaakt zelf connect- en leestijd, dit wordt normaal niet bereikt
+    wachttijd = _wachttijd(cfg)
+    try:
+        while True:
+            try:
+                item = wachtrij.get(timeout=wachttijd)
+            except queue.Empty:
+                raise TimeoutError(f"geen antwoord van de LLM binnen {wachttijd:.0f} seconden") from None
+            if item is _KLAAR:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        taak.cancel()
+
+
+def foutmelding(e: Exception) -> str:
+    """Leesbare foutmelding; sommige SDK-fouten hebben een lege tekst."""
+    return str(e) or type(e).__name__
+
+
+def bereid_context_voor(df: pd.DataFrame, sleutel: tuple | None = None) -> str:
+    """Bereid data-samenvatting voor als context voor de LLM.
+
+    sleutel: (dataset, filterstatus) — dan wordt de context gecachet tot een van beide
+    of het rekenmodel verandert (zie llm_context).
+    """
+    return gecachete_context(
+        context_sleutel(*sleutel) if sleutel is not None else None,
+        lambda: context_tekst(context_aggregaten(df)),
+    )
+
+
+def context_tekst(agg: dict) -> str:
+    """Contexttekst uit de aggregaten van context_aggregaten()."""
     regels = [
-        f"Totaal orders: {totaal}",
-        f"Overall OTD: {otd:.1f}%",
+        f"Totaal orders: {agg['totaal']}",
+        f"Overall OTD: {agg['otd']:.1f}%",
         "",
         "Performance-scores per stap:",
     ]
     for kpi_id in BESCHIKBARE_IDS:
-        score = scores.get(kpi_id)
+        score = agg["scores"].get(kpi_id)
         naam = PERFORMANCE_NAMEN.get(kpi_id, kpi_id)
         if score is not None:
             regels.append(f"  - {naam}: {score:.1f}%")
         else:
             regels.append(f"  - {naam}: geen data")
 
+    rc = agg["root_causes"]
     if not rc.empty:
         regels.append("")
         regels.append("Top root causes (te late orders):")
-        for _, rij in rc.head(5).iterrows():
+        for _, rij in rc.iterrows():
             regels.append(f"  - {rij['root_cause_naam']}: {rij['aantal']}x ({rij['percentage']:.1f}%)")
 
     # Klant-overzicht
-    if "ChainName" in df.columns:
+    if agg["klanten"] is not None:
         regels.append("")
-        regels.append(f"Aantal unieke klanten: {df['ChainName'].nunique()}")
-        if "PODDeliveryDateShipment" in df.columns and "RequestedDeliveryDateFinal" in df.columns:
-            pod = pd.to_datetime(df["PODDeliveryDateShipment"], dayfirst=True, errors="coerce")
-            req = pd.to_datetime(df["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
-            valid = pod.notna() & req.notna()
-            te_laat = df[valid & (pod > req)]
-            if not te_laat.empty:
-                top_klanten = te_laat["ChainName"].value_counts().head(5)
-                regels.append("Top klanten met te late orders:")
-                for klant, aantal in top_klanten.items():
-                    regels.append(f"  - {klant}: {aantal}x")
+        regels.append(f"Aantal unieke klanten: {agg['klanten']}")
+        if not agg["top_klanten_laat"].empty:
+            regels.append("Top klanten met te late orders:")
+            for klant, aantal in agg["top_klanten_laat"].items():
+                regels.append(f"  - {klant}: {aantal}x")
 
     # Periode
-    if "RequestedDeliveryDateFinal" in df.columns:
-        datum_col = pd.to_datetime(df["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
-        if datum_col.notna().any():
-            min_datum = datum_col.min()
-            max_datum = datum_col.max()
-            regels.append("")
-            regels.append(f"Periode: {min_datum.strftime('%d-%m-%Y')} t/m {max_datum.strftime('%d-%m-%Y')}")
+    if agg["periode"] is not None:
+        min_datum, max_datum = agg["periode"]
+        regels.append("")
+        regels.append(f"Periode: {min_datum.strftime('%d-%m-%Y')} t/m {max_datum.strftime('%d-%m-%Y')}")
 
     return "\n".join(regels)
 
 
-def stel_vraag(vraag: str, context: str, geschiedenis: list[dict]) -> str:
-    """Stel een vraag aan de LLM met data-context en chatgeschiedenis."""
-    if not _heeft_llm_config():
-        return "LLM is niet geconfigureerd. Voeg API credentials toe aan `.streamlit/secrets.toml`."
-
+def _berichten(vraag: str, context: str, geschiedenis: list[dict]) -> list[dict]:
+    """Systeemprompt met context, geschiedenis en vraag binnen het tokenbudget (prompt_budget)."""
+    return bouw_berichten(
+        SYSTEM_PROMPT,
+        {"context": context, "rekenmodel": toon_config_tekst(), "feedback": feedback_als_tekst()},
+        geschiedenis,
+        vraag,
+    )
+
+
+def _vraag_indexen(df: pd.DataFrame, sleutel: tuple | None) -> tuple[dict, dict]:
+    """Entiteit- en analyse-index van df, per sessie bewaard zolang de sleutel gelijk blijft."""
+    opgeslagen = st.session_state.get("assistent_indexen")
+    if sleutel is None or opgeslagen is None or opgeslagen[0] != sleutel:
+        opgeslagen = (sleutel, bouw_entiteit_index(df), bouw_analyse_index(df))
+        if sleutel is not None:
+            st.session_state.assistent_indexen = opgeslagen
+    return opgeslagen[1], opgeslagen[2]
+
+
+def stel_vraag_stream(vraag: str, context: str, geschiedenis: list[dict],
+                      sleutel: tuple | None = None, df: pd.DataFrame | None = None) -> Iterator[str]:
+    """Stel een vraag aan de LLM en geef het antwoord token voor token (voor st.write_stream).
+
+    df: de data achter context — cijfervragen (OTD, ranglijsten, root causes) zonder
+    geschiedenis worden dan lokaal beantwoord (vraag_intentie), zonder LLM. Een
+    vervolgvraag kan filters uit eerdere vragen bedoelen ("en in Duitsland?") en gaat
+    daarom altijd naar de LLM.
+    sleutel: (dataset, filterstatus) — openingsvragen (zonder geschiedenis) worden dan
+    uit of naar de antwoord-cache beantwoord. Fouten komen als tekst in de stream
+    en worden niet gecachet.
+    """
+    if df is not None and not geschiedenis and herken_intentie(vraag) is not None:
+        entiteiten, analyses = _vraag_indexen(df, sleutel)
+        filters, posities = detecteer_met_posities(vraag, entiteiten)
+        antwoord = lokaal_antwoord(vraag, filters, analyses, posities)
+        if antwoord is not None:
+            yield antwoord
+            return
+
+    cfg = llm_config()
+    if cfg is None:
+        yield "LLM is niet geconfigureerd. Voeg API credentials toe aan `.streamlit/secrets.toml`."
+        return
+
+    cache_id = None
+    if sleutel is not None and not geschiedenis:
+        cache_id = antwoord_cache.context_id(*sleutel, feedback_versie(), cfg["model"])
+        antwoord = antwoord_cache.zoek(vraag, cache_id)
+        if antwoord is not None:
+            yield antwoord
+            return
+
+    stukken = []
     try:
-        client = _get_client()
-        model = _get_model()
-
-        rekenmodel = toon_config_tekst()
-        feedback = feedback_als_tekst()
-
-        berichten = [
-            {"role": "system", "content": SYSTEM_PROMPT.format(
-                context=context,
-                rekenmodel=rekenmodel,
-                feedback=feedback,
-            )},
-        ]
-        for bericht in geschiedenis[-10:]:
-            berichten.append(bericht)
-        berichten.append({"role": "user", "content": vraag})
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=berichten,
-            max_tokens=1024,
-            temperature=0.3,
-        )
-        return response.choices[0].message.content
-
+        for stuk in stream_antwoord(cfg, _berichten(vraag, context, geschiedenis)):
+            stukken.append(stuk)
+            yield stuk
     except Exception as e:
-        return f"Fout bij het stellen van de vraag: {e}"
+        yield f"Fout bij het stellen van de vraag: {foutmelding(e)}"
+        return
+
+    if cache_id is not None and stukken:
+        antwoord_cache.bewaar(vraag, cache_id, "".join(stukken))
@@ -0,0 +1,191 @@
+"""Profiler voor pipeline-stappen en pagina-renders.
+
+Per stap worden wandtijd, CPU-tijd (van de thread), rijen in/uit en optioneel
+piekgeheugen (tracemalloc) vastgelegd. Meten gebeurt alleen als er een profiel
+actief is; anders kosten de decorators alleen een contextvar-lookup.
+
+Gebruik:
+    profiel = nieuw_profiel("upload", geheugen=True)
+    with profiel_actief(profiel):
+        with meet("join_likp", rijen_in=len(df)) as meting:
+            ...
+            meting["rijen_uit"] = len(resultaat)
+    print(profiel_als_tekst(profiel))
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+_actief: contextvars.ContextVar[dict | None] = contextvars.ContextVar("otd_profiel", default=None)
+
+
+def nieuw_profiel(naam: str, geheugen: bool = False) -> dict:
+    """Maak een leeg profiel. geheugen=True meet piekgeheugen via tracemalloc (trager)."""
+    return {
+        "naam": naam,
+        "gestart": datetime.now().isoformat(timespec="seconds"),
+        "geheugen": geheugen,
+        "metingen": [],
+        "_stack": [],
+    }
+
+
+@contextmanager
+def profiel_actief(profiel: dict | None):
+    """Maak een profiel actief voor de huidige thread/context (None = niet meten)."""
+    token = _actief.set(profiel)
+    gestart_tracemalloc = False
+    if profiel is not None and profiel["geheugen"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        gestart_tracemalloc = True
+    try:
+        yield profiel
+    finally:
+        if gestart_tracemalloc:
+            tracemalloc.stop()
+        _actief.reset(token)
+
+
+def huidig_profiel() -> dict | None:
+    """Het actieve profiel (None als er niet gemeten wordt)."""
+    return _actief.get()
+
+
+@contextmanager
+def meet(stap: str, rijen_in: int | None = None):
+    """Meet één stap. Yieldt de meting; zet meting['rijen_uit'] voor rijen uit."""
+    profiel = _actief.get()
+    if profiel is None:
+        yield {}
+        return
+
+    stack = profiel["_stack"]
+    meet_geheugen = profiel["geheugen"] and tracemalloc.is_tracing()
+    if meet_geheugen:
+        # Piek tot nu toe doorgeven aan de ouder voordat we resetten
+        if stack:
+            stack[-1]["_piek"] = max(stack[-1]["_piek"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        basis = tracemalloc.get_traced_memory()[0]
+    else:
+        basis = 0
+
+    meting = {
+        "stap": stap,
+        "niveau": len(stack),
+        "rijen_in": rijen_in,
+        "rijen_uit": None,
+        "_piek": 0,
+    }
+    stack.append(meting)
+    wand_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield meting
+    finally:
+        meting["wand_sec"] = time.perf_counter() - wand_start
+        meting["cpu_sec"] = time.thread_time() - cpu_start
+        stack.pop()
+        if meet_geheugen:
+            piek = max(meting["_piek"], tracemalloc.get_traced_memory()[1])
+            meting["piek_mb"] = max(0, piek - basis) / (1024 * 1024)
+            if stack:
+                stack[-1]["_piek"] = max(stack[-1]["_piek"], piek)
+        else:
+            meting["piek_mb"] = None
+        del meting["_piek"]
+        profiel["metingen"].append(meting)
+
+
+def _aantal_rijen(waarde) -> int | None:
+    """Rijen van een DataFrame, of van het eerste DataFrame in een tuple."""
+    if isinstance(waarde, pd.DataFrame):
+        return len(waarde)
+    if isinstance(waarde, tuple) and waarde and isinstance(waarde[0], pd.DataFrame):
+        return len(waarde[0])
+    return None
+
+
+def profileer(stap: str | None = None):
+    """Decorator: meet een functie als stap; rijen in/uit afgeleid van DataFrames."""
+    def decorator(func):
+        naam = stap or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _actief.get() is None:
+                return func(*args, **kwargs)
+            rijen_in = next((len(a) for a in args if isinstance(a, pd.DataFrame)), None)
+            with meet(naam, rijen_in=rijen_in) as meting:
+                resultaat = func(*args, **kwargs)
+                meting["rijen_uit"] = _aantal_rijen(resultaat)
+            return resultaat
+        return wrapper
+    return decorator
+
+
+def profiel_als_df(profiel: dict) -> pd.DataFrame:
+    """Metingen als tabel, in starttijd-volgorde (ouders vóór kinderen)."""
+    kolommen = ["stap", "wand_sec", "cpu_sec", "rijen_in", "rijen_uit", "piek_mb"]
+    if not profiel or not profiel["metingen"]:
+        return pd.DataFrame(columns=kolommen)
+    # Metingen worden bij afsluiten toegevoegd (kinderen eerst); draai naar boomvolgorde
+    rijen = []
+    for m in _boomvolgorde(profiel["metingen"]):
+        rij = {k: m.get(k) for k in kolommen}
+        rij["stap"] = "  " * m["niveau"] + m["stap"]
+        rijen.append(rij)
+    return pd.DataFrame(rijen, columns=kolommen)
+
+
+def _boomvolgorde(metingen: list[dict]) -> list[dict]:
+    """Zet post-order metingen (kind vóór ouder) om naar pre-order."""
+    resultaat: list[dict] = []
+    wachtend: list[list[dict]] = []
+    for m in metingen:
+        kinderen = []
+        while wachtend and wachtend[-1][0]["niveau"] > m["niveau"]:
+            kinderen = wachtend.pop() + kinderen
+        wachtend.append([m] + kinderen)
+    for groep in wachtend:
+        resultaat.extend(groep)
+    return resultaat
+
+
+def profiel_als_tekst(profiel: dict) -> str:
+    """Leesbare tabel voor de CLI."""
+    df = profiel_als_df(profiel)
+    if df.empty:
+        return "Geen metingen."
+    regels = [f"{'Stap':40s} {'Wand (s)':>9s} {'CPU (s)':>9s} {'Rijen in':>10s} {'Rijen uit':>10s} {'Piek MB':>9s}"]
+
+    def fmt(v, spec):
+        # Ontbrekende waarde als "-" met dezelfde breedte, zodat de kolommen uitgelijnd blijven
+        if v is not None and pd.notna(v):
+            return format(v, spec)
+        return format("-", f">{spec.lstrip('<>^=').split('.')[0]}")
+
+    for _, r in df.iterrows():
+        regels.append(
+            f"{r['stap'][:40]:40s} {fmt(r['wand_sec'], '9.3f')} {fmt(r['cpu_sec'], '9.3f')} "
+            f"{fmt(r['rijen_in'], '>10.0f')} {fmt(r['rijen_uit'], '>10.0f')} {fmt(r['piek_mb'], '9.1f')}"
+        )
+    return "\n".join(regels)
+
+
+def profiel_als_json(*profielen: dict) -> str:
+    """Exporteer één of meer profielen als JSON."""
+    data = [
+        {k: v for k, v in p.items() if not k.startswith("_")}
+        for p in profielen if p
+    ]
+    return json.dumps(data, indent=2, ensure_ascii=False, default=str)
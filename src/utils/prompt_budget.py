@@ -0,0 +1,198 @@
+"""Prompt binnen een tokenbudget — secties op prioriteit, geschiedenis samengevat.
+
+De systeemprompt bestaat uit secties (rekenmodel, feedback, context, gefilterde
+context) en daarna komen de chatgeschiedenis en de vraag. bouw_berichten() telt
+lokaal de tokens (tiktoken als dat geïnstalleerd is, anders een schatting) en
+vult het budget uit rekenmodel.yaml (prompt.budget_tokens) in volgorde van
+prompt.prioriteit:
+
+- Past een sectie niet helemaal, dan gaan regels van onderen af weg (de
+  contexten beginnen met de totalen, details staan onderaan) met een
+  "(ingekort)"-regel. Lange opsommingen (landen, SalesAreas) worden altijd
+  ingekort tot prompt.max_lijst items.
+- De laatste prompt.max_berichten berichten gaan letterlijk mee, de nieuwste
+  eerst zolang ze passen. Oudere berichten worden samengevat als één regel per
+  vraag (vraag plus eerste zin van het antwoord).
+
+De sjabloontekst en de vraag gaan altijd mee, en van de datacontext (sectie
+"context") minstens prompt.min_context tokens. Laten vraag en sjabloon daar geen
+ruimte voor, dan komt de prompt boven het budget uit en wordt een waarschuwing gelogd.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+
+from src.config import get_prompt_config
+
+# Tokens per bericht voor rol en scheidingstekens (OpenAI chat-formaat)
+BERICHT_OVERHEAD = 4
+
+# Lengte van een samengevatte vraag en antwoord (tekens)
+SAMENVATTING_VRAAG = 120
+SAMENVATTING_ANTWOORD = 160
+
+INGEKORT = "… (ingekort)"
+
+_STUK_RE = re.compile(r"\w+|[^\w\s]")
+_ZIN_RE = re.compile(r"(?<=[.!?])\s")
+_LIJST_RE = re.compile(r"^(?P<kop>[^:\n]*:\s*)(?P<items>[^:\n]*(?:, [^,\n]+){2,})$")
+
+_encoder = None
+
+_log = logging.getLogger(__name__)
+
+
+# --- Tokens tellen ---
+
+def _laad_encoder():
+    """tiktoken-encoder (cl100k_base) als die beschikbaar is, anders False."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # niet geïnstalleerd of encoding niet te downloaden
+            _encoder = False
+    return _encoder
+
+
+def tel_tokens(tekst: str) -> int:
+    """Aantal tokens in tekst: exact met tiktoken, anders geschat (±10% bij Nederlandse tekst).
+
+    De schatting telt leestekens als één token en woorden als één token per vier tekens.
+    """
+    if not tekst:
+        return 0
+    encoder = _laad_encoder()
+    if encoder:
+        return len(encoder.encode(tekst))
+    return sum(math.ceil(len(stuk) / 4) for stuk in _STUK_RE.findall(tekst))
+
+
+def _bericht_tokens(bericht: dict) -> int:
+    return tel_tokens(bericht["content"]) + BERICHT_OVERHEAD
+
+
+# --- Secties inkorten ---
+
+def kort_lijsten_in(tekst: str, max_items: int) -> str:
+    """Kort kommagescheiden opsommingen na een kop ("Beschikbare landen: a, b, ...") in."""
+    def kort_in(regel: str) -> str:
+        m = _LIJST_RE.match(regel)
+        if not m:
+            return regel
+        items = m.group("items").split(", ")
+        if len(items) <= max_items:
+            return regel
+        return f"{m.group('kop')}{', '.join(items[:max_items])}, … (+{len(items) - max_items})"
+
+    return "\n".join(kort_in(regel) for regel in tekst.split("\n"))
+
+
+def pas_tekst_in(tekst: str, budget: int) -> str:
+    """Zoveel mogelijk regels van boven af binnen budget, met INGEKORT als er regels vervallen."""
+    if tel_tokens(tekst) <= budget:
+        return tekst
+    budget -= tel_tokens(INGEKORT) + 1
+    regels, gebruikt = [], 0
+    for regel in tekst.split("\n"):
+        kosten = tel_tokens(regel) + 1
+        if gebruikt + kosten > budget:
+            break
+        regels.append(regel)
+        gebruikt += kosten
+    while regels and not regels[-1].strip():
+        regels.pop()
+    return "\n".join(regels + [INGEKORT]) if regels else ""
+
+
+def _samenvatting_regels(berichten: list[dict]) -> list[str]:
+    """Eén regel per vraag (met de eerste zin van het antwoord erop), oudste eerst."""
+    regels = []
+    for bericht in berichten:
+        tekst = " ".join(bericht["content"].split())
+        if bericht["role"] == "user":
+            regels.append(f"- Vraag: {tekst[:SAMENVATTING_VRAAG]}")
+        elif regels:
+            eerste_zin = _ZIN_RE.split(tekst, maxsplit=1)[0]
+            regels[-1] += f" → {eerste_zin[:SAMENVATTING_ANTWOORD]}"
+    return regels
+
+
+# --- Prompt bouwen ---
+
+def bouw_berichten(sjabloon: str, secties: dict[str, str], geschiedenis: list[dict], vraag: str,
+                   cfg: dict | None = None) -> list[dict]:
+    """Berichtenlijst (systeem, geschiedenis, vraag) binnen het tokenbudget.
+
+    sjabloon: systeemprompt met een {naam}-plek per sectie. In prompt.prioriteit staan
+    "geschiedenis" en "samenvatting" voor de letterlijke en de samengevatte berichten;
+    secties die er niet in staan komen achteraan.
+    """
+    cfg = cfg or get_prompt_config()
+    secties = {naam: kort_lijsten_in(tekst or "", int(cfg["max_lijst"])) for naam, tekst in secties.items()}
+    splitsing = max(len(geschiedenis) - max(int(cfg["max_berichten"]), 0), 0)
+    ouder, recent = list(geschiedenis[:splitsing]), list(geschiedenis[splitsing:])
+
+    vast = tel_tokens(sjabloon.format(**{naam: "" for naam in secties})) + BERICHT_OVERHEAD
+    vast += tel_tokens(vraag) + BERICHT_OVERHEAD
+    budget = int(cfg["budget_tokens"])
+    over = budget - vast
+    # Ruimte voor de datacontext vasthouden tot die aan de beurt is
+    reserve = min(int(cfg["min_context"]), tel_tokens(secties.get("context", "")))
+    if over < reserve:
+        _log.warning(
+            "Vraag en sjabloon gebruiken %d van %d prompt-tokens; context krijgt %d tokens, overige secties vallen weg",
+            vast, budget, reserve,
+        )
+    over = max(over - reserve, 0)
+
+    prioriteit = [p for p in cfg["prioriteit"] if p in secties or p in ("geschiedenis", "samenvatting")]
+    prioriteit += [naam for naam in secties if naam not in prioriteit]
+
+    ingevuld = {naam: "" for naam in secties}
+    meegenomen: list[dict] = []
+    samenvatting = ""
+    for onderdeel in prioriteit:
+        if onderdeel == "geschiedenis":
+            # Nieuwste eerst; wat niet meer past gaat naar de samenvatting
+            while recent and _bericht_tokens(recent[-1]) <= over:
+                over -= _bericht_tokens(recent[-1])
+                meegenomen.insert(0, recent.pop())
+            ouder += recent
+            recent = []
+        elif onderdeel == "samenvatting":
+            samenvatting = _pas_samenvatting_in(ouder, over)
+            over -= tel_tokens(samenvatting)
+        elif secties[onderdeel]:
+            if onderdeel == "context":
+                over += reserve
+            ingevuld[onderdeel] = pas_tekst_in(secties[onderdeel], over)
+            over -= tel_tokens(ingevuld[onderdeel])
+
+    systeem = sjabloon.format(**ingevuld)
+    if samenvatting:
+        systeem = f"{systeem}\n\n{samenvatting}"
+    return [{"role": "system", "content": systeem}] + meegenomen + [{"role": "user", "content": vraag}]
+
+
+def _pas_samenvatting_in(berichten: list[dict], budget: int) -> str:
+    """Samenvatting van berichten binnen budget; bij te weinig ruimte vallen de oudste vragen af."""
+    kop = "Eerder in dit gesprek (samengevat):"
+    budget -= tel_tokens(kop) + 2
+    gekozen: list[str] = []
+    for regel in reversed(_samenvatting_regels(berichten)):
+        kosten = tel_tokens(regel) + 1
+        if kosten > budget:
+            break
+        gekozen.insert(0, regel)
+        budget -= kosten
+    return "\n".join([kop] + gekozen) if gekozen else ""
+
+
+def prompt_tokens(berichten: list[dict]) -> int:
+    """Totaal aantal tokens van een berichtenlijst (zoals bouw_berichten rekent)."""
+    return sum(_bericht_tokens(b) for b in berichten)
@@ -0,0 +1,164 @@
+"""Gefilterde analyses voor vragen — vooraf gebouwde indexen en een LRU-cache.
+
+bouw_analyse_index() parseert één keer per dataset de maand en het jaar van
+RequestedDeliveryDateFinal en legt per dimensie (Country, ChainName, Carrier,
+SalesArea) vast op welke rijen elke waarde staat. Een filter wordt dan een
+doorsnede van positie-arrays in plaats van een kopie plus datumparsing.
+
+gefilterde_analyse() bewaart de uitkomst per genormaliseerde filter (volgorde
+en dubbele waarden maken niet uit) in een LRU-cache die bij de index hoort:
+een herhaalde of anders geformuleerde vraag met dezelfde filters kost niets.
+rangschikking() (OTD en te late orders per waarde van een dimensie) deelt die cache.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data.processor import bereken_kpi_scores, bereken_otd, root_cause_samenvatting
+from src.utils.profiler import profileer
+
+DIMENSIES = ["Country", "ChainName", "Carrier", "SalesArea"]
+
+# Aantal gefilterde analyses per dataset in de cache
+MAX_ANALYSES = 64
+
+
+@profileer()
+def bouw_analyse_index(df: pd.DataFrame) -> dict:
+    """Maand/jaar-arrays en rijposities per dimensiewaarde, plus een lege LRU-cache."""
+    index = {"df": df, "maand": None, "jaar": None, "dimensies": {}, "cache": OrderedDict()}
+    if "RequestedDeliveryDateFinal" in df.columns:
+        datum = pd.to_datetime(df["RequestedDeliveryDateFinal"], dayfirst=True, errors="coerce")
+        index["maand"] = datum.dt.month.to_numpy(dtype=float)
+        index["jaar"] = datum.dt.year.to_numpy(dtype=float)
+    for kolom in DIMENSIES:
+        if kolom in df.columns:
+            index["dimensies"][kolom] = df.groupby(kolom, sort=False, observed=True).indices
+    return index
+
+
+def _als_lijst(waarde) -> list:
+    return list(waarde) if isinstance(waarde, (list, tuple, set)) else [waarde]
+
+
+def normaliseer_filters(filters: dict) -> tuple:
+    """Hashbare, volgorde-onafhankelijke vorm van een filterdict (losse waarden of lijsten)."""
+    return tuple(sorted(
+        (k, tuple(sorted({str(w) for w in _als_lijst(v)})))
+        for k, v in filters.items() if v not in (None, [], ())
+    ))
+
+
+def filter_posities(index: dict, filters: dict) -> np.ndarray:
+    """Rijposities die aan alle filters voldoen (meerdere waarden per dimensie = of).
+
+    maand en jaar filteren los op maandnummers en jaartallen; periode ("JJJJ-MM") op
+    maand-jaarparen.
+    """
+    n = len(index["df"])
+    mask = np.ones(n, dtype=bool)
+    for kolom, waarden in filters.items():
+        if kolom in index["dimensies"]:
+            groepen = index["dimensies"][kolom]
+            deel = np.zeros(n, dtype=bool)
+            for waarde in _als_lijst(waarden):
+                if waarde in groepen:
+                    deel[groepen[waarde]] = True
+            mask &= deel
+    if filters.get("maand") and index["maand"] is not None:
+        mask &= np.isin(index["maand"], _als_lijst(filters["maand"]))
+    if filters.get("jaar") and index["jaar"] is not None:
+        mask &= np.isin(index["jaar"], _als_lijst(filters["jaar"]))
+    if filters.get("periode") and index["maand"] is not None:
+        # "JJJJ-MM": maand en jaar als paar, niet als losse lijsten
+        perioden = {tuple(int(d) for d in str(p).split("-")) for p in _als_lijst(filters["periode"])}
+        deel = np.zeros(n, dtype=bool)
+        for jaar, maand in perioden:
+            deel |= (index["jaar"] == jaar) & (index["maand"] == maand)
+        mask &= deel
+    return np.flatnonzero(mask)
+
+
+def _otd_per(df: pd.DataFrame, kolom: str) -> pd.DataFrame:
+    """OTD % en aantal orders per waarde van kolom (zoals bereken_otd per groep)."""
+    if "otd_ok" not in df.columns:
+        rijen = [{kolom: w, "otd": bereken_otd(g), "n": len(g)} for w, g in df.groupby(kolom)]
+        return pd.DataFrame(rijen, columns=[kolom, "otd", "n"])
+    groep = df["otd_ok"].astype(float).groupby(df[kolom])
+    return pd.DataFrame({
+        "otd": (groep.mean() * 100).fillna(0.0),
+        "n": df.groupby(kolom).size(),
+    }).rename_axis(kolom).reset_index()
+
+
+@profileer()
+def analyseer(df_f: pd.DataFrame) -> dict:
+    """KPI-analyse van een (gefilterde) selectie.
+
+    Retourneert dict met aantal, otd, te_laat, scores, root_causes (top 5), klanten (slechtste 5,
+    alleen bij meer dan één klant) en carriers (alle, alleen bij meer dan één carrier).
+    """
+    if len(df_f) == 0:
+        return {"aantal": 0}
+    root_causes = root_cause_samenvatting(df_f)
+    analyse = {
+        "aantal": len(df_f),
+        "otd": bereken_otd(df_f),
+        "te_laat": int(root_causes["aantal"].sum()),
+        "scores": bereken_kpi_scores(df_f),
+        "root_causes": root_causes.head(5),
+        "klanten": None,
+        "carriers": None,
+    }
+    if "ChainName" in df_f.columns and df_f["ChainName"].nunique() > 1:
+        analyse["klanten"] = _otd_per(df_f, "ChainName").sort_values("otd", kind="stable").head(5)
+    if "Carrier" in df_f.columns and df_f["Carrier"].nunique() > 1:
+        analyse["carriers"] = _otd_per(df_f, "Carrier")
+    return analyse
+
+
+def _gecachet(index: dict, sleutel: tuple, maak):
+    """Waarde uit de LRU-cache van de index, of maak en bewaar hem."""
+    cache = index["cache"]
+    if sleutel in cache:
+        cache.move_to_end(sleutel)
+        return cache[sleutel]
+
+    waarde = maak()
+    cache[sleutel] = waarde
+    while len(cache) > MAX_ANALYSES:
+        cache.popitem(last=False)
+    return waarde
+
+
+def gefilterde_analyse(index: dict, filters: dict) -> dict:
+    """Analyse voor filters uit de LRU-cache van de index, of bereken en bewaar hem."""
+    return _gecachet(
+        index, normaliseer_filters(filters),
+        lambda: analyseer(index["df"].iloc[filter_posities(index, filters)]),
+    )
+
+
+def rangschikking(index: dict, filters: dict, kolom: str) -> pd.DataFrame:
+    """OTD %, aantal orders en aantal te late orders per waarde van kolom binnen de filters.
+
+    Kolommen: kolom, otd, n, te_laat (op volgorde van de data; sorteren doet de aanroeper).
+    """
+    def maak():
+        df_f = index["df"].iloc[filter_posities(index, filters)]
+        if kolom not in df_f.columns or df_f.empty:
+            return pd.DataFrame(columns=[kolom, "otd", "n", "te_laat"])
+        tabel = _otd_per(df_f, kolom)
+        if "otd_ok" in df_f.columns:
+            laat = df_f["otd_ok"].notna() & (df_f["otd_ok"].astype(float) == 0.0)
+            te_laat = laat.groupby(df_f[kolom]).sum()
+            tabel["te_laat"] = tabel[kolom].map(te_laat).fillna(0).astype(int)
+        else:
+            tabel["te_laat"] = 0
+        return tabel
+
+    return _gecachet(index, (normaliseer_filters(filters), "rang", kolom), maak)
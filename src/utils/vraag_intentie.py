@@ -0,0 +1,299 @@
+"""Lokale antwoorden op cijfervragen — intentie herkennen en uitvoeren zonder LLM.
+
+Veel vragen zijn opzoekingen in de analyse-engine: "OTD in Duitsland in maart?",
+"slechtste carrier?", "belangrijkste root causes?". herken_intentie() bepaalt met
+vaste woordpatronen wat er gevraagd wordt; beantwoord() haalt het antwoord uit
+gefilterde_analyse() / rangschikking() (vraag_analyse), met de filters die
+entiteiten.detecteer_met_posities() in de vraag vond.
+
+Vragen om uitleg of advies ("waarom", "hoe kan ... verbeteren") en vragen zonder
+herkenbare intentie gaan naar de LLM: herken_intentie() geeft dan None. Dat geldt
+ook als de vraag iets bevat dat de filters niet afdekken: een tijdvak anders dan
+maand/jaar (week, kwartaal, "vorige maand"), trends, samenvattingen, drempels
+("onder 90%"), ontkenningen, een uitsplitsing ("per carrier") of een getal dat
+geen jaartal of top-N is. Ook moet elk woord herkend zijn: als entiteit (filter),
+als woord van de intentie of als vulwoord. Een onbekende naam ("DHL" als de
+carrier "DHL Freight" heet) zou anders stil wegvallen en het totaal opleveren.
+Een lokaal antwoord op een deel van de vraag zou als volledig antwoord gelezen worden.
+"""
+
+from __future__ import annotations
+
+import re
+
+from src.utils.constants import BESCHIKBARE_IDS, PERFORMANCE_NAMEN
+from src.utils.vraag_analyse import filter_posities, gefilterde_analyse, rangschikking
+
+# Uitleg, advies of verbanden: altijd naar de LLM
+_ADVIES_RE = re.compile(
+    r"\b(waarom|hoe (kan|kunnen|komt|zou|moet)|verbeter\w*|advie\w*|aanbevel\w*|verklaar\w*|uitleg|leg\w* uit"
+    r"|suggesti\w*|tips?|strategie\w*|actie\w*|aanpak|oplossing\w*|risico\w*|verwacht\w*|voorspel\w*"
+    r"|why|how (can|could|should|do)|improve\w*|recommend\w*|explain\w*)\b"
+)
+
+# Dimensiewoord → kolom
+DIMENSIE_WOORDEN = {
+    "Carrier": r"carriers?|vervoerders?|transporteurs?",
+    "ChainName": r"klant(en)?|customers?|chains?|afnemers?",
+    "Country": r"land(en)?|country|countries",
+    "SalesArea": r"sales ?areas?|regio'?s?",
+}
+_DIMENSIE_RE = {kolom: re.compile(rf"\b({patroon})\b") for kolom, patroon in DIMENSIE_WOORDEN.items()}
+
+_SLECHTSTE_RE = re.compile(r"\b(slechtste?|laagste?|minste|zwakste?|worst|lowest)\b")
+_BESTE_RE = re.compile(r"\b(beste|hoogste?|sterkste?|best|highest)\b")
+_MEESTE_LAAT_RE = re.compile(r"\b(meeste|vaakst|most)\b.*\b(te laat|te late|late|vertraagd\w*|delayed)\b")
+_TOP_RE = re.compile(r"\b(?:top|eerste)\s*(\d{1,2})\b|\b(\d{1,2})\s+(?:slechtste|beste|laagste|hoogste|meeste)\b")
+_ROOT_CAUSE_RE = re.compile(
+    r"\b(root ?causes?|oorza\w*|grondoorza\w*|faalt?|falen|knelpunt\w*|bottleneck\w*)\b"
+)
+_PERFORMANCE_RE = re.compile(
+    r"\b(performances?|kpi'?s?|kpi-stap\w*|stappen|scores? per stap|planned|capacity|warehouse|transit)\b"
+)
+_AANTAL_RE = re.compile(r"\b(hoeveel|aantal|how many|number of)\b")
+_PROCENT_RE = re.compile(r"\b(procent|percentage|percent)\b|%")
+_TE_LAAT_RE = re.compile(r"\b(te laat|te late|late|vertraagd\w*|delayed)\b")
+_OTD_RE = re.compile(r"\b(otd|on[- ]time|op tijd|leverbetrouwbaarheid|delivery performance)\b")
+_AANTAL_DIMENSIE_RE = {
+    kolom: re.compile(rf"\b(hoeveel|aantal|how many|number of)\s+((verschillende|unieke|different|unique)\s+)?({patroon})\b")
+    for kolom, patroon in DIMENSIE_WOORDEN.items()
+}
+
+# Wat de lokale engine niet kan: andere tijdvakken dan maand/jaar, relatieve tijd, trends,
+# samenvattingen, drempels en ontkenningen — zulke vragen gaan altijd naar de LLM
+# ("huidige OTD" is de hele dataset en mag lokaal; "huidige maand" valt onder maand)
+_NIET_GEDEKT_RE = re.compile(
+    r"\b(week|weken|wekelijks\w*|weeks?|weekly|kwarta\w*|q[1-4]|quarters?|maand(en)?|maandelijks\w*|months?|monthly"
+    r"|jaar|jaren|jaarlijks\w*|years?|yearly|dag(en)?|dagelijks\w*|days?|daily|gisteren|vandaag|yesterday|today"
+    r"|vorige?|deze|dit|afgelopen|laatste|recent\w*|sinds|previous|last|this|past|since"
+    r"|trends?|ontwikkel\w*|verloop|evolutie|stijg\w*|gestegen|daal\w*|gedaald|toegenomen|afgenomen"
+    r"|samenvat\w*|samen|overzicht|summar\w*|overview"
+    r"|onder|boven|tussen|meer dan|minder dan|hoger dan|lager dan|below|above|between|more than|less than"
+    r"|niet|geen|zonder|behalve|exclusief|not|without|except)\b"
+)
+# Vergelijken kan alleen tussen genoemde waarden van één dimensie (soort vergelijking)
+_VERGELIJK_RE = re.compile(r"\b(vergelijk\w*|versus|vs|t\.?o\.?v|compar\w*)\b")
+_MEESTE_RE = re.compile(r"\b(meeste|vaakst|most)\b")
+_TOKEN_RE = re.compile(r"\w+")
+
+# Woorden die niets aan de vraag toevoegen; wat na entiteiten en intentiewoorden overblijft
+# moet hierin staan, anders is de vraag niet (volledig) herkend
+VULWOORDEN = {
+    "de", "het", "een", "is", "zijn", "was", "waren", "wat", "welke", "welk", "hoe", "hoeveel", "wie",
+    "waar", "van", "in", "op", "voor", "met", "bij", "aan", "en", "of", "er", "nu", "die", "dat",
+    "ik", "je", "we", "wij", "mij", "me", "ons", "onze", "kan", "kun", "kunnen", "graag", "eens",
+    "even", "ook", "nog", "dan", "te", "om", "naar", "per", "heeft", "hebben", "heb", "had", "hadden",
+    "wordt", "worden", "werd", "zou", "moet", "mag", "zien", "geef", "toon", "laat", "noem",
+    "orders", "order", "leveringen", "levering", "zendingen", "zending", "data", "dataset",
+    "score", "scores", "scoort", "scoren", "scoorde", "stap", "totaal", "totale", "gemiddeld",
+    "gemiddelde", "huidige", "algemene", "belangrijkste", "grootste", "meest", "alle", "verschillende",
+    "unieke", "geleverd", "zitten", "zit",
+    "the", "a", "an", "are", "were", "what", "which", "who", "how", "of", "for", "to", "on", "at",
+    "by", "with", "and", "or", "our", "please", "can", "you", "could", "show", "give",
+    "tell", "has", "have", "had", "did", "do", "does", "deliveries", "delivery", "shipments",
+    "overall", "total", "average", "current", "main", "biggest", "all", "different", "unique",
+}
+
+# Standaard lengte van een ranglijst, en minimaal aantal orders om mee te tellen
+TOP_N = 5
+MIN_ORDERS = 10
+
+LOKAAL_VOETNOOT = "_Direct berekend uit de data (zonder LLM)._"
+
+
+def herken_intentie(vraag: str, filters: dict | None = None,
+                    posities: list[tuple[int, int]] | None = None) -> dict | None:
+    """Intentie van een cijfervraag, of None als de vraag naar de LLM moet.
+
+    Retourneert dict met soort (rangschikking, vergelijking, root_causes, performances,
+    aantal of otd); rangschikking heeft ook kolom, richting (slechtste/beste/meeste_te_laat)
+    en n, vergelijking (OTD-vraag met meerdere waarden van één dimensie) ook kolom, aantal
+    ook te_laat en kolom (None: orders tellen, anders de waarden van die dimensie).
+
+    filters en posities: uit entiteiten.detecteer_met_posities(). Zonder filters (voorselectie,
+    nog niet bepaald) wordt niet gecontroleerd of de hele vraag gedekt is; zonder posities
+    telt geen enkel woord als entiteit.
+    """
+    tekst = vraag.lower()
+    if _ADVIES_RE.search(tekst) or _NIET_GEDEKT_RE.search(tekst):
+        return None
+    intentie = _intentie(tekst, filters or {})
+    if intentie is None or filters is None:
+        return intentie
+    if _VERGELIJK_RE.search(tekst) and intentie["soort"] != "vergelijking":
+        return None
+    return intentie if _gedekt(vraag, filters, intentie, posities or []) else None
+
+
+def _intentie(tekst: str, filters: dict) -> dict | None:
+    """Soort vraag op grond van de woorden (zonder controle of alles gedekt is)."""
+    richting = (
+        "meeste_te_laat" if _MEESTE_LAAT_RE.search(tekst)
+        else "slechtste" if _SLECHTSTE_RE.search(tekst)
+        else "beste" if _BESTE_RE.search(tekst)
+        else None
+    )
+    kolommen = [kolom for kolom, patroon in _DIMENSIE_RE.items() if patroon.search(tekst)]
+    if richting and kolommen:
+        top = _TOP_RE.search(tekst)
+        n = int(top.group(1) or top.group(2)) if top else TOP_N
+        return {"soort": "rangschikking", "kolom": kolommen[0], "richting": richting, "n": max(n, 1)}
+
+    if _ROOT_CAUSE_RE.search(tekst):
+        return {"soort": "root_causes"}
+    if _PERFORMANCE_RE.search(tekst):
+        return {"soort": "performances"}
+    if _AANTAL_RE.search(tekst) and not _PROCENT_RE.search(tekst):
+        # "Hoeveel klanten ..." telt klanten, "hoeveel orders ..." orders
+        kolom = next((k for k, patroon in _AANTAL_DIMENSIE_RE.items() if patroon.search(tekst)), None)
+        return {"soort": "aantal", "te_laat": bool(_TE_LAAT_RE.search(tekst)), "kolom": kolom}
+    if _OTD_RE.search(tekst):
+        # Meerdere landen/klanten/... genoemd: OTD per genoemde waarde
+        for kolom, waarden in filters.items():
+            if kolom in DIMENSIE_WOORDEN and len(waarden) > 1:
+                return {"soort": "vergelijking", "kolom": kolom}
+        return {"soort": "otd"}
+    return None
+
+
+def _gedekt(vraag: str, filters: dict, intentie: dict, posities: list[tuple[int, int]]) -> bool:
+    """Elk woord van de vraag is een entiteit, een woord van de intentie of een vulwoord,
+    en elk dimensiewoord wordt gebruikt.
+
+    posities: (start, eind) van de herkende entiteiten en jaartallen. Een getal is alleen
+    gedekt als jaartal of top-N, een naam met hoofdletter alleen als entiteit. Een
+    dimensiewoord ("per carrier") moet de kolom van de intentie zijn of een waarde in
+    de filters hebben ("klant Jumbo").
+    """
+    tekst = vraag.lower()
+    if not all(
+        kolom == intentie.get("kolom") or filters.get(kolom)
+        for kolom, patroon in _DIMENSIE_RE.items() if patroon.search(tekst)
+    ):
+        return False
+
+    # Entiteiten en intentiewoorden wegstrepen (met spaties, zodat posities gelijk blijven)
+    rest = list(tekst)
+    for start, eind in posities:
+        rest[start:eind] = " " * (eind - start)
+    rest = "".join(rest)
+    patronen = [*_DIMENSIE_RE.values(), _SLECHTSTE_RE, _BESTE_RE, _MEESTE_RE, _TE_LAAT_RE, _ROOT_CAUSE_RE,
+                _PERFORMANCE_RE, _AANTAL_RE, _PROCENT_RE, _OTD_RE]
+    if intentie["soort"] == "rangschikking":
+        patronen.append(_TOP_RE)
+    if intentie["soort"] == "vergelijking":
+        patronen.append(_VERGELIJK_RE)
+    for patroon in patronen:
+        rest = patroon.sub(lambda m: " " * len(m.group()), rest)
+
+    eerste = _TOKEN_RE.search(vraag)
+    for m in _TOKEN_RE.finditer(rest):
+        origineel = vraag[m.start():m.end()]
+        hoofdletter = origineel != m.group() and m.start() != eerste.start()
+        if m.group() not in VULWOORDEN or hoofdletter:
+            return False
+    return True
+
+
+def _tel_waarden(index: dict, filters: dict, kolom: str, te_laat: bool) -> str:
+    """Aantal verschillende waarden van kolom in de selectie (bij te_laat: met een te late order)."""
+    df = index["df"]
+    if kolom not in df.columns:
+        return f"Geen {kolom}-gegevens in deze dataset."
+    df_f = df.iloc[filter_posities(index, filters)]
+    if te_laat:
+        df_f = df_f[df_f["otd_ok"].notna() & (df_f["otd_ok"].astype(float) == 0.0)]
+        return f"Aantal {kolom}-waarden met te late orders{_filter_tekst(filters)}: {df_f[kolom].nunique()}"
+    return f"Aantal {kolom}-waarden{_filter_tekst(filters)}: {df_f[kolom].nunique()} (over {len(df_f)} orders)"
+
+
+def _filter_tekst(filters: dict) -> str:
+    tekst = ", ".join(f"{k}={'/'.join(str(w) for w in v)}" for k, v in filters.items())
+    return f" ({tekst})" if tekst else ""
+
+
+def _rangschik(index: dict, filters: dict, intentie: dict) -> list[str]:
+    kolom, richting, n = intentie["kolom"], intentie["richting"], intentie["n"]
+    if kolom not in index["df"].columns:
+        return [f"Geen {kolom}-gegevens in deze dataset."]
+    tabel = rangschikking(index, filters, kolom)
+    if tabel.empty:
+        return [f"Geen orders gevonden{_filter_tekst(filters)}."]
+
+    genoeg = tabel[tabel["n"] >= MIN_ORDERS]
+    drempel = not genoeg.empty and len(genoeg) < len(tabel)
+    tabel = genoeg if not genoeg.empty else tabel
+    if richting == "meeste_te_laat":
+        tabel = tabel.sort_values(["te_laat", "otd"], ascending=[False, True], kind="stable")
+        kop = f"Meeste te late orders per {kolom}{_filter_tekst(filters)}:"
+    else:
+        tabel = tabel.sort_values("otd", ascending=richting == "slechtste", kind="stable")
+        kop = f"{richting.capitalize()} {kolom} op OTD{_filter_tekst(filters)}:"
+
+    regels = [kop]
+    for i, rij in enumerate(tabel.head(n).itertuples(index=False), 1):
+        waarde, otd, aantal, te_laat = rij
+        regels.append(f"  {i}. {waarde}: {otd:.1f}% OTD, {te_laat} te laat van {aantal} orders")
+    if drempel:
+        regels.append(f"(alleen {kolom}-waarden met minstens {MIN_ORDERS} orders)")
+    return regels
+
+
+def beantwoord(intentie: dict, index: dict, filters: dict | None = None) -> str:
+    """Antwoordtekst voor een herkende intentie, uit de analyse-index van de dataset."""
+    filters = filters or {}
+    if intentie["soort"] == "rangschikking":
+        return "\n".join(_rangschik(index, filters, intentie) + ["", LOKAAL_VOETNOOT])
+
+    if intentie["soort"] == "vergelijking":
+        kolom = intentie["kolom"]
+        tabel = rangschikking(index, filters, kolom).set_index(kolom)
+        regels = [f"OTD per {kolom}{_filter_tekst({k: v for k, v in filters.items() if k != kolom})}:"]
+        for waarde in filters[kolom]:
+            if waarde in tabel.index:
+                rij = tabel.loc[waarde]
+                regels.append(f"  - {waarde}: {rij['otd']:.1f}% ({int(rij['n'])} orders, {int(rij['te_laat'])} te laat)")
+            else:
+                regels.append(f"  - {waarde}: geen orders")
+        return "\n".join(regels + ["", LOKAAL_VOETNOOT])
+
+    analyse = gefilterde_analyse(index, filters)
+    if analyse["aantal"] == 0:
+        return f"Geen orders gevonden{_filter_tekst(filters)}.\n\n{LOKAAL_VOETNOOT}"
+
+    if intentie["soort"] == "otd":
+        regels = [f"OTD{_filter_tekst(filters)}: {analyse['otd']:.1f}% over {analyse['aantal']} orders."]
+    elif intentie["soort"] == "aantal":
+        regels = [f"Aantal orders{_filter_tekst(filters)}: {analyse['aantal']}"]
+        if intentie.get("kolom"):
+            regels = [_tel_waarden(index, filters, intentie["kolom"], intentie["te_laat"])]
+        elif intentie["te_laat"]:
+            regels = [f"Te late orders{_filter_tekst(filters)}: {analyse['te_laat']} van {analyse['aantal']} orders."]
+    elif intentie["soort"] == "performances":
+        regels = [f"Performance-scores{_filter_tekst(filters)}:"]
+        for kpi_id in BESCHIKBARE_IDS:
+            score = analyse["scores"].get(kpi_id)
+            naam = PERFORMANCE_NAMEN.get(kpi_id, kpi_id)
+            regels.append(f"  - {naam}: {score:.1f}%" if score is not None else f"  - {naam}: geen data")
+    else:
+        rc = analyse["root_causes"]
+        if rc.empty:
+            regels = [f"Geen te late orders{_filter_tekst(filters)}."]
+        else:
+            regels = [f"Root causes van te late orders{_filter_tekst(filters)}, naar eerste falende stap:"]
+            for _, rij in rc.iterrows():
+                regels.append(f"  - {rij['root_cause_naam']}: {rij['aantal']}x ({rij['percentage']:.1f}%)")
+    return "\n".join(regels + ["", LOKAAL_VOETNOOT])
+
+
+def lokaal_antwoord(vraag: str, filters: dict, index: dict,
+                    posities: list[tuple[int, int]] | None = None) -> str | None:
+    """Antwoord op een cijfervraag uit de analyse-index, of None als de LLM nodig is.
+
+    filters en posities komen uit entiteiten.detecteer_met_posities(). Zonder otd_ok
+    (data niet via bereken_performances) is er niets exacts te zeggen.
+    """
+    if "otd_ok" not in index["df"].columns:
+        return None
+    intentie = herken_intentie(vraag, filters, posities)
+    return beantwoord(intentie, index, filters) if intentie is not None else None
@@ -0,0 +1,21 @@
+"""Gedeelde fixtures: synthetische data uit src.bench.synthetisch, door de pipeline verwerkt."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.bench.synthetisch import genereer  # noqa: E402
+from src.data.processor import bereken_performances, dedup_datagrid, join_likp  # noqa: E402
+from src.data.validator import valideer_datagrid, valideer_likp, verzamel_meldingen  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def synthetisch_df():
+    """20.000 synthetische orders met otd_ok en performances (zoals na het uploaden)."""
+    datagrid, likp = genereer(20_000)
+    with verzamel_meldingen():
+        df, _ = join_likp(dedup_datagrid(valideer_datagrid(datagrid)), valideer_likp(likp))
+    return bereken_performances(df)
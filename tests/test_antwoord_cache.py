@@ -0,0 +1,29 @@
+"""Antwoord-cache: vragen met een ander vraagwoord krijgen elkaars antwoord niet."""
+
+import pytest
+
+from src.utils import antwoord_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cfg = {"aan": True, "pad": str(tmp_path / "antwoorden.json"), "ttl_uur": 24, "max_items": 500, "gelijkenis": 0.8}
+    monkeypatch.setattr(antwoord_cache, "get_antwoord_cache_config", lambda: cfg)
+    monkeypatch.setattr(antwoord_cache, "_cache", None)
+    return "context"
+
+
+@pytest.mark.parametrize("eerste, tweede", [
+    ("Hoeveel orders waren te laat?", "Welke orders waren te laat?"),
+    ("Wanneer was de OTD laag?", "Waar was de OTD laag?"),
+])
+def test_vraagwoord_bepaalt_de_vraag(cache, eerste, tweede):
+    assert antwoord_cache.normaliseer_vraag(eerste) != antwoord_cache.normaliseer_vraag(tweede)
+    antwoord_cache.bewaar(eerste, cache, "antwoord op de eerste vraag")
+    assert antwoord_cache.zoek(tweede, cache) is None
+    assert antwoord_cache.zoek(eerste, cache) == "antwoord op de eerste vraag"
+
+
+def test_zelfde_vraag_andere_volgorde(cache):
+    antwoord_cache.bewaar("Wat is de huidige OTD-score?", cache, "89%")
+    assert antwoord_cache.zoek("huidige otd score", cache) == "89%"
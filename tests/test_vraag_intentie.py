@@ -0,0 +1,42 @@
+"""Lokale antwoorden alleen als de hele vraag herkend is."""
+
+import pytest
+
+from src.utils.entiteiten import bouw_entiteit_index, detecteer_met_posities
+from src.utils.vraag_analyse import bouw_analyse_index
+from src.utils.vraag_intentie import lokaal_antwoord
+
+
+@pytest.fixture(scope="module")
+def indexen(synthetisch_df):
+    return bouw_entiteit_index(synthetisch_df), bouw_analyse_index(synthetisch_df)
+
+
+def _antwoord(vraag, indexen):
+    entiteiten, analyses = indexen
+    filters, posities = detecteer_met_posities(vraag, entiteiten)
+    return filters, lokaal_antwoord(vraag, filters, analyses, posities)
+
+
+def test_onbekende_carrier_gaat_naar_llm(indexen):
+    # De carrier heet "DHL Freight": zonder filter zou het antwoord de totale OTD zijn
+    filters, antwoord = _antwoord("Wat is de OTD voor DHL?", indexen)
+    assert filters == {}
+    assert antwoord is None
+
+
+def test_volledige_carriernaam_lokaal(indexen):
+    filters, antwoord = _antwoord("Wat is de OTD voor DHL Freight?", indexen)
+    assert filters == {"Carrier": ["DHL Freight"]}
+    assert antwoord is not None and "Carrier=DHL Freight" in antwoord
+
+
+@pytest.mark.parametrize("vraag", ["OTD van B&Q in het VK", "OTD van B&Q in het Verenigd Koninkrijk"])
+def test_vk_is_land_filter(vraag, indexen):
+    filters, antwoord = _antwoord(vraag, indexen)
+    assert filters == {"ChainName": ["B&Q"], "Country": ["GB"]}
+    assert antwoord is not None and "Country=GB" in antwoord
+
+
+def test_onbekend_woord_met_hoofdletter_gaat_naar_llm(indexen):
+    assert _antwoord("OTD van B&Q in Wales", indexen)[1] is None